@@ -46,6 +46,7 @@ MIDDLEWARE = [
     "shop_middleware.PermissionMiddleware",
     "shop_middleware.SecurityMiddleware",
     "shop_middleware.UserActivityMiddleware",
+    "shop_middleware.CartCookieMiddleware",
 ]
 
 ROOT_URLCONF = "ecommerce_project.urls"
@@ -119,8 +120,12 @@ SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_SAVE_EVERY_REQUEST = True  # Save session on every request
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # Keep sessions when browser closes
 SESSION_ENGINE = "django.contrib.sessions.backends.db"  # Use database sessions
-# Use compact application serializer in shop.utils
-SESSION_SERIALIZER = "shop.utils.serializers.PickleSerializer"
+# Compact binary session format from shop.utils. Sessions written by the
+# old PickleSerializer are still read while SHOP_SESSION_LEGACY_PICKLE is on;
+# turn it off once those sessions have expired (SESSION_COOKIE_AGE).
+SESSION_SERIALIZER = "shop.utils.serializers.CompactSessionSerializer"
+SHOP_SESSION_LEGACY_PICKLE = True
+SHOP_SESSION_COMPRESS_THRESHOLD = 512  # bytes
 
 # Cart session settings
 CART_SESSION_ID = "cart"
@@ -5,9 +5,12 @@ WSGI/ASGI entry points. Imports are grouped at the top to satisfy linters
 while keeping behavior identical to the previous file.
 """
 
+import importlib.util
 import os
 from pathlib import Path
 
+import django
+
 
 # After moving the project into `main/`, make BASE_DIR point to the
 # repository root so paths like db.sqlite3, static/ and media/ remain
@@ -48,6 +51,7 @@ MIDDLEWARE = [
     "shop_middleware.PermissionMiddleware",
     "shop_middleware.SecurityMiddleware",
     "shop_middleware.UserActivityMiddleware",
+    "shop_middleware.CartCookieMiddleware",
 ]
 
 ROOT_URLCONF = "ecommerce_project.urls"
@@ -73,6 +77,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "ecommerce_project.wsgi.application"
+# For ASGI servers, e.g. ``uvicorn ecommerce_project.asgi:application``;
+# the async cart endpoints (shop/async_views.py) are written for them.
+ASGI_APPLICATION = "ecommerce_project.asgi.application"
 
 
 # Database configuration: default to Postgres (persistent local container).
@@ -85,6 +92,29 @@ DB_PASSWORD = os.environ.get("DB_PASSWORD", "postgres")
 DB_HOST = os.environ.get("DB_HOST", "127.0.0.1")
 DB_PORT = os.environ.get("DB_PORT", "15433")
 
+# Connection reuse for the server databases. Connections stay open for
+# DB_CONN_MAX_AGE seconds (0 = close after every request) and are checked
+# before reuse when DB_CONN_HEALTH_CHECKS is on, so a restarted database
+# doesn't surface as an error on the next request.
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "60"))
+DB_CONN_HEALTH_CHECKS = os.environ.get("DB_CONN_HEALTH_CHECKS", "True").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Optional psycopg 3 connection pool (DB_POOL=1). Django supports it from
+# 5.1 with psycopg_pool installed; otherwise persistent connections above
+# are used instead.
+DB_POOL = os.environ.get("DB_POOL", "False").lower() in ("1", "true", "yes")
+DB_POOL_OPTIONS = None
+if DB_POOL and django.VERSION >= (5, 1) and importlib.util.find_spec("psycopg_pool"):
+    DB_POOL_OPTIONS = {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+    }
+
 if DB_ENGINE in ("mysql", "mariadb"):
     DATABASES = {
         "default": {
@@ -94,19 +124,8 @@ if DB_ENGINE in ("mysql", "mariadb"):
             "PASSWORD": DB_PASSWORD,
             "HOST": DB_HOST,
             "PORT": DB_PORT or "3306",
-            "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "0")),
-        }
-    }
-elif DB_ENGINE in ("postgres", "postgresql", "psycopg2"):
-    # Configure PostgreSQL when DB_ENGINE indicates a postgres backend.
-    DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.postgresql",
-            "NAME": DB_NAME,
-            "USER": DB_USER,
-            "PASSWORD": DB_PASSWORD,
-            "HOST": DB_HOST,
-            "PORT": DB_PORT or "5432",
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": DB_CONN_HEALTH_CHECKS,
         }
     }
 elif DB_ENGINE in ("postgres", "postgresql", "psycopg2"):
@@ -119,8 +138,14 @@ elif DB_ENGINE in ("postgres", "postgresql", "psycopg2"):
             "PASSWORD": DB_PASSWORD,
             "HOST": DB_HOST,
             "PORT": DB_PORT or "5432",
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": DB_CONN_HEALTH_CHECKS,
         }
     }
+    if DB_POOL_OPTIONS:
+        # The pool owns connection lifetime; Django requires CONN_MAX_AGE=0.
+        DATABASES["default"]["OPTIONS"] = {"pool": DB_POOL_OPTIONS}
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
 else:
     # Fallback to SQLite if explicitly requested via DB_ENGINE=sqlite
     DATABASES = {
@@ -149,12 +174,91 @@ SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_SAVE_EVERY_REQUEST = True  # Save session on every request
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # Keep sessions when browser closes
 SESSION_ENGINE = "django.contrib.sessions.backends.db"  # Use DB sessions
-# Use compact application serializer in shop.utils
-SESSION_SERIALIZER = "shop.utils.serializers.PickleSerializer"
+# Compact binary session format from shop.utils. Sessions written by the
+# old PickleSerializer are still read while SHOP_SESSION_LEGACY_PICKLE is on;
+# turn it off once those sessions have expired (SESSION_COOKIE_AGE).
+SESSION_SERIALIZER = "shop.utils.serializers.CompactSessionSerializer"
+SHOP_SESSION_LEGACY_PICKLE = True
+SHOP_SESSION_COMPRESS_THRESHOLD = 512  # bytes
 
 # Cart session settings
 CART_SESSION_ID = "cart"
 
+# Where anonymous carts live: "session" (default) or "cookie" for a signed
+# cookie that moves to the session once it outgrows the size limit.
+SHOP_CART_BACKEND = os.environ.get("SHOP_CART_BACKEND", "session")
+SHOP_CART_COOKIE_NAME = "shop_cart"
+SHOP_CART_COOKIE_MAX_BYTES = 2048
+
+# Cache aliases. "default" is the one selected by SHOP_CACHE_BACKEND:
+# "locmem" (per process, the default), "file" (shared by processes on one
+# host) or "redis" (shared across hosts; needs REDIS_URL and redis-py).
+# Invalidation bumps version counters in this cache, so with "locmem" a
+# change made in one worker process doesn't retire pages, fragments or
+# ETags cached by the others; run several workers on "file" or "redis".
+REDIS_URL = os.environ.get("REDIS_URL", "")
+SHOP_CACHE_BACKEND = os.environ.get(
+    "SHOP_CACHE_BACKEND", "redis" if REDIS_URL else "locmem"
+)
+_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shop",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get(
+            "SHOP_CACHE_DIR", str(BASE_DIR / ".cache" / "shop")
+        ),
+    },
+}
+if REDIS_URL:
+    _CACHE_BACKENDS["redis"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "ecommerce",
+    }
+CACHES = {"default": _CACHE_BACKENDS[SHOP_CACHE_BACKEND], **_CACHE_BACKENDS}
+SHOP_CACHE_ALIAS = "default"
+SHOP_CACHE_LOCK_TIMEOUT = 10  # seconds a cached_queryset refresh may hold its lock
+SHOP_CACHE_LOCK_WAIT = 1.0  # seconds other callers wait for that refresh
+
+# Template fragment caching (product cards, category grid, nav menu).
+# Set SHOP_FRAGMENT_CACHE=0 to render fragments live while editing templates.
+SHOP_FRAGMENT_CACHE_ENABLED = os.environ.get("SHOP_FRAGMENT_CACHE", "True").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SHOP_FRAGMENT_CACHE_TIMEOUT = 600  # seconds
+
+# Full-page cache for anonymous catalog pages. SHOP_PAGE_CACHE=0 disables it.
+SHOP_PAGE_CACHE_ENABLED = os.environ.get("SHOP_PAGE_CACHE", "True").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SHOP_PAGE_CACHE_TIMEOUT = 300  # seconds
+
+# Search autocomplete: each process keeps an in-memory prefix index, rebuilt
+# when the catalog changes or after SHOP_AUTOCOMPLETE_MAX_AGE seconds.
+SHOP_AUTOCOMPLETE_LIMIT = 8  # suggestions returned by default
+SHOP_AUTOCOMPLETE_MAX_AGE = 300  # seconds
+
+# Order exports stream rows fetched in chunks of this many.
+SHOP_EXPORT_CHUNK_SIZE = 2000
+
+# Bulk product imports validate and write rows in chunks of this many,
+# one short transaction per chunk.
+SHOP_IMPORT_CHUNK_SIZE = 500
+
+# Most changes accepted by one vendor bulk price/stock update request.
+SHOP_BULK_UPDATE_MAX = 1000
+
+# Seconds the checkout page holds a cart's stock for the shopper; expired
+# holds are deleted by the reap_expired command.
+SHOP_RESERVATION_TTL = 600
+
 # Email configuration
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"  # For development
 DEFAULT_FROM_EMAIL = "noreply@himalayanecommerce.com"
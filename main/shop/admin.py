@@ -5,7 +5,9 @@ products, stores, orders, reviews, and user profiles.
 """
 
 from django.contrib import admin  # type: ignore
+from django.db.models import Count  # type: ignore
 
+from .exports import order_lines, stream_export
 from .models import (
     Cart,
     CartItem,
@@ -113,17 +115,24 @@ class CartAdmin(admin.ModelAdmin):
     readonly_fields = ["created_at", "updated_at"]
     inlines = [CartItemInline]
 
+    def get_queryset(self, request):
+        # Totals are denormalized on Cart, so the changelist reads them from
+        # the cart rows.
+        return super().get_queryset(request).select_related("user")
+
     def total_items(self, obj):
         """Display total items in cart."""
-        return obj.total_items
+        return obj.item_count
 
     total_items.short_description = "Total Items"  # type: ignore
+    total_items.admin_order_field = "item_count"  # type: ignore
 
     def total_price(self, obj):
         """Display formatted total price."""
-        return f"${obj.total_price:.2f}"
+        return f"${obj.subtotal:.2f}"
 
     total_price.short_description = "Total Price"  # type: ignore
+    total_price.admin_order_field = "subtotal"  # type: ignore
 
 
 class OrderItemInline(admin.TabularInline):
@@ -148,6 +157,8 @@ class OrderAdmin(admin.ModelAdmin):
         "order_id",
         "buyer",
         "status",
+        "item_count",
+        "line_count",
         "total_amount",
         "created_at",
     ]
@@ -162,15 +173,43 @@ class OrderAdmin(admin.ModelAdmin):
     ]
     readonly_fields = [
         "order_id",
+        "item_count",
         "created_at",
         "updated_at",
     ]
     list_editable = ["status"]
     inlines = [OrderItemInline]
+    actions = ["export_csv", "export_jsonl"]
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.select_related("buyer")
+        return qs.select_related("buyer").annotate(annotated_line_count=Count("items"))
+
+    def line_count(self, obj):
+        """Display the number of order lines."""
+        if hasattr(obj, "annotated_line_count"):
+            return obj.annotated_line_count
+        return obj.items.count()
+
+    line_count.short_description = "Lines"  # type: ignore
+    line_count.admin_order_field = "annotated_line_count"  # type: ignore
+
+    def save_related(self, request, form, formsets, change):
+        """Keep the denormalized item count in step with inline edits."""
+        super().save_related(request, form, formsets, change)
+        form.instance.update_item_count()
+
+    def export_csv(self, request, queryset):
+        """Stream the selected orders' lines as CSV."""
+        return stream_export(order_lines(orders=queryset.values("pk")), "csv")
+
+    export_csv.short_description = "Export selected orders (CSV)"  # type: ignore
+
+    def export_jsonl(self, request, queryset):
+        """Stream the selected orders' lines as JSON Lines."""
+        return stream_export(order_lines(orders=queryset.values("pk")), "jsonl")
+
+    export_jsonl.short_description = "Export selected orders (JSONL)"  # type: ignore
 
 
 @admin.register(Review)
@@ -8,3 +8,18 @@ class ShopConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "shop"
+
+    def ready(self) -> None:
+        # pylint: disable=import-outside-toplevel
+        from django.contrib.auth.signals import (  # type: ignore
+            user_logged_in,
+            user_logged_out,
+        )
+
+        # Register cache invalidation signal handlers.
+        from . import signals  # noqa: F401
+        from .cart import merge_cart_on_login, save_cart_on_logout
+
+        # Keep the saved cart and the session cart in step.
+        user_logged_in.connect(merge_cart_on_login, dispatch_uid="shop.cart.login")
+        user_logged_out.connect(save_cart_on_logout, dispatch_uid="shop.cart.logout")
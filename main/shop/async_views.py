@@ -0,0 +1,94 @@
+"""Async variants of the JSON cart endpoints, for ASGI deployments.
+
+The cart dropdown polls the cart API on every page load. Served by an ASGI
+server (``ecommerce_project.asgi``), these views let one worker keep many
+polls in flight: products and stock are read with Django's async ORM
+(``ain_bulk``, ``aget``, ``async for``). Django 4.2 has no async session
+API, so loading the session-backed cart goes through ``sync_to_async``.
+
+Under WSGI the synchronous ``views.cart_api`` is the better fit; Django
+would run these in a one-off event loop per request.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async  # type: ignore
+from django.http import (  # type: ignore
+    HttpResponseNotAllowed,
+    HttpResponseNotModified,
+    JsonResponse,
+)
+from django.utils.http import parse_etags, quote_etag  # type: ignore
+
+from .cart import get_cart
+from .conditional import cart_api_etag
+from .models import Product
+from .reservations import aavailable_quantities, holder_key
+from .views import cart_api_payload
+
+
+def _load_cart(request):
+    """Return ``(etag, cart)``; reads the session, so runs in a thread."""
+    return cart_api_etag(request), get_cart(request)
+
+
+def _load_cart_and_holder(request):
+    """Return ``(cart, holder key)``; reads the session and user, in a thread."""
+    return get_cart(request), holder_key(request)
+
+
+async def cart_api(request):
+    """Async ``views.cart_api``, with the same ETag handling."""
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    etag, cart = await sync_to_async(_load_cart)(request)
+    etag = quote_etag(etag)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        summary = await cart.aget_summary()
+        response = JsonResponse(cart_api_payload(request, summary))
+    response["ETag"] = etag
+    return response
+
+
+async def cart_update(request):
+    """Set a cart line's quantity from a JSON body; 0 removes the line.
+
+    The body is ``{"product_id": <id>, "quantity": <n>}``. Stock held for
+    other shoppers' checkouts isn't available.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    try:
+        data = json.loads(request.body)
+        product_id = int(data["product_id"])
+        quantity = int(data.get("quantity", 0))
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse(
+            {"success": False, "error": "Expected product_id and quantity."},
+            status=400,
+        )
+    try:
+        product = await Product.objects.aget(pk=product_id)
+    except Product.DoesNotExist:
+        return JsonResponse({"success": False, "error": "No such product."}, status=404)
+
+    cart, holder = await sync_to_async(_load_cart_and_holder)(request)
+    if quantity > 0:
+        stock = await aavailable_quantities([product.pk], holder=holder)
+        available = stock.get(product.pk, 0)
+        if quantity > available:
+            return JsonResponse(
+                {"success": False, "error": f"Only {available} items available"}
+            )
+        cart.add(product=product, quantity=quantity, override_quantity=True)
+    else:
+        cart.remove(product)
+    return JsonResponse(
+        {
+            "success": True,
+            "cart_count": len(cart),
+            "total_price": str(cart.get_total_price()),
+        }
+    )
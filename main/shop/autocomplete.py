@@ -0,0 +1,158 @@
+"""In-memory prefix index for search autocomplete.
+
+Product, store and category names are split into words and kept in one
+sorted array of ``(word, entry)`` pairs; every word starting with a prefix
+sits in a contiguous slice found with two binary searches, so a lookup
+never touches the database.
+
+Each process builds the index on first use and rebuilds it when the
+catalog generation moves on (see ``shop.cache``), so catalog edits show up
+in suggestions without any explicit refresh.
+"""
+
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from urllib.parse import urlencode
+
+from django.conf import settings  # type: ignore
+from django.urls import reverse  # type: ignore
+
+from .cache import catalog_generation
+from .models import Category, Product, Store
+
+# Suggestion types, in the order they are ranked when otherwise equal.
+KINDS = ("category", "store", "product")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Casefold ``text`` and strip accents so "Café" matches "cafe"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class PrefixIndex:
+    """A sorted array of words mapping prefixes to suggestions."""
+
+    def __init__(self, entries=()):
+        # entries: (kind, label, url) tuples.
+        self.entries = []
+        words = []
+        for kind, label, url in entries:
+            entry_id = len(self.entries)
+            self.entries.append(
+                {"type": kind, "label": label, "url": url, "key": normalize(label)}
+            )
+            for word in set(_WORD_RE.findall(normalize(label))):
+                words.append((word, entry_id))
+        words.sort()
+        self.words = [word for word, _ in words]
+        self.ids = [entry_id for _, entry_id in words]
+        # One-character prefixes match a large slice of the index; their
+        # results are kept for the life of the index.
+        self._short = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _ids(self, low: str, high: str) -> set:
+        """Return the entries with a word between ``low`` and ``high``."""
+        start = bisect_left(self.words, low)
+        return set(self.ids[start : bisect_right(self.words, high, lo=start)])
+
+    def search(self, query: str, limit: int = 8) -> list:
+        """Return up to ``limit`` suggestions whose words start with ``query``.
+
+        With several words, the last is a prefix and every other word must
+        appear in full. Labels starting with the query rank first, then
+        categories, stores and products, then shorter labels.
+        """
+        terms = _WORD_RE.findall(normalize(query))
+        if not terms or limit <= 0:
+            return []
+        if len(terms) == 1 and len(terms[0]) == 1:
+            key = (terms[0], limit)
+            if key not in self._short:
+                self._short[key] = self._search(terms, limit)
+            return self._short[key]
+        return self._search(terms, limit)
+
+    def _search(self, terms, limit):
+        *whole, prefix = terms
+        matches = self._ids(prefix, prefix + "\uffff")
+        for word in whole:
+            matches &= self._ids(word, word)
+        key = " ".join(terms)
+
+        def rank(entry_id):
+            entry = self.entries[entry_id]
+            return (
+                not entry["key"].startswith(key),
+                KINDS.index(entry["type"]),
+                len(entry["key"]),
+                entry["key"],
+            )
+
+        return [
+            {name: self.entries[i][name] for name in ("type", "label", "url")}
+            for i in heapq.nsmallest(limit, matches, key=rank)
+        ]
+
+
+def build_index() -> PrefixIndex:
+    """Build a ``PrefixIndex`` over active products and stores and categories."""
+    entries = []
+    product_list = reverse("shop:product_list")
+    for pk, name in Category.objects.values_list("pk", "name"):
+        entries.append(
+            ("category", name, f"{product_list}?{urlencode({'category': pk})}")
+        )
+    for pk, name in Store.objects.filter(is_active=True).values_list("pk", "name"):
+        entries.append(("store", name, reverse("shop:store_detail", args=[pk])))
+    for pk, name in Product.objects.filter(is_active=True).values_list("pk", "name"):
+        entries.append(("product", name, reverse("shop:product_detail", args=[pk])))
+    return PrefixIndex(entries)
+
+
+_lock = threading.Lock()
+_current = {"generation": None, "built_at": 0.0, "index": None}
+
+
+def get_index() -> PrefixIndex:
+    """Return this process's index, rebuilding it if the catalog changed.
+
+    The index is also rebuilt after ``SHOP_AUTOCOMPLETE_MAX_AGE`` seconds in
+    case the generation counter was evicted from the cache and restarted.
+    """
+    generation = catalog_generation()
+    max_age = getattr(settings, "SHOP_AUTOCOMPLETE_MAX_AGE", 300)
+
+    def stale():
+        return (
+            _current["generation"] != generation
+            or time.monotonic() - _current["built_at"] > max_age
+        )
+
+    if stale():
+        with _lock:
+            if stale():
+                _current["index"] = build_index()
+                _current["built_at"] = time.monotonic()
+                _current["generation"] = generation
+    return _current["index"]
+
+
+def reset_index() -> None:
+    """Drop this process's index so the next lookup rebuilds it."""
+    with _lock:
+        _current.update(generation=None, built_at=0.0, index=None)
+
+
+def suggest(query: str, limit: int = 8) -> list:
+    """Return autocomplete suggestions for ``query``."""
+    return get_index().search(query, limit)
@@ -0,0 +1,139 @@
+"""Bulk price, stock and visibility updates for vendors.
+
+``apply_product_changes`` takes a list of ``{"id", "price"?, "quantity"?,
+"is_active"?}`` changes, checks every product belongs to the vendor with one
+query, and writes only the fields that actually changed: products are
+grouped by their set of changed fields and each group is one
+``bulk_update``. The affected cache scopes are marked changed once, after
+the whole batch commits.
+
+The batch is all or nothing: if any change is invalid nothing is written
+and every problem is reported.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings  # type: ignore
+from django.core.exceptions import ValidationError  # type: ignore
+from django.db import transaction  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from .invalidation import catalog_scopes, mark_changed
+from .models import Cart, Product
+
+# Fields a change may set.
+FIELDS = ("price", "quantity", "is_active")
+
+
+class BulkUpdateError(ValueError):
+    """Raised with per-change ``errors`` when a batch can't be applied."""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _clean_change(change) -> tuple:
+    """Return ``(id, {field: value})`` for one change, or raise ValidationError."""
+    if not isinstance(change, dict):
+        raise ValidationError("Each change must be an object.")
+    unknown = set(change) - {"id", *FIELDS}
+    if unknown:
+        raise ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    product_id = change.get("id")
+    if not isinstance(product_id, int) or isinstance(product_id, bool):
+        raise ValidationError("id must be an integer.")
+    values = {}
+    for name in FIELDS:
+        if name not in change:
+            continue
+        value = change[name]
+        if name == "is_active":
+            if not isinstance(value, bool):
+                raise ValidationError("is_active must be true or false.")
+        else:
+            # Same rules as the product form's fields.
+            value = Product._meta.get_field(name).formfield().clean(value)
+        values[name] = value
+    if not values:
+        raise ValidationError(f"Nothing to change; give one of {', '.join(FIELDS)}.")
+    return product_id, values
+
+
+def apply_product_changes(vendor, changes) -> dict:
+    """Apply ``changes`` to ``vendor``'s products and return a summary.
+
+    Raises ``BulkUpdateError`` (writing nothing) if any change is invalid,
+    repeats a product, or names a product the vendor doesn't own.
+    """
+    if not isinstance(changes, list) or not changes:
+        raise BulkUpdateError("Expected a non-empty JSON array of changes.")
+    limit = getattr(settings, "SHOP_BULK_UPDATE_MAX", 1000)
+    if len(changes) > limit:
+        raise BulkUpdateError(f"At most {limit} changes per request.")
+
+    errors, cleaned = [], {}
+    for index, change in enumerate(changes):
+        try:
+            product_id, values = _clean_change(change)
+        except ValidationError as exc:
+            errors.append({"index": index, "errors": exc.messages})
+            continue
+        if product_id in cleaned:
+            errors.append({"index": index, "errors": ["Duplicate id."]})
+            continue
+        cleaned[product_id] = (index, values)
+
+    # Ownership: one query for every product in the batch.
+    products = (
+        Product.objects.filter(pk__in=list(cleaned), store__vendor=vendor)
+        .only("id", "store", "category", *FIELDS)
+        .order_by()
+    )
+    products = {product.pk: product for product in products}
+    for product_id, (index, _values) in cleaned.items():
+        if product_id not in products:
+            errors.append(
+                {"index": index, "errors": ["No such product in your stores."]}
+            )
+    if errors:
+        raise BulkUpdateError(
+            "Some changes are invalid.",
+            sorted(errors, key=lambda error: error["index"]),
+        )
+
+    groups = defaultdict(list)
+    now = timezone.now()
+    for product_id, (_index, values) in cleaned.items():
+        product = products[product_id]
+        changed = frozenset(
+            name for name, value in values.items() if getattr(product, name) != value
+        )
+        if not changed:
+            continue
+        for name in changed:
+            setattr(product, name, values[name])
+        product.updated_at = now
+        groups[changed].append(product)
+
+    updated = [product for group in groups.values() for product in group]
+    if updated:
+        with transaction.atomic():
+            for changed, group in groups.items():
+                Product.objects.bulk_update(group, [*sorted(changed), "updated_at"])
+            repriced = [
+                product.pk
+                for changed, group in groups.items()
+                if "price" in changed
+                for product in group
+            ]
+            if repriced:
+                # bulk_update skips the signal that recounts saved carts.
+                Cart.refresh_totals(Cart.objects.filter(items__product__in=repriced))
+            scopes = set()
+            for product in updated:
+                scopes.update(
+                    catalog_scopes(product.store_id, product.category_id, product.pk)
+                )
+            mark_changed(*scopes)
+    return {"updated": len(updated), "unchanged": len(cleaned) - len(updated)}
@@ -0,0 +1,173 @@
+"""Cache helpers shared by the shop's caching layers.
+
+Which cache backs the shop is chosen in settings: ``CACHES`` defines the
+``locmem``, ``file`` and (with ``REDIS_URL``) ``redis`` aliases, and
+``default`` points at the one selected by ``SHOP_CACHE_BACKEND``. Code in
+the shop goes through ``get_cache()`` rather than importing a backend.
+The ``locmem`` default is per process: invalidation in one worker doesn't
+reach the copies cached by other workers.
+
+Cached values are keyed on version numbers stored in the cache itself; a
+counter that was evicted starts again from the clock, not from 1.
+``CATALOG`` is the catalog generation: model signals bump it whenever
+catalog data changes (see ``shop.signals``), so keys built with
+``make_key`` stop matching without any key scans.
+
+``cached_queryset`` caches query results with stampede protection, and
+every layer records hits and misses through ``record`` so they can be read
+back with ``get_cache_stats``.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings  # type: ignore
+from django.core.cache import caches  # type: ignore
+from django.db.models import QuerySet  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Version name of the catalog generation.
+CATALOG = "catalog"
+
+_VERSION_KEY = "shop:version:{name}"
+_VALUE_KEY = "shop:{name}:g{generation}:{digest}"
+
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+
+def get_cache(alias=None):
+    """Return the cache the shop uses (``SHOP_CACHE_ALIAS``, or ``default``)."""
+    return caches[alias or getattr(settings, "SHOP_CACHE_ALIAS", "default")]
+
+
+def record(name: str, event: str) -> None:
+    """Count a cache ``event`` (hit, miss, stale, ...) for layer ``name``."""
+    with _stats_lock:
+        _stats[name][event] += 1
+    logger.debug("cache %s %s", name, event)
+
+
+def get_cache_stats() -> dict:
+    """Return a snapshot of the hit/miss counters, keyed by layer name."""
+    with _stats_lock:
+        return {name: dict(counter) for name, counter in _stats.items()}
+
+
+def reset_cache_stats() -> None:
+    """Clear all hit/miss counters."""
+    with _stats_lock:
+        _stats.clear()
+
+
+def _initial_version() -> int:
+    """Return the number a missing version counter starts from.
+
+    Counters live in the same cache as the data and can be evicted with it.
+    Starting from the clock (in microseconds) instead of 1 means a counter
+    created again never lands on a number old keys and ETags were built on.
+    """
+    return time.time_ns() // 1000
+
+
+def get_version(name: str) -> int:
+    """Return the current version number for ``name``."""
+    cache = get_cache()
+    key = _VERSION_KEY.format(name=name)
+    version = cache.get(key)
+    if version is None:
+        initial = _initial_version()
+        cache.add(key, initial, None)
+        version = cache.get(key, initial)
+    return version
+
+
+def bump_versions(*names: str) -> None:
+    """Increment the version of each of ``names``, retiring keys built on it."""
+    cache = get_cache()
+    for name in names:
+        key = _VERSION_KEY.format(name=name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # No version stored yet (or it was evicted): any fresh start
+            # differs from the numbers old entries were keyed on.
+            cache.set(key, _initial_version(), None)
+
+
+def catalog_generation() -> int:
+    """Return the current catalog generation."""
+    return get_version(CATALOG)
+
+
+def make_key(name: str, *parts, generation=None) -> str:
+    """Build a cache key for ``name`` and ``parts`` at a catalog generation.
+
+    ``generation`` defaults to the current catalog generation.
+    """
+    if generation is None:
+        generation = catalog_generation()
+    raw = ":".join(str(part) for part in parts)
+    digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    return _VALUE_KEY.format(name=name, generation=generation, digest=digest)
+
+
+def cached_queryset(name, source, *vary_on, timeout=300, early_refresh=0.2):
+    """Return the cached result of ``source`` for the current catalog.
+
+    ``source`` is a QuerySet (cached as a list) or a callable returning a
+    picklable value. The key combines ``name``, ``vary_on`` and the catalog
+    generation, so catalog changes retire it.
+
+    Stampede protection:
+
+    * single flight: on a miss only the caller holding a short lock runs
+      the query; others wait briefly for its result;
+    * early refresh: in the last ``early_refresh`` fraction of ``timeout``
+      one caller refreshes the value while the rest keep using it.
+    """
+    cache = get_cache()
+    key = make_key(name, *vary_on)
+    lock_key = f"{key}:lock"
+    lock_timeout = getattr(settings, "SHOP_CACHE_LOCK_TIMEOUT", 10)
+
+    def compute():
+        value = list(source) if isinstance(source, QuerySet) else source()
+        refresh_at = time.time() + timeout * (1 - early_refresh)
+        cache.set(key, (refresh_at, value), timeout)
+        return value
+
+    entry = cache.get(key)
+    if entry is not None:
+        refresh_at, value = entry
+        if time.time() < refresh_at or not cache.add(lock_key, 1, lock_timeout):
+            record(name, "hit")
+            return value
+        record(name, "refresh")
+        try:
+            return compute()
+        finally:
+            cache.delete(lock_key)
+
+    if cache.add(lock_key, 1, lock_timeout):
+        record(name, "miss")
+        try:
+            return compute()
+        finally:
+            cache.delete(lock_key)
+
+    # Someone else is computing it: wait briefly for their result, then
+    # run the query ourselves rather than hold the request up.
+    deadline = time.time() + getattr(settings, "SHOP_CACHE_LOCK_WAIT", 1.0)
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            record(name, "wait")
+            return entry[1]
+    record(name, "miss")
+    return compute()
@@ -1,25 +1,198 @@
 """
 Session-based cart functionality for anonymous and authenticated users.
 This module provides cart operations that work with Django sessions.
+
+With ``SHOP_CART_BACKEND = "cookie"`` anonymous shoppers keep their cart
+in a signed, compressed cookie instead, so browsing with a small cart needs
+no session row. The cart moves to the session once its cookie would exceed
+``SHOP_CART_COOKIE_MAX_BYTES`` or the shopper signs in.
+
+Signed-in shoppers also have a saved ``Cart``/``CartItem`` in the database
+that outlives their session: signing in folds the session cart into it
+(``merge_saved_cart``) and signing out writes the session cart back
+(``save_user_cart``).
 """
 
 from decimal import Decimal
 
 from django.conf import settings
-from .models import Product
+from django.core import signing
 
+from .cache import catalog_generation
+from .models import Cart as SavedCart
+from .models import CartItem, Product
+from .reservations import claim_holds, holder_key, release, with_available
+from .utils.serializers import CompactSessionSerializer
+
+# Sales tax applied to the cart subtotal at checkout.
+TAX_RATE = Decimal("0.08")
+
+# Attribute used to share one Cart instance between the views and the
+# context processors handling the same request.
+_REQUEST_CART_ATTR = "_shop_session_cart"
+
+# Session key of a counter bumped on every cart change; used to build
+# ETags without loading the cart's products.
+CART_REVISION_SESSION_KEY = "cart_revision"
+
+# Session key of the ``[cart revision, catalog generation]`` the cart was
+# last revalidated at; see ``Cart.revalidate``.
+CART_VALIDATED_SESSION_KEY = "cart_validated"
+
+# Request attribute holding the cookie value CartCookieMiddleware should
+# send back: a signed payload, or "" to delete the cookie.
+CART_COOKIE_REQUEST_ATTR = "_shop_cart_cookie"
+_CART_COOKIE_SALT = "shop.cart"
+
+
+def cart_cookie_name():
+    """Return the name of the anonymous cart cookie."""
+    return getattr(settings, "SHOP_CART_COOKIE_NAME", "shop_cart")
+
+
+def cart_cookie_age():
+    """Return the cart cookie lifetime in seconds."""
+    return getattr(settings, "SHOP_CART_COOKIE_AGE", settings.SESSION_COOKIE_AGE)
+
+
+def get_cart_revision(request):
+    """Return the revision number of the cart for ``request``."""
+    return get_cart(request).revision
+
+
+def get_cart(request):
+    """Return the session Cart for ``request``, creating it once.
+
+    Views and context processors that call this share a single instance,
+    so cart products are loaded at most once per request.
+    """
+    cart = getattr(request, _REQUEST_CART_ATTR, None)
+    if cart is None:
+        cart = Cart(request)
+        setattr(request, _REQUEST_CART_ATTR, cart)
+    return cart
 
-class Cart:
-    """Session-based shopping cart that works for anonymous users."""
+
+class SessionCartStore:
+    """Keep the cart lines and revision in the Django session."""
 
     def __init__(self, request):
-        """Initialize cart from session."""
         self.session = request.session
+
+    def load(self):
+        """Return ``(lines, revision)``, saving an empty cart if needed."""
         cart = self.session.get(settings.CART_SESSION_ID)
         if not cart:
             # Save an empty cart in the session
             cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
+        return cart, self.session.get(CART_REVISION_SESSION_KEY, 0)
+
+    def save(self, cart, revision):
+        """Store the lines and revision; return the store now in use."""
+        self.session[settings.CART_SESSION_ID] = cart
+        self.session[CART_REVISION_SESSION_KEY] = revision
+        self.session.modified = True
+        return self
+
+    def load_stamp(self):
+        """Return the stamp the cart was last revalidated at, if any."""
+        return self.session.get(CART_VALIDATED_SESSION_KEY)
+
+    def save_stamp(self, stamp):
+        """Remember that the cart was revalidated at ``stamp``."""
+        self.session[CART_VALIDATED_SESSION_KEY] = stamp
+
+
+class CookieCartStore:
+    """Keep an anonymous cart in a signed cookie, outside the session."""
+
+    def __init__(self, request):
+        self.request = request
+
+    def load(self):
+        """Return ``(lines, revision)`` from the cookie, or an empty cart."""
+        value = self.request.COOKIES.get(cart_cookie_name())
+        if value:
+            try:
+                data = signing.loads(
+                    value,
+                    salt=_CART_COOKIE_SALT,
+                    serializer=CompactSessionSerializer,
+                    max_age=cart_cookie_age(),
+                )
+                return data["lines"], data["revision"]
+            except (signing.BadSignature, KeyError, TypeError, ValueError):
+                # Tampered, expired or unreadable: start a new cart.
+                pass
+        return {}, 0
+
+    def save(self, cart, revision):
+        """Sign the cart into the cookie, or promote it to the session."""
+        value = signing.dumps(
+            {"lines": cart, "revision": revision},
+            salt=_CART_COOKIE_SALT,
+            serializer=CompactSessionSerializer,
+            compress=True,
+        )
+        if len(value) > getattr(settings, "SHOP_CART_COOKIE_MAX_BYTES", 2048):
+            return self.promote(cart, revision)
+        setattr(self.request, CART_COOKIE_REQUEST_ATTR, value if cart else "")
+        return self
+
+    def load_stamp(self):
+        """Cookie carts aren't stamped, to keep them out of the session."""
+        return None
+
+    def save_stamp(self, stamp):
+        """Cookie carts aren't stamped, to keep them out of the session."""
+
+    def promote(self, cart, revision):
+        """Move the cart into the session and drop the cookie."""
+        setattr(self.request, CART_COOKIE_REQUEST_ATTR, "")
+        return SessionCartStore(self.request).save(cart, revision)
+
+
+def _merge_lines(into, lines):
+    """Add the quantities of cart ``lines`` to the cart lines ``into``."""
+    for product_id, line in lines.items():
+        if product_id in into:
+            into[product_id]["quantity"] += line["quantity"]
+        else:
+            into[product_id] = dict(line)
+
+
+def _select_store(request):
+    """Pick where the cart for ``request`` lives."""
+    if getattr(settings, "SHOP_CART_BACKEND", "session") != "cookie":
+        return SessionCartStore(request)
+    cookie_store = CookieCartStore(request)
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        if cart_cookie_name() in request.COOKIES:
+            # Signed in since the cart was started: carry it over.
+            cart, revision = cookie_store.load()
+            session_cart, session_revision = SessionCartStore(request).load()
+            if cart:
+                _merge_lines(cart, session_cart)
+                return cookie_store.promote(cart, max(revision, session_revision) + 1)
+            setattr(request, CART_COOKIE_REQUEST_ATTR, "")
+        return SessionCartStore(request)
+    if request.session.get(settings.CART_SESSION_ID):
+        # Already promoted because it outgrew the cookie.
+        return SessionCartStore(request)
+    return cookie_store
+
+
+class Cart:
+    """Session-based shopping cart that works for anonymous users."""
+
+    def __init__(self, request):
+        """Initialize cart from its store (the session by default)."""
+        self.request = request
+        self.store = _select_store(request)
+        self.cart, self.revision = self.store.load()
+        self._items = None
+        self._validated = None
 
     def add(self, product, quantity=1, override_quantity=False):
         """Add a product to the cart or update its quantity."""
@@ -36,8 +209,10 @@ class Cart:
         self.save()
 
     def save(self):
-        """Mark the session as modified to ensure it gets saved."""
-        self.session.modified = True
+        """Bump the cart revision and write the cart back to its store."""
+        self._items = None
+        self.revision += 1
+        self.store = self.store.save(self.cart, self.revision)
 
     def remove(self, product):
         """Remove a product from the cart."""
@@ -46,19 +221,129 @@ class Cart:
             del self.cart[product_id]
             self.save()
 
+    def get_items(self):
+        """Return the cart lines with their products loaded.
+
+        All products (and their stores and categories) are fetched in a
+        single query and the result is cached until the cart changes.
+        Each line is a new dict, so the session data is never modified.
+        Lines whose product no longer exists are skipped.
+        """
+        if self._items is None:
+            self._items = self._build_items(self._load_products())
+        return self._items
+
+    async def aget_items(self):
+        """Async ``get_items``: the products are read with the async ORM."""
+        if self._items is None:
+            products = await Product.objects.select_related(
+                "store", "category"
+            ).ain_bulk([int(product_id) for product_id in self.cart])
+            self._items = self._build_items(products)
+        return self._items
+
+    def _load_products(self):
+        return Product.objects.select_related("store", "category").in_bulk(
+            [int(product_id) for product_id in self.cart]
+        )
+
+    def _build_items(self, products):
+        items = []
+        for product_id, line in self.cart.items():
+            product = products.get(int(product_id))
+            if product is None:
+                continue
+            price = Decimal(line["price"])
+            items.append(
+                {
+                    "product": product,
+                    "quantity": line["quantity"],
+                    "price": price,
+                    "total_price": price * line["quantity"],
+                }
+            )
+        return items
+
+    def revalidate(self, force=False):
+        """Bring the cart lines in line with the catalog; return the changes.
+
+        Every product is re-read in one query, with the stock other
+        shoppers' checkouts hold subtracted (see ``shop.reservations``).
+        Lines for products that are gone, inactive or in an inactive store
+        are dropped, stored prices are refreshed, and quantities are cut
+        to the stock available. Returns a message per change (empty if
+        none).
+
+        The cart revision and catalog generation are stamped on the
+        session, so later calls skip the query until one of them moves,
+        unless ``force`` is true. Billing forces it: the stamp lives in an
+        evictable cache and isn't moved by writes that skip signals.
+        """
+        stamp = [self.revision, catalog_generation()]
+        if not force and stamp in (self._validated, self.store.load_stamp()):
+            return []
+        products = with_available(
+            Product.objects.select_related("store", "category"),
+            holder_key(self.request),
+        ).in_bulk([int(product_id) for product_id in self.cart])
+        changes = []
+        for product_id, line in list(self.cart.items()):
+            product = products.get(int(product_id))
+            if product is None:
+                del self.cart[product_id]
+                changes.append("An item is no longer available and was removed.")
+                continue
+            if not (product.is_active and product.store.is_active):
+                del self.cart[product_id]
+                changes.append(
+                    f"{product.name} is no longer available and was removed."
+                )
+                continue
+            available = max(0, product.available)
+            if line["quantity"] > available:
+                if not available:
+                    del self.cart[product_id]
+                    changes.append(f"{product.name} is out of stock and was removed.")
+                    continue
+                line["quantity"] = available
+                changes.append(
+                    f"Only {available} of {product.name} left; "
+                    "your cart was updated."
+                )
+            if Decimal(line["price"]) != product.price:
+                changes.append(
+                    f"The price of {product.name} changed from "
+                    f"${Decimal(line['price']):.2f} to ${product.price:.2f}."
+                )
+                line["price"] = str(product.price)
+        if changes:
+            self.save()
+            stamp[0] = self.revision
+        self._items = self._build_items(products)
+        self._validated = stamp
+        self.store.save_stamp(stamp)
+        return changes
+
+    def get_summary(self):
+        """Return the cart lines and totals used by cart pages and the API."""
+        total = self.get_total_price()
+        tax = total * TAX_RATE
+        return {
+            "cart": self,
+            "cart_items": self.get_items(),
+            "total": total,
+            "tax": tax,
+            "grand_total": total + tax,
+        }
+
+    async def aget_summary(self):
+        """Async ``get_summary``."""
+        await self.aget_items()
+        return self.get_summary()
+
     def __iter__(self):
-        """Iterate over cart items and get products from database."""
-        product_ids = self.cart.keys()
-        # Get products and add them to the cart
-        products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
-        for product in products:
-            cart[str(product.id)]["product"] = product
-
-        for item in cart.values():
-            item["price"] = Decimal(item["price"])
-            item["total_price"] = item["price"] * item["quantity"]
-            yield item
+        """Iterate over cart lines with their products loaded."""
+        return iter(self.get_items())
 
     def __len__(self):
         """Count all items in the cart."""
@@ -67,14 +352,117 @@ class Cart:
     def get_total_price(self):
         """Calculate total price of all items in cart."""
         return sum(
-            Decimal(item["price"]) * item["quantity"] for item in self.cart.values()
+            (Decimal(item["price"]) * item["quantity"] for item in self.cart.values()),
+            Decimal("0"),
         )
 
     def clear(self):
-        """Remove cart from session."""
-        del self.session[settings.CART_SESSION_ID]
+        """Empty the cart."""
+        self.cart = {}
         self.save()
 
     def get_item_count(self):
         """Get total number of items in cart."""
         return sum(item["quantity"] for item in self.cart.values())
+
+
+def merge_saved_cart(request, user):
+    """Fold ``request``'s session cart into ``user``'s saved cart and back.
+
+    Quantities of products in both are added up. The saved cart is written
+    with one bulk upsert and the session cart ends up holding every line.
+    """
+    cart = Cart(request)
+    if isinstance(cart.store, CookieCartStore):
+        # Signed-in shoppers keep their cart in the session.
+        cart.store = cart.store.promote(cart.cart, cart.revision)
+    setattr(request, _REQUEST_CART_ATTR, cart)
+    saved = dict(
+        CartItem.objects.filter(cart__user=user).values_list("product_id", "quantity")
+    )
+    if not cart.cart and not saved:
+        return
+    ids = {int(product_id) for product_id in cart.cart} | set(saved)
+    prices = dict(Product.objects.filter(pk__in=ids).values_list("pk", "price"))
+    merged = {
+        str(product_id): {"quantity": quantity, "price": str(prices[product_id])}
+        for product_id, quantity in saved.items()
+        if product_id in prices
+    }
+    # Lines for products that no longer exist are left to Cart.revalidate.
+    _merge_lines(merged, cart.cart)
+    new = [
+        CartItem(product_id=int(product_id), quantity=merged[product_id]["quantity"])
+        for product_id in cart.cart
+        if int(product_id) in prices
+    ]
+    if new:
+        saved_cart, _ = SavedCart.objects.get_or_create(user=user)
+        for item in new:
+            item.cart = saved_cart
+        CartItem.objects.bulk_create(
+            new,
+            update_conflicts=True,
+            unique_fields=["cart", "product"],
+            update_fields=["quantity"],
+        )
+        # The upsert skips the CartItem signals that keep the counters.
+        saved_cart.update_totals()
+    if merged != cart.cart:
+        cart.cart = merged
+        cart.save()
+
+
+def save_user_cart(request, user):
+    """Replace ``user``'s saved cart with ``request``'s session cart."""
+    lines = {
+        int(product_id): line["quantity"]
+        for product_id, line in Cart(request).cart.items()
+    }
+    stale = CartItem.objects.filter(cart__user=user).exclude(product_id__in=lines)
+    stale.delete()
+    if not lines:
+        return
+    saved_cart, _ = SavedCart.objects.get_or_create(user=user)
+    existing = Product.objects.filter(pk__in=lines).values_list("pk", flat=True)
+    CartItem.objects.bulk_create(
+        [
+            CartItem(cart=saved_cart, product_id=product_id, quantity=lines[product_id])
+            for product_id in existing
+        ],
+        update_conflicts=True,
+        unique_fields=["cart", "product"],
+        update_fields=["quantity"],
+    )
+    saved_cart.update_totals()
+
+
+def saved_cart_totals(user):
+    """Return the ``(items, price)`` counters of ``user``'s saved cart."""
+    totals = (
+        SavedCart.objects.filter(user=user)
+        .values_list("item_count", "subtotal")
+        .first()
+    )
+    return totals or (0, Decimal("0"))
+
+
+def merge_cart_on_login(sender, request, user, **kwargs):
+    """``user_logged_in`` receiver; see ``merge_saved_cart``.
+
+    Checkout holds made as a guest move to the user, so they don't turn
+    into another shopper's holds when the session key changes.
+    """
+    # pylint: disable=unused-argument
+    if request is not None and hasattr(request, "session"):
+        merge_saved_cart(request, user)
+        claim_holds(request, user)
+
+
+def save_cart_on_logout(sender, request, user, **kwargs):
+    """``user_logged_out`` receiver; see ``save_user_cart``."""
+    # pylint: disable=unused-argument
+    if request is not None and user is not None and hasattr(request, "session"):
+        save_user_cart(request, user)
+        # The session is about to be flushed; nothing will check out the holds.
+        release(request)
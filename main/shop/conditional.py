@@ -0,0 +1,145 @@
+"""ETag functions for conditional GETs on catalog pages and the cart API.
+
+Each function returns a cheap stamp for what the response would contain,
+so ``django.views.decorators.http.condition`` can answer ``304 Not
+Modified`` before the view runs its queries or renders a template.
+
+Catalog pages also show visitor state in the header (the signed-in user and
+the cart count), so page ETags combine the catalog stamp with the user id
+and the cart revision. No ETag is produced while flash messages
+are pending, because those are shown once and must not be replaced by a
+cached copy.
+
+Only ETags are used: a ``Last-Modified`` date cannot express a change to
+the visitor's cart or login state.
+"""
+
+# pylint: disable=no-member,unused-argument
+
+import hashlib
+
+from django.contrib.messages import get_messages  # type: ignore
+from django.db.models import Count, Max, Q  # type: ignore
+
+from .cache import CATALOG, catalog_generation, get_version
+from .cart import get_cart_revision
+from .invalidation import category_scope, product_scope, store_scope
+from .models import OrderItem, Product
+
+# Request attribute holding ``(pk, scopes)`` for the product page being served.
+_PRODUCT_SCOPES_ATTR = "_shop_product_scopes"
+# Request attribute holding ``(pk, bought)`` for the signed-in user.
+_PRODUCT_PURCHASED_ATTR = "_shop_product_purchased"
+
+
+def _make_etag(*parts):
+    raw = ":".join(str(part) for part in parts)
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def _visitor_etag(request, *stamps):
+    """Hash ``stamps`` together with the visitor state shown in the header."""
+    if len(get_messages(request)) > 0:
+        return None
+    return _make_etag(
+        request.user.pk if request.user.is_authenticated else "anon",
+        get_cart_revision(request),
+        *stamps,
+    )
+
+
+def product_list_etag(request):
+    """ETag for the product list, keyed on the catalog generation."""
+    return _visitor_etag(request, catalog_generation())
+
+
+def _purchase_stamp(user, pk):
+    """Whether ``user`` bought product ``pk``, as ``product_detail`` decides it.
+
+    Orders placed as a guest with the user's email count too.
+    """
+    bought = Q(order__buyer=user)
+    if user.email:
+        bought |= Q(order__guest_email__iexact=user.email)
+    return OrderItem.objects.filter(bought, product_id=pk).exists()
+
+
+def _product_scopes(pk, store_id, category_id) -> list:
+    # Related products are picked from the category; uncategorised products
+    # fall back to the catalog generation.
+    return [
+        product_scope(pk),
+        store_scope(store_id),
+        CATALOG if category_id is None else category_scope(category_id),
+    ]
+
+
+def product_page_scopes(request, pk) -> list:
+    """Return the invalidation scopes product ``pk``'s page depends on.
+
+    The product, its store and its category. ``product_detail_etag`` looks
+    them up with its stamps, so the page cache doesn't query them again.
+    """
+    remembered = getattr(request, _PRODUCT_SCOPES_ATTR, None)
+    if remembered is not None and remembered[0] == pk:
+        return remembered[1]
+    row = Product.objects.filter(pk=pk).values_list("store_id", "category_id").first()
+    return _product_scopes(pk, *row) if row else [product_scope(pk)]
+
+
+def product_purchased(request, pk) -> bool:
+    """Return whether the signed-in user bought product ``pk``.
+
+    ``product_detail_etag`` already checks this for its stamp, so the view
+    doesn't query it again.
+    """
+    remembered = getattr(request, _PRODUCT_PURCHASED_ATTR, None)
+    if remembered is not None and remembered[0] == pk:
+        return remembered[1]
+    return _purchase_stamp(request.user, pk)
+
+
+def product_detail_etag(request, pk):
+    """ETag for a product page.
+
+    Combines the latest change to the product, its store and reviews, the
+    versions of the page's invalidation scopes (related products come from
+    its category) and, for signed-in users, whether they bought it (the
+    review form depends on it).
+    """
+    row = (
+        Product.objects.filter(pk=pk, is_active=True)
+        .annotate(
+            review_count=Count("reviews"), reviews_updated=Max("reviews__updated_at")
+        )
+        .values_list(
+            "updated_at",
+            "store__updated_at",
+            "review_count",
+            "reviews_updated",
+            "store_id",
+            "category_id",
+        )
+        .first()
+    )
+    if row is None:
+        # Let the view raise its 404.
+        return None
+    scopes = _product_scopes(pk, *row[-2:])
+    setattr(request, _PRODUCT_SCOPES_ATTR, (pk, scopes))
+    stamps = row[:-2] + tuple(get_version(scope) for scope in scopes)
+    if request.user.is_authenticated:
+        bought = _purchase_stamp(request.user, pk)
+        setattr(request, _PRODUCT_PURCHASED_ATTR, (pk, bought))
+        stamps += (bought,)
+    return _visitor_etag(request, *stamps)
+
+
+def store_detail_etag(request, pk):
+    """ETag from the store's invalidation scope; needs no query."""
+    return _visitor_etag(request, get_version(store_scope(pk)))
+
+
+def cart_api_etag(request):
+    """ETag for the cart API: the cart revision plus the catalog generation."""
+    return _make_etag(get_cart_revision(request), catalog_generation())
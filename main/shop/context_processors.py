@@ -82,9 +82,11 @@ def auth_context(request):
 
     # Add cart items count (session-based) - available for all users
     try:
-        from .cart import Cart  # pylint: disable=import-outside-toplevel
+        from .cart import get_cart  # pylint: disable=import-outside-toplevel
 
-        cart = Cart(request)
+        # Shares the view's Cart instance so cart products are only
+        # loaded once per request.
+        cart = get_cart(request)
         context["cart_items_count"] = len(cart)
         context["cart_total"] = cart.get_total_price()
         context["cart_has_items"] = len(cart) > 0
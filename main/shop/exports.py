@@ -0,0 +1,141 @@
+"""Streaming order exports.
+
+Orders are exported one row per order line, with the order's own columns
+repeated on each line, as CSV or JSON Lines. Rows are read with
+``values_list(...).iterator(chunk_size=...)`` and written to a
+``StreamingHttpResponse`` one at a time, so memory stays flat however many
+orders match; on PostgreSQL the iterator uses a server-side cursor.
+"""
+
+import csv
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings  # type: ignore
+from django.db.models import F  # type: ignore
+from django.http import StreamingHttpResponse  # type: ignore
+from django.utils.dateparse import parse_date  # type: ignore
+
+from .models import OrderItem
+
+# (column name, OrderItem lookup) pairs, in output order. Only per-line
+# amounts are exported: an order's total includes other vendors' lines.
+# line_total has no lookup; it is quantity * price, computed per row.
+COLUMNS = (
+    ("order_id", "order__order_id"),
+    ("created_at", "order__created_at"),
+    ("status", "order__status"),
+    ("buyer", "order__buyer__username"),
+    ("guest_email", "order__guest_email"),
+    ("payment_method", "order__payment_method"),
+    ("store_id", "product__store_id"),
+    ("store", "product__store__name"),
+    ("product_id", "product_id"),
+    ("product", "product__name"),
+    ("quantity", "quantity"),
+    ("price", "price"),
+    ("line_total", None),
+)
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+
+class ExportError(ValueError):
+    """Raised for export parameters that can't be honoured."""
+
+
+def order_lines(orders=None, vendor=None, store=None, date_from=None, date_to=None):
+    """Return the order lines to export, oldest first.
+
+    ``orders`` limits the export to an Order queryset or list of pks;
+    ``vendor`` and ``store`` to lines for that vendor's or store's
+    products; ``date_from``/``date_to`` (inclusive dates) to orders placed
+    in that range.
+    """
+    lines = OrderItem.objects.all()
+    if orders is not None:
+        lines = lines.filter(order__in=orders)
+    if vendor is not None:
+        lines = lines.filter(product__store__vendor=vendor)
+    if store is not None:
+        lines = lines.filter(product__store=store)
+    if date_from is not None:
+        lines = lines.filter(order__created_at__date__gte=date_from)
+    if date_to is not None:
+        lines = lines.filter(order__created_at__date__lte=date_to)
+    return lines.order_by(F("order__created_at").asc(), "order_id", "pk")
+
+
+def filters_from_params(params) -> dict:
+    """Parse ``vendor``, ``store``, ``from`` and ``to`` request parameters."""
+    filters = {}
+    for name in ("vendor", "store"):
+        value = params.get(name)
+        if value:
+            try:
+                filters[name] = int(value)
+            except ValueError:
+                raise ExportError(f"Invalid {name}: {value!r}") from None
+    for name, key in (("from", "date_from"), ("to", "date_to")):
+        value = params.get(name)
+        if value:
+            try:
+                parsed = parse_date(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise ExportError(f"Invalid date for {name!r}: {value!r}")
+            filters[key] = parsed
+    return filters
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _rows(lines):
+    chunk_size = getattr(settings, "SHOP_EXPORT_CHUNK_SIZE", 2000)
+    lookups = [lookup for _, lookup in COLUMNS if lookup]
+    quantity, price = lookups.index("quantity"), lookups.index("price")
+    for row in lines.values_list(*lookups).iterator(chunk_size=chunk_size):
+        yield [_plain(value) for value in row] + [_plain(row[quantity] * row[price])]
+
+
+class _Echo:
+    """A file-like object whose ``write`` returns what it was given."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(lines):
+    """Yield the export as CSV text, header first."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in COLUMNS])
+    for row in _rows(lines):
+        yield writer.writerow(row)
+
+
+def jsonl_lines(lines):
+    """Yield the export as JSON Lines, one object per order line."""
+    names = [name for name, _ in COLUMNS]
+    for row in _rows(lines):
+        yield json.dumps(dict(zip(names, row))) + "\n"
+
+
+def stream_export(lines, fmt="csv", filename="orders"):
+    """Return a ``StreamingHttpResponse`` for ``lines`` in ``fmt``."""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown export format: {fmt!r}")
+    content = csv_lines(lines) if fmt == "csv" else jsonl_lines(lines)
+    response = StreamingHttpResponse(content, content_type=FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
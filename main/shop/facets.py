@@ -0,0 +1,150 @@
+"""Facet counts for the product list.
+
+``facet_counts`` groups the filtered products by category, store, price
+bucket and rating bucket in one ``GROUP BY`` query and folds the rows into
+per-facet counts in Python, so showing counts next to every filter option
+costs a single query however many options there are. The result is cached
+per filter spec (see ``shop.filters``) and catalog generation by
+``cached_facet_counts``.
+"""
+
+from collections import Counter
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.db.models import Avg, Case, Count, IntegerField, OuterRef  # type: ignore
+from django.db.models import Subquery, Value, When  # type: ignore
+
+from .cache import cached_queryset
+from .models import Review
+
+# Price buckets as (key, label, lower bound, upper bound); bounds are
+# inclusive below and exclusive above, ``None`` is open-ended.
+PRICE_BUCKETS = (
+    (0, "Under $25", None, Decimal("25")),
+    (1, "$25 to $50", Decimal("25"), Decimal("50")),
+    (2, "$50 to $100", Decimal("50"), Decimal("100")),
+    (3, "$100 & above", Decimal("100"), None),
+)
+
+# Rating buckets are the floor of the average rating (1-4, with 5 folded
+# into 4); unreviewed products fall in bucket 0 and are not offered.
+RATING_BUCKETS = (4, 3, 2, 1)
+
+
+def _price_bucket():
+    whens = []
+    for key, _label, _low, high in PRICE_BUCKETS:
+        if high is not None:
+            whens.append(When(price__lt=high, then=Value(key)))
+    return Case(
+        *whens, default=Value(PRICE_BUCKETS[-1][0]), output_field=IntegerField()
+    )
+
+
+def _rating_bucket():
+    average = Subquery(
+        Review.objects.filter(product=OuterRef("pk"))
+        .values("product")
+        .annotate(average=Avg("rating"))
+        .values("average")
+    )
+    whens = [When(average_rating__gte=low, then=Value(low)) for low in RATING_BUCKETS]
+    return average, Case(*whens, default=Value(0), output_field=IntegerField())
+
+
+def facet_counts(products) -> dict:
+    """Count ``products`` per category, store, price and rating bucket.
+
+    ``products`` is the filtered product queryset; it is only used as a
+    ``pk__in`` subquery, so the grouping runs on plain columns. Returns a dict of
+    ``{"category": {pk: n}, "store": {pk: n}, "price": {key: n},
+    "rating": {key: n}}`` where rating counts are cumulative ("4 & up").
+    """
+    average, rating_bucket = _rating_bucket()
+    rows = (
+        products.model.objects.filter(pk__in=products.values("pk"))
+        .annotate(average_rating=average)
+        .annotate(price_bucket=_price_bucket(), rating_bucket=rating_bucket)
+        .values("category_id", "store_id", "price_bucket", "rating_bucket")
+        .annotate(count=Count("pk"))
+        .order_by()
+    )
+    facets = {name: Counter() for name in ("category", "store", "price", "rating")}
+    for row in rows:
+        count = row["count"]
+        if row["category_id"] is not None:
+            facets["category"][row["category_id"]] += count
+        facets["store"][row["store_id"]] += count
+        facets["price"][row["price_bucket"]] += count
+        for low in RATING_BUCKETS:
+            if row["rating_bucket"] >= low:
+                facets["rating"][low] += count
+    return {name: dict(counter) for name, counter in facets.items()}
+
+
+def cached_facet_counts(spec) -> dict:
+    """Return the facet counts for ``spec`` (a ``ProductFilter``), cached."""
+    return cached_queryset("facets", lambda: facet_counts(spec.filter()), *spec.key())
+
+
+def _link(params, name, value) -> str:
+    query = {key: params.get(key) for key in params if key not in (name, "page")}
+    query[name] = value
+    return urlencode(query)
+
+
+def facet_options(params, counts, categories, stores) -> list:
+    """Build the facet groups the product list templates render.
+
+    Each group has a ``title`` and ``options``; each option is a dict with
+    ``label``, ``count``, ``selected`` and the ``query`` string that applies
+    it while keeping the other filters.
+    """
+
+    def options(name, objects):
+        current = params.get(name) or ""
+        return [
+            {
+                "label": obj.name,
+                "count": counts[name].get(obj.pk, 0),
+                "selected": current == str(obj.pk),
+                "query": _link(params, name, obj.pk),
+            }
+            for obj in objects
+            if counts[name].get(obj.pk) or current == str(obj.pk)
+        ]
+
+    price = []
+    for key, label, low, high in PRICE_BUCKETS:
+        if not counts["price"].get(key):
+            continue
+        query = {
+            k: params.get(k)
+            for k in params
+            if k not in ("min_price", "max_price", "page")
+        }
+        if low is not None:
+            query["min_price"] = low
+        if high is not None:
+            # The list filter is inclusive; stop just under the next bucket.
+            query["max_price"] = high - Decimal("0.01")
+        price.append(
+            {"label": label, "count": counts["price"][key], "query": urlencode(query)}
+        )
+
+    rating = [
+        {
+            "label": f"{low}★ & up",
+            "count": counts["rating"][low],
+            "query": _link(params, "min_rating", low),
+        }
+        for low in RATING_BUCKETS
+        if counts["rating"].get(low)
+    ]
+    return [
+        {"title": "Category", "options": options("category", categories)},
+        {"title": "Store", "options": options("store", stores)},
+        {"title": "Price", "options": price},
+        {"title": "Rating", "options": rating},
+    ]
@@ -0,0 +1,127 @@
+"""One filter pipeline for the product list and product search.
+
+``ProductFilter.from_params`` turns request parameters into a frozen,
+hashable spec, accepting the parameter names and sort keys both pages have
+used (``search``/``q``, ``price``/``price_low``, ...). Invalid values are
+dropped rather than raising, so a bad link still shows products.
+
+The spec builds the product queryset once (``filter`` for the bare
+filtered rows, ``queryset`` with the list annotations and ordering), and
+``key`` identifies it for caching: facet counts and the match count are
+cached per spec and catalog generation.
+"""
+
+from dataclasses import astuple, dataclass, replace
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from django.db.models import Avg, Count, Q  # type: ignore
+
+from .cache import cached_queryset
+from .models import Product
+
+# Canonical sort keys and their ordering; "-pk" keeps pages stable.
+SORTS = {
+    "newest": ("-created_at", "-pk"),
+    "name": ("name", "pk"),
+    "-name": ("-name", "-pk"),
+    "price": ("price", "pk"),
+    "-price": ("-price", "-pk"),
+    "rating": ("-avg_rating", "-pk"),
+}
+
+# Older spellings of the sort keys still found in links.
+SORT_ALIASES = {
+    "-created_at": "newest",
+    "price_low": "price",
+    "price_high": "-price",
+}
+
+
+def _decimal(value) -> Optional[Decimal]:
+    try:
+        number = Decimal(value)
+    except (InvalidOperation, TypeError):
+        return None
+    return number.normalize() if number.is_finite() else None
+
+
+def _int(value) -> Optional[int]:
+    # isdigit() alone accepts digits such as "²" that int() rejects.
+    value = str(value or "")
+    return int(value) if value.isascii() and value.isdigit() else None
+
+
+@dataclass(frozen=True)
+class ProductFilter:
+    """A normalized set of product list filters."""
+
+    search: str = ""
+    category: Optional[int] = None
+    store: Optional[int] = None
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
+    min_rating: Optional[int] = None
+    in_stock: bool = False
+    sort: str = "newest"
+
+    @classmethod
+    def from_params(cls, params, **defaults) -> "ProductFilter":
+        """Parse request parameters; ``defaults`` fill in what they omit."""
+        base = cls(**defaults)
+        search = (params.get("search") or params.get("q") or "").strip()
+        sort = (params.get("sort") or "").strip()
+        sort = SORT_ALIASES.get(sort, sort)
+        return replace(
+            base,
+            search=" ".join(search.split()).lower() or base.search,
+            category=_int(params.get("category")) or base.category,
+            store=_int(params.get("store")) or base.store,
+            min_price=_decimal(params.get("min_price")) or base.min_price,
+            max_price=_decimal(params.get("max_price")) or base.max_price,
+            min_rating=_int(params.get("min_rating")) or base.min_rating,
+            sort=sort if sort in SORTS else base.sort,
+        )
+
+    def key(self) -> tuple:
+        """Return a hashable key identifying the filtered rows."""
+        return astuple(replace(self, sort=""))
+
+    def filter(self):
+        """Return the matching active products, without annotations."""
+        products = Product.objects.filter(is_active=True)
+        if self.search:
+            products = products.filter(
+                Q(name__icontains=self.search)
+                | Q(description__icontains=self.search)
+                | Q(store__name__icontains=self.search)
+            )
+        if self.category is not None:
+            products = products.filter(category_id=self.category)
+        if self.store is not None:
+            products = products.filter(store_id=self.store)
+        if self.min_price is not None:
+            products = products.filter(price__gte=self.min_price)
+        if self.max_price is not None:
+            products = products.filter(price__lte=self.max_price)
+        if self.in_stock:
+            products = products.filter(quantity__gt=0)
+        if self.min_rating is not None:
+            rated = Product.objects.annotate(average=Avg("reviews__rating")).filter(
+                average__gte=self.min_rating
+            )
+            products = products.filter(pk__in=rated.values("pk"))
+        return products
+
+    def queryset(self):
+        """Return the matching products annotated and ordered for the list."""
+        return (
+            self.filter()
+            .select_related("store")
+            .annotate(review_count=Count("reviews"), avg_rating=Avg("reviews__rating"))
+            .order_by(*SORTS[self.sort])
+        )
+
+    def count(self) -> int:
+        """Return the number of matching products, cached per spec."""
+        return cached_queryset("product_count", self.filter().count, *self.key())
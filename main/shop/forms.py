@@ -8,6 +8,7 @@ store management, reviews, and checkout forms.
 from __future__ import annotations
 
 import logging
+import uuid
 
 from django import forms  # type: ignore
 from django.contrib.auth.forms import UserCreationForm  # type: ignore
@@ -218,6 +219,36 @@ class ProductForm(forms.ModelForm):
         self.fields["category"].required = False
 
 
+class ProductImportUploadForm(forms.Form):
+    """Form for uploading a bulk product import file."""
+
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={"class": "form-control"})
+    )
+    format = forms.ChoiceField(
+        choices=[("", "From file name"), ("csv", "CSV"), ("jsonl", "JSON Lines")],
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    dry_run = forms.BooleanField(
+        required=False, widget=forms.CheckboxInput(attrs={"class": "form-check-input"})
+    )
+
+    def clean(self):
+        """Work out the file format from the choice or the file name."""
+        cleaned_data = super().clean()
+        upload = cleaned_data.get("file")
+        if upload and not cleaned_data.get("format"):
+            name = upload.name.lower()
+            if name.endswith((".jsonl", ".ndjson")):
+                cleaned_data["format"] = "jsonl"
+            elif name.endswith(".csv"):
+                cleaned_data["format"] = "csv"
+            else:
+                raise forms.ValidationError("Choose a format for this file.")
+        return cleaned_data
+
+
 class ReviewForm(forms.ModelForm):
     """Form for creating and submitting product reviews and ratings."""
 
@@ -274,11 +305,16 @@ class CheckoutForm(forms.Form):
         widget=forms.Textarea(attrs={"rows": 4, "class": "form-control"}),
         help_text="Enter your complete shipping address",
     )
+    # One key per rendered form, so resubmitting it can't order twice.
+    idempotency_key = forms.CharField(
+        max_length=64, required=False, widget=forms.HiddenInput
+    )
 
     def __init__(self, *args, **kwargs):
         """Initialize form and pre-fill with user's address if available."""
         user = kwargs.pop("user", None)
         super().__init__(*args, **kwargs)
+        self.fields["idempotency_key"].initial = uuid.uuid4().hex
         if user and hasattr(user, "profile") and user.profile.address:
             self.fields["shipping_address"].initial = user.profile.address
         if user and user.is_authenticated:
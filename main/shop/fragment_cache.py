@@ -0,0 +1,58 @@
+"""Template fragment caching for catalog markup.
+
+Fragments are stored in the shop cache under a key built from the
+fragment name, a per-name version number and the values the fragment
+varies on (typically an object id and its ``updated_at``). Model signals
+bump the version of every fragment that depends on the changed model
+(see ``shop.signals`` and ``shop.invalidation``), which invalidates all of
+its cached copies at once without scanning keys.
+
+Set ``SHOP_FRAGMENT_CACHE_ENABLED = False`` (or the environment variable
+``SHOP_FRAGMENT_CACHE=0``) to render every fragment live while debugging
+templates.
+"""
+
+import hashlib
+
+from django.conf import settings  # type: ignore
+
+from .cache import get_version
+from .invalidation import mark_changed
+
+# Fragment names used by the templates.
+PRODUCT_CARD = "product_card"
+CATEGORY_GRID = "category_grid"
+NAV_MENU = "nav_menu"
+
+_FRAGMENT_KEY = "shop:fragment:{name}:{version}:{digest}"
+
+
+def fragment_cache_enabled() -> bool:
+    """Return True unless fragment caching is switched off in settings."""
+    return getattr(settings, "SHOP_FRAGMENT_CACHE_ENABLED", True)
+
+
+def fragment_cache_timeout() -> int:
+    """Return how long a rendered fragment stays cached, in seconds."""
+    return getattr(settings, "SHOP_FRAGMENT_CACHE_TIMEOUT", 600)
+
+
+def get_fragment_version(name: str) -> int:
+    """Return the current version number for fragment ``name``."""
+    return get_version(f"fragment:{name}")
+
+
+def invalidate_fragments(*names: str) -> None:
+    """Bump the version of each named fragment, orphaning cached copies.
+
+    The bump goes through the invalidation bus, so it happens once the
+    current transaction commits.
+    """
+    mark_changed(*(f"fragment:{name}" for name in names))
+
+
+def make_fragment_key(name: str, version: int, vary_on) -> str:
+    """Build the cache key for one rendering of fragment ``name``."""
+    raw = ":".join(str(value) for value in vary_on)
+    digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    return _FRAGMENT_KEY.format(name=name, version=version, digest=digest)
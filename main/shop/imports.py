@@ -0,0 +1,250 @@
+"""Bulk product import for vendors.
+
+Rows are read from a CSV or JSON Lines file one at a time (``read_rows``)
+and imported into a store in chunks (``import_products``):
+
+* each row is validated with ``ProductImportForm``, which applies the
+  ``ProductForm`` rules but resolves ``category`` (a name or id) from one
+  lookup table built up front instead of a query per row;
+* existing products are matched by ``id`` or, failing that, by name within
+  the store, with two queries per chunk;
+* rows that would change nothing are skipped; the rest of each chunk is
+  written with ``bulk_create`` and ``bulk_update`` in its own short
+  transaction, so a bad row never holds up or rolls back the rest.
+
+Bulk writes skip model signals, so the touched cache scopes are marked
+changed explicitly (see ``shop.invalidation``).
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+
+from django import forms  # type: ignore
+from django.conf import settings  # type: ignore
+from django.db import transaction  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from .forms import ProductForm
+from .invalidation import catalog_scopes, category_scope, mark_changed, product_scope
+from .models import Cart, Category, Product
+
+# Columns an import file may have; ``name``, ``description`` and ``price``
+# are required, as in ``ProductForm``.
+COLUMNS = ("id", "name", "category", "description", "price", "quantity")
+
+# Fields written when an existing product is updated.
+UPDATE_FIELDS = ["name", "category", "description", "price", "quantity", "updated_at"]
+
+# Products per UPDATE statement when existing products are written.
+UPDATE_BATCH_SIZE = 100
+
+
+class ImportFileError(ValueError):
+    """Raised when an import file can't be read at all."""
+
+
+class ProductImportForm(ProductForm):
+    """``ProductForm`` for one import row, without per-row queries."""
+
+    category = forms.CharField(required=False)
+
+    class Meta(ProductForm.Meta):
+        fields = ["name", "category", "description", "price", "quantity"]
+
+    def __init__(self, *args, categories=None, **kwargs):
+        self.categories = categories or {}
+        super().__init__(*args, **kwargs)
+        self.fields["quantity"].required = False
+
+    def clean_quantity(self):
+        quantity = self.cleaned_data.get("quantity")
+        return 0 if quantity is None else quantity
+
+    def _get_validation_exclusions(self):
+        # The category comes from the lookup table; model validation would
+        # check it exists with one query per row.
+        return super()._get_validation_exclusions() | {"category"}
+
+    def clean_category(self):
+        value = (self.cleaned_data.get("category") or "").strip()
+        if not value:
+            return None
+        category = self.categories.get(value.casefold())
+        if category is None:
+            raise forms.ValidationError(f"Unknown category: {value}")
+        return category
+
+
+def category_table() -> dict:
+    """Map category names (casefolded) and ids to categories, in one query."""
+    table = {}
+    for category in Category.objects.all():
+        table[category.name.casefold()] = category
+        table[str(category.pk)] = category
+    return table
+
+
+def read_rows(stream, fmt="csv"):
+    """Yield ``(line number, row dict)`` pairs from a binary or text stream."""
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        if not reader.fieldnames or "name" not in reader.fieldnames:
+            raise ImportFileError("The CSV file needs a header row with a name column.")
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield number, exc
+                continue
+            yield number, (
+                row
+                if isinstance(row, dict)
+                else ValueError("Each line must be a JSON object.")
+            )
+    else:
+        raise ImportFileError(f"Unknown import format: {fmt!r}")
+
+
+@dataclass
+class ImportResult:
+    """What an import did, plus the errors of the rows it skipped."""
+
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: list = field(default_factory=list)  # (line number, message) pairs
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def import_products(store, rows, chunk_size=None, dry_run=False) -> ImportResult:
+    """Import ``rows`` (from ``read_rows``) into ``store``.
+
+    With ``dry_run`` every row is validated and matched but nothing is
+    written.
+    """
+    chunk_size = chunk_size or getattr(settings, "SHOP_IMPORT_CHUNK_SIZE", 500)
+    result = ImportResult()
+    categories = category_table()
+    seen = set()
+    chunk = []
+    for number, row in rows:
+        chunk.append((number, row))
+        if len(chunk) >= chunk_size:
+            _import_chunk(store, chunk, categories, seen, result, dry_run)
+            chunk = []
+    if chunk:
+        _import_chunk(store, chunk, categories, seen, result, dry_run)
+    return result
+
+
+def _validate(number, row, categories, seen, result):
+    """Return ``(product id, cleaned data)`` for a valid row, else None."""
+    if isinstance(row, Exception):
+        result.errors.append((number, str(row)))
+        return None
+    data = {name: row.get(name) for name in COLUMNS}
+    data = {name: "" if value is None else str(value) for name, value in data.items()}
+    form = ProductImportForm(data, categories=categories)
+    if not form.is_valid():
+        message = "; ".join(
+            f"{name}: {' '.join(errors)}" for name, errors in form.errors.items()
+        )
+        result.errors.append((number, message))
+        return None
+    raw_id = data["id"].strip()
+    try:
+        product_id = int(raw_id) if raw_id else None
+    except ValueError:
+        result.errors.append((number, f"id: not a number: {raw_id}"))
+        return None
+    key = ("id", product_id) if product_id else ("name", form.cleaned_data["name"])
+    if key in seen:
+        result.errors.append((number, f"Duplicate row for {key[1]}."))
+        return None
+    seen.add(key)
+    return product_id, dict(form.cleaned_data)
+
+
+def _is_unchanged(product, data) -> bool:
+    """Return True if writing ``data`` to ``product`` would change nothing.
+
+    The category is compared by id, so the product's own category is never
+    loaded.
+    """
+    for name, value in data.items():
+        if name == "category":
+            current, value = product.category_id, value.pk if value else None
+        else:
+            current = getattr(product, name)
+        if current != value:
+            return False
+    return True
+
+
+def _import_chunk(store, chunk, categories, seen, result, dry_run):
+    valid = []
+    for number, row in chunk:
+        cleaned = _validate(number, row, categories, seen, result)
+        if cleaned is not None:
+            valid.append((number, *cleaned))
+
+    products = store.products.all()
+    ids = [product_id for _, product_id, _ in valid if product_id]
+    by_id = products.in_bulk(ids) if ids else {}
+    names = [data["name"] for _, product_id, data in valid if not product_id]
+    by_name = {p.name: p for p in products.filter(name__in=names)} if names else {}
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    left = set()  # categories updated products are moving out of
+    for number, product_id, data in valid:
+        if product_id:
+            product = by_id.get(product_id)
+            if product is None:
+                result.errors.append((number, f"id: no product {product_id} here."))
+                continue
+        else:
+            product = by_name.get(data["name"])
+        if product is None:
+            to_create.append(Product(store=store, **data))
+            continue
+        if _is_unchanged(product, data):
+            result.unchanged += 1
+            continue
+        left.add(product.category_id)
+        for name, value in data.items():
+            setattr(product, name, value)
+        product.updated_at = now
+        to_update.append(product)
+
+    if not dry_run and (to_create or to_update):
+        with transaction.atomic():
+            Product.objects.bulk_create(to_create)
+            Product.objects.bulk_update(
+                to_update, UPDATE_FIELDS, batch_size=UPDATE_BATCH_SIZE
+            )
+            if to_update:
+                # bulk_update skips the signal that recounts saved carts.
+                Cart.refresh_totals(Cart.objects.filter(items__product__in=to_update))
+            category_ids = {p.category_id for p in to_create + to_update} | left
+            mark_changed(
+                *catalog_scopes(store_id=store.pk),
+                *(category_scope(pk) for pk in category_ids if pk),
+                *(product_scope(p.pk) for p in to_update),
+            )
+    result.created += len(to_create)
+    result.updated += len(to_update)
@@ -0,0 +1,88 @@
+"""Signal-driven cache invalidation bus.
+
+Cached data is keyed on version counters kept in the cache (see
+``shop.cache``). Instead of deleting keys, a change bumps the counters of
+every scope it affects:
+
+* ``CATALOG`` - anything shown in catalog listings (the global scope);
+* ``store_scope(pk)``, ``category_scope(pk)``, ``product_scope(pk)`` - one
+  store, category or product and whatever lists it.
+
+Caching layers include the versions of the scopes they depend on in their
+keys, so one increment retires every entry at once.
+
+``mark_changed`` collects scopes for the current transaction and bumps each
+of them once after it commits (``transaction.on_commit``). A rolled-back
+transaction leaves its scopes pending; they are bumped with the next commit,
+which can only invalidate too much, never too little. The model signal
+handlers that call it live in ``shop.signals``.
+"""
+
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction  # type: ignore
+
+from .cache import CATALOG, bump_versions
+
+_local = threading.local()
+
+
+def store_scope(pk) -> str:
+    """Return the version name for store ``pk``."""
+    return f"store:{pk}"
+
+
+def category_scope(pk) -> str:
+    """Return the version name for category ``pk``."""
+    return f"category:{pk}"
+
+
+def product_scope(pk) -> str:
+    """Return the version name for product ``pk``."""
+    return f"product:{pk}"
+
+
+def _pending() -> set:
+    pending = getattr(_local, "scopes", None)
+    if pending is None:
+        pending = _local.scopes = set()
+    return pending
+
+
+def flush() -> None:
+    """Bump every pending scope now."""
+    pending = _pending()
+    if pending:
+        scopes = sorted(pending)
+        pending.clear()
+        bump_versions(*scopes)
+
+
+def mark_changed(*scopes, using=DEFAULT_DB_ALIAS) -> None:
+    """Bump ``scopes`` once the current transaction on ``using`` commits.
+
+    Outside a transaction the scopes are bumped immediately.
+    """
+    scopes = {scope for scope in scopes if scope}
+    if not scopes:
+        return
+    _pending().update(scopes)
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        flush()
+        return
+    # The first flush after commit bumps everything pending; the rest find
+    # nothing to do, so each scope is bumped once per transaction.
+    transaction.on_commit(flush, using=using)
+
+
+def catalog_scopes(store_id=None, category_id=None, product_id=None) -> list:
+    """Return the global scope plus the given store/category/product scopes."""
+    scopes = [CATALOG]
+    if store_id is not None:
+        scopes.append(store_scope(store_id))
+    if category_id is not None:
+        scopes.append(category_scope(category_id))
+    if product_id is not None:
+        scopes.append(product_scope(product_id))
+    return scopes
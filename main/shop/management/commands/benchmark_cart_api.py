@@ -0,0 +1,141 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from main.shop.models import Product
+
+# Session engines that keep rows in django_session.
+DB_SESSION_ENGINES = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare cart API throughput under concurrent clients: the sync view "
+        "through the WSGI handler (one thread per client) against the async "
+        "view through the ASGI handler (one task per client, one event loop). "
+        "Requests run in-process, so this measures the handlers, not the "
+        "network or a particular server. Needs products in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=20,
+            help="Concurrent clients, each with its own cart (default 20).",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=25,
+            help="Cart API requests per client (default 25).",
+        )
+        parser.add_argument(
+            "--lines",
+            type=int,
+            default=3,
+            help="Cart lines per client (default 3).",
+        )
+
+    def handle(self, *args, **options):
+        self.clients = max(1, int(options.get("clients") or 1))
+        self.requests = max(1, int(options.get("requests") or 1))
+        lines = max(1, int(options.get("lines") or 1))
+        self.products = list(
+            Product.objects.filter(is_active=True, quantity__gt=0).values_list(
+                "pk", flat=True
+            )[:lines]
+        )
+        if not self.products:
+            raise CommandError("No products in stock; run create_sample_data first.")
+        self.host = next(
+            (
+                host
+                for host in settings.ALLOWED_HOSTS
+                if host and "*" not in host and not host.startswith(".")
+            ),
+            "localhost",
+        )
+        self.session_keys = []
+
+        self.stdout.write(
+            f"{self.clients} clients x {self.requests} requests, "
+            f"{len(self.products)} cart line(s) each"
+        )
+        try:
+            results = [
+                ("WSGI, sync view", self.run_wsgi()),
+                ("ASGI, async view", asyncio.run(self.run_asgi())),
+            ]
+        finally:
+            if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+                Session.objects.filter(session_key__in=self.session_keys).delete()
+
+        total = self.clients * self.requests
+        baseline = results[0][1]
+        for label, seconds in results:
+            speedup = baseline / seconds if seconds else 0.0
+            self.stdout.write(
+                f"  {label:<18} {total / seconds:9.1f} req/s  "
+                f"{seconds * 1000 / self.requests:8.2f} ms/request per client  "
+                f"({speedup:4.2f}x WSGI)"
+            )
+
+    def add_url(self, pk):
+        return reverse("shop:add_to_cart", args=[pk])
+
+    def run_wsgi(self):
+        """Return the seconds all sync clients took to finish polling."""
+        clients = []
+        for _ in range(self.clients):
+            client = Client(headers={"host": self.host})
+            for pk in self.products:
+                client.post(self.add_url(pk), {"quantity": 1})
+            self.session_keys.append(client.session.session_key)
+            clients.append(client)
+        url = reverse("shop:cart_api")
+
+        def poll(client):
+            try:
+                for _ in range(self.requests):
+                    client.get(url)
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.clients) as pool:
+            list(pool.map(poll, clients))
+        return time.perf_counter() - started
+
+    async def run_asgi(self):
+        """Return the seconds all async clients took to finish polling."""
+        clients = []
+        for _ in range(self.clients):
+            client = AsyncClient(headers={"host": self.host})
+            for pk in self.products:
+                await client.post(self.add_url(pk), {"quantity": 1})
+            clients.append(client)
+        url = reverse("shop:cart_api_async")
+
+        async def poll(client):
+            for _ in range(self.requests):
+                await client.get(url)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(poll(client) for client in clients))
+        seconds = time.perf_counter() - started
+        for client in clients:
+            key = client.cookies.get(settings.SESSION_COOKIE_NAME)
+            if key:
+                self.session_keys.append(key.value)
+        return seconds
@@ -0,0 +1,104 @@
+import json
+import timeit
+
+from django.contrib.messages import constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.session import SessionStorage
+from django.core import signing
+from django.core.management.base import BaseCommand
+from django.core.signing import JSONSerializer
+
+from main.shop.utils.serializers import CompactSessionSerializer, PickleSerializer
+
+SERIALIZERS = {
+    "pickle": PickleSerializer,
+    "json": JSONSerializer,
+    "compact": CompactSessionSerializer,
+}
+
+
+def _auth():
+    return {
+        "_auth_user_id": "42",
+        "_auth_user_backend": "django.contrib.auth.backends.ModelBackend",
+        "_auth_user_hash": "5f1c3ad3e0b1c2f97c1d8f2a0b34c4e6d1a0f9b27b8c9d0e1f2a3b4c5d6e7f80",
+    }
+
+
+def _cart(lines):
+    return {
+        str(1000 + i): {"quantity": 1 + i % 4, "price": f"{9 + i}.{i % 100:02d}"}
+        for i in range(lines)
+    }
+
+
+def _messages():
+    # SessionStorage keeps messages as a JSON string; reuse its encoder.
+    storage = SessionStorage.__new__(SessionStorage)
+    return storage.serialize_messages(
+        [
+            Message(constants.SUCCESS, "Added Prayer Flags to your cart."),
+            Message(constants.INFO, "Free shipping on orders over $50."),
+        ]
+    )
+
+
+def sample_sessions():
+    """Return representative session payloads keyed by name."""
+    return {
+        "anonymous, empty cart": {"cart": {}},
+        "anonymous, 3-line cart": {"cart": _cart(3), "cart_revision": 3},
+        "signed in, 3-line cart + messages": {
+            **_auth(),
+            "cart": _cart(3),
+            "cart_revision": 5,
+            "_messages": _messages(),
+        },
+        "signed in, 40-line cart": {**_auth(), "cart": _cart(40), "cart_revision": 40},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare encode/decode time and stored size of the session serializers "
+        "(pickle, Django's JSON and the compact binary format)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=5000,
+            help="Round trips per payload and serializer (default 5000).",
+        )
+
+    def handle(self, *args, **options):
+        iterations = max(1, int(options.get("iterations") or 1))
+        salt = "django.contrib.sessions.SessionStore"
+
+        for name, payload in sample_sessions().items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(
+                f"  {'serializer':<10} {'encode us':>10} {'decode us':>10} "
+                f"{'raw bytes':>10} {'stored':>8}"
+            )
+            for label, serializer_class in SERIALIZERS.items():
+                serializer = serializer_class()
+                raw = serializer.dumps(payload)
+                # Round-trip check so a broken format can't look fast.
+                if json.dumps(serializer.loads(raw), sort_keys=True) != json.dumps(
+                    payload, sort_keys=True
+                ):
+                    self.stderr.write(f"  {label}: round trip changed the data")
+                encode = timeit.timeit(
+                    lambda: serializer.dumps(payload), number=iterations
+                )
+                decode = timeit.timeit(lambda: serializer.loads(raw), number=iterations)
+                # What the DB session backend actually stores.
+                stored = signing.dumps(
+                    payload, salt=salt, serializer=serializer_class, compress=True
+                )
+                self.stdout.write(
+                    f"  {label:<10} {encode / iterations * 1e6:>10.2f} "
+                    f"{decode / iterations * 1e6:>10.2f} {len(raw):>10} {len(stored):>8}"
+                )
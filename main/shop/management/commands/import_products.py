@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.shop.imports import ImportFileError, import_products, read_rows
+from main.shop.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import products into a store from a CSV or JSON Lines file. Rows "
+        "are streamed, validated like the product form and written in chunks, "
+        "one short transaction per chunk; invalid rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON Lines file to import.")
+        parser.add_argument(
+            "--store", type=int, required=True, help="Id of the store to import into."
+        )
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="File format (default: from the file extension).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=0,
+            help="Rows per chunk (default SHOP_IMPORT_CHUNK_SIZE).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            dest="dry_run",
+            help="Validate and match rows without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options.get("format") or (
+            "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+        )
+        try:
+            store = Store.objects.get(pk=options["store"])
+        except Store.DoesNotExist as exc:
+            raise CommandError(f"No store with id {options['store']}.") from exc
+
+        started = time.perf_counter()
+        try:
+            with open(path, "rb") as stream:
+                result = import_products(
+                    store,
+                    read_rows(stream, fmt),
+                    chunk_size=options.get("chunk_size") or None,
+                    dry_run=options.get("dry_run"),
+                )
+        except (OSError, ImportFileError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc)) from exc
+        elapsed = time.perf_counter() - started
+
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        prefix = "Dry run: would have created" if options.get("dry_run") else "Created"
+        summary = (
+            f"{prefix} {result.created} and updated {result.updated} product(s), "
+            f"{result.unchanged} unchanged, skipped {len(result.errors)} row(s) "
+            f"in {elapsed:.2f}s."
+        )
+        self.stdout.write(
+            self.style.SUCCESS(summary) if result.ok else self.style.WARNING(summary)
+        )
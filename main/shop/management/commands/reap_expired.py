@@ -0,0 +1,108 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from main.shop.models import PasswordResetToken, StockReservation
+
+# Session engines that keep rows in django_session.
+DB_SESSION_ENGINES = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions, used or expired password reset tokens and "
+        "expired stock reservations in small batches, pausing between "
+        "batches so no long locks are held. "
+        "Meant to run periodically, e.g. hourly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows deleted per batch (default 1000).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.1,
+            help="Seconds to pause between batches (default 0.1).",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=0,
+            help="Stop each table after N batches (0 = until done).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            dest="dry_run",
+            help="Only count the rows that would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = max(1, int(options.get("batch_size") or 1))
+        self.pause = max(0.0, float(options.get("sleep") or 0))
+        self.max_batches = int(options.get("max_batches") or 0)
+        dry_run = options.get("dry_run")
+        now = timezone.now()
+
+        targets = [
+            (
+                "password reset tokens",
+                PasswordResetToken.objects.filter(
+                    Q(is_used=True) | Q(expires_at__lt=now)
+                ),
+            ),
+            (
+                "stock reservations",
+                StockReservation.objects.filter(expires_at__lt=now),
+            ),
+        ]
+        if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+            targets.insert(0, ("sessions", Session.objects.filter(expire_date__lt=now)))
+        else:
+            self.stdout.write(
+                "Skipping sessions: SESSION_ENGINE does not store them in the database."
+            )
+
+        total = 0
+        for label, queryset in targets:
+            if dry_run:
+                self.stdout.write(f"Would delete {queryset.count()} {label}.")
+                continue
+            deleted, batches = self.reap(queryset)
+            total += deleted
+            self.stdout.write(f"Deleted {deleted} {label} in {batches} batch(es).")
+
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Reclaimed {total} rows."))
+
+    def reap(self, queryset):
+        """Delete ``queryset`` in primary-key batches; return (rows, batches)."""
+        model = queryset.model
+        pk_name = model._meta.pk.name
+        deleted = batches = 0
+        while not self.max_batches or batches < self.max_batches:
+            pks = list(queryset.values_list(pk_name, flat=True)[: self.batch_size])
+            if not pks:
+                break
+            # Each batch is its own short statement (autocommit), so locks
+            # are released before the pause.
+            count, _ = model.objects.filter(**{f"{pk_name}__in": pks}).delete()
+            deleted += count
+            batches += 1
+            if len(pks) < self.batch_size:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+        return deleted, batches
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:12
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_item_count(apps, schema_editor):
+    """Populate item_count for existing orders in a single UPDATE."""
+    Order = apps.get_model("shop", "Order")
+    OrderItem = apps.get_model("shop", "OrderItem")
+    totals = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .values("order")
+        .annotate(n=Sum("quantity"))
+        .values("n")
+    )
+    Order.objects.update(item_count=Coalesce(Subquery(totals), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shop", "0003_order_guest_email_order_guest_name_alter_order_buyer_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_item_count, migrations.RunPython.noop),
+    ]
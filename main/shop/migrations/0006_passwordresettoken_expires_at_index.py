@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0005_category_updated_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="passwordresettoken",
+            name="expires_at",
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
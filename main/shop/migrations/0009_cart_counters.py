@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:05
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_cart_counters(apps, schema_editor):
+    """Populate item_count and subtotal for existing carts in a single UPDATE."""
+    Cart = apps.get_model("shop", "Cart")
+    CartItem = apps.get_model("shop", "CartItem")
+    items = CartItem.objects.filter(cart=OuterRef("pk")).order_by().values("cart")
+    price = DecimalField(max_digits=12, decimal_places=2)
+    Cart.objects.update(
+        item_count=Coalesce(Subquery(items.annotate(n=Sum("quantity")).values("n")), 0),
+        subtotal=Coalesce(
+            Subquery(
+                items.annotate(
+                    total=Sum(F("quantity") * F("product__price"), output_field=price)
+                ).values("total")
+            ),
+            Value(Decimal("0")),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shop", "0008_order_idempotency_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="subtotal",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0"), max_digits=12
+            ),
+        ),
+        migrations.RunPython(backfill_cart_counters, migrations.RunPython.noop),
+    ]
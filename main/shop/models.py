@@ -17,12 +17,21 @@ This module contains all the database models including:
 
 import uuid
 import sys
+from decimal import Decimal
 
 from django.contrib.auth import get_user_model  # type: ignore
 
-from django.db import models  # type: ignore
-from django.db.models import Avg  # type: ignore
-from django.db.models.signals import post_save  # type: ignore
+from django.db import models, transaction  # type: ignore
+from django.db.models import (  # type: ignore
+    Avg,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce  # type: ignore
+from django.db.models.signals import post_delete, post_save  # type: ignore
 from django.dispatch import receiver  # type: ignore
 from django.urls import reverse  # type: ignore
 from django.utils import timezone  # type: ignore
@@ -62,6 +71,7 @@ names = [
     "Product",
     "Cart",
     "CartItem",
+    "StockReservation",
     "Order",
     "OrderItem",
     "Review",
@@ -81,6 +91,7 @@ if (
         "Product",
         "Cart",
         "CartItem",
+        "StockReservation",
         "Order",
         "OrderItem",
         "Review",
@@ -93,7 +104,13 @@ if (
             # best-effort: skip missing symbols
             pass
     # Also copy any signal handlers or helpers if present (assign dynamically)
-    for helper in ("create_user_profile", "save_user_profile"):
+    for helper in (
+        "create_user_profile",
+        "save_user_profile",
+        "count_cart_item",
+        "uncount_cart_item",
+        "recount_carts_for_price",
+    ):
         try:
             globals()[helper] = getattr(_existing_shop_models, helper)
         except Exception:
@@ -168,6 +185,7 @@ if not _SKIP:
         name = models.CharField(max_length=100, unique=True)
         description = models.TextField(blank=True)
         created_at = models.DateTimeField(auto_now_add=True)
+        updated_at = models.DateTimeField(auto_now=True)
 
         def __str__(self) -> str:
             return str(self.name)
@@ -246,6 +264,12 @@ if not _SKIP:
             so they can render star icons using comparisons like
             ``forloop.counter <= product.average_rating``.
             """
+            # Views that list many products annotate ``avg_rating`` on the
+            # queryset; reuse it so templates don't run one aggregate per
+            # card.
+            if "avg_rating" in self.__dict__:
+                avg = self.__dict__["avg_rating"] or 0
+                return int(round(avg)) if avg else 0
             try:
                 agg = self.reviews.aggregate(avg=Avg("rating"))
                 avg = agg.get("avg") or 0
@@ -254,6 +278,13 @@ if not _SKIP:
             except Exception:
                 return 0
 
+        @classmethod
+        def from_db(cls, db, field_names, values):
+            """Remember the stored price, so a save can tell it was changed."""
+            instance = super().from_db(db, field_names, values)
+            instance._stored_price = instance.__dict__.get("price")
+            return instance
+
         class Meta:
             """Meta configuration for Product model."""
 
@@ -264,6 +295,13 @@ if not _SKIP:
         """Shopping cart model"""
 
         user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="cart")
+        # Denormalized totals over the cart's items, kept current by the
+        # CartItem signal handlers below so badges and dashboards read one
+        # row. Bulk writes must call ``refresh_totals`` themselves.
+        item_count = models.PositiveIntegerField(default=0)
+        subtotal = models.DecimalField(
+            max_digits=12, decimal_places=2, default=Decimal("0")
+        )
         created_at = models.DateTimeField(auto_now_add=True)
         updated_at = models.DateTimeField(auto_now=True)
 
@@ -273,14 +311,41 @@ if not _SKIP:
         @property
         def total_items(self) -> int:
             """Total number of items in cart."""
-            # pylint: disable=no-member
-            return sum(item.quantity for item in self.items.all())
+            return self.item_count
 
         @property
-        def total_price(self) -> float:
+        def total_price(self) -> Decimal:
             """Total price of all items in cart."""
+            return self.subtotal
+
+        @classmethod
+        def refresh_totals(cls, carts) -> None:
+            """Recompute the totals of the ``carts`` queryset in one UPDATE."""
             # pylint: disable=no-member
-            return sum(item.total_price for item in self.items.all())
+            items = (
+                CartItem.objects.filter(cart=OuterRef("pk")).order_by().values("cart")
+            )
+            carts.update(
+                item_count=Coalesce(
+                    Subquery(items.annotate(n=Sum("quantity")).values("n")), 0
+                ),
+                subtotal=Coalesce(
+                    Subquery(
+                        items.annotate(
+                            total=Sum(
+                                F("quantity") * F("product__price"),
+                                output_field=cls._meta.get_field("subtotal"),
+                            )
+                        ).values("total")
+                    ),
+                    Value(Decimal("0")),
+                ),
+            )
+
+        def update_totals(self) -> None:
+            """Recompute this cart's totals from its items and reload them."""
+            type(self).refresh_totals(type(self).objects.filter(pk=self.pk))
+            self.refresh_from_db(fields=["item_count", "subtotal"])
 
         class Meta:
             """Meta configuration for Cart model."""
@@ -304,12 +369,49 @@ if not _SKIP:
             # pylint: disable=no-member
             return self.product.price * self.quantity
 
+        def save(self, *args, **kwargs) -> None:
+            """Save and recount the cart's counters in one transaction."""
+            with transaction.atomic(using=kwargs.get("using")):
+                super().save(*args, **kwargs)
+
         class Meta:
             """Meta configuration for CartItem model."""
 
             app_label = "shop"
             unique_together = ("cart", "product")
 
+    class StockReservation(models.Model):
+        """Stock held for a shopper's cart while they check out.
+
+        Reservations expire on their own; see ``shop.reservations``.
+        """
+
+        product = models.ForeignKey(
+            Product, on_delete=models.CASCADE, related_name="reservations"
+        )
+        quantity = models.PositiveIntegerField()
+        # The holder: the session key, or "user:<pk>" for signed-in shoppers.
+        session_key = models.CharField(max_length=40, db_index=True)
+        user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+        created_at = models.DateTimeField(auto_now_add=True)
+        # Indexed for the reap_expired cleanup command.
+        expires_at = models.DateTimeField(db_index=True)
+
+        def __str__(self) -> str:
+            # pylint: disable=no-member
+            return f"{self.quantity} x {self.product.name} until {self.expires_at}"
+
+        class Meta:
+            """Meta configuration for StockReservation model."""
+
+            app_label = "shop"
+            indexes = [
+                # Active holds per product, summed by availability checks.
+                models.Index(
+                    fields=["product", "expires_at"], name="shop_reservation_active"
+                ),
+            ]
+
     class Order(models.Model):
         """Customer order model"""
 
@@ -337,6 +439,14 @@ if not _SKIP:
         total_amount = models.DecimalField(max_digits=10, decimal_places=2)
         shipping_address = models.TextField()
         payment_method = models.CharField(max_length=50, default="cod")
+        # Denormalized total quantity across the order lines so listings
+        # can show item counts without touching OrderItem.
+        item_count = models.PositiveIntegerField(default=0)
+        # Key sent with the checkout form; a replayed submission finds the
+        # order it already placed instead of placing another.
+        idempotency_key = models.CharField(
+            max_length=64, unique=True, null=True, blank=True, editable=False
+        )
         created_at = models.DateTimeField(auto_now_add=True)
         updated_at = models.DateTimeField(auto_now=True)
 
@@ -346,6 +456,12 @@ if not _SKIP:
                 self.order_id = f"ORD-{uuid.uuid4().hex[:8].upper()}"
             super().save(*args, **kwargs)
 
+        def update_item_count(self) -> None:
+            """Recompute ``item_count`` from the order lines and persist it."""
+            # pylint: disable=no-member
+            self.item_count = self.items.aggregate(n=Sum("quantity"))["n"] or 0
+            type(self).objects.filter(pk=self.pk).update(item_count=self.item_count)
+
         def __str__(self) -> str:
             return f"Order {self.order_id}"
 
@@ -406,7 +522,8 @@ if not _SKIP:
         user = models.ForeignKey(User, on_delete=models.CASCADE)
         token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
         created_at = models.DateTimeField(auto_now_add=True)
-        expires_at = models.DateTimeField()
+        # Indexed for the reap_expired cleanup command.
+        expires_at = models.DateTimeField(db_index=True)
         is_used = models.BooleanField(default=False)
 
         def save(self, *args, **kwargs) -> None:
@@ -447,3 +564,32 @@ if not _SKIP:
         else:
             # Ensure profile exists
             Profile.objects.get_or_create(user=instance, defaults={"role": "buyer"})
+
+    @receiver(post_save, sender=CartItem)
+    def count_cart_item(sender, instance, **kwargs) -> None:
+        # pylint: disable=unused-argument
+        """Recount the cart of an added or changed item from its rows.
+
+        Recomputing instead of adding the change keeps the counters exact
+        when two stale copies of an item are saved; it runs in the item's
+        save transaction.
+        """
+        Cart.refresh_totals(Cart.objects.filter(pk=instance.cart_id))
+
+    @receiver(post_delete, sender=CartItem)
+    def uncount_cart_item(sender, instance, **kwargs) -> None:
+        # pylint: disable=unused-argument
+        """Recount the cart of a removed item from its remaining rows."""
+        Cart.refresh_totals(Cart.objects.filter(pk=instance.cart_id))
+
+    @receiver(post_save, sender=Product)
+    def recount_carts_for_price(sender, instance, created, update_fields, **kwargs):
+        # pylint: disable=unused-argument
+        """Carts holding a product are worth more or less when it's repriced."""
+        if created or (update_fields is not None and "price" not in update_fields):
+            return
+        stored = getattr(instance, "_stored_price", None)
+        instance._stored_price = instance.price
+        if stored is not None and stored == instance.price:
+            return
+        Cart.refresh_totals(Cart.objects.filter(items__product=instance))
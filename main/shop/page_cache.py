@@ -0,0 +1,138 @@
+"""Full-page caching of catalog pages for anonymous visitors.
+
+For an anonymous GET, ``home``, ``product_list``, ``store_detail`` and
+``product_detail`` depend only on the URL and the catalog, so the rendered
+HTML is cached under a key built from the path, the sorted query string
+and the version of the invalidation scopes the page depends on: the
+catalog generation (``shop.cache.CATALOG``) by default, or e.g. a single
+store's scope for its store page. Model signals bump those versions when
+catalog data changes (see ``shop.invalidation``), which retires the
+affected pages at once.
+
+Two parts of a page are per-visitor and are re-rendered on every hit:
+
+* the header cart link, which ``base.html`` wraps in ``CART_BADGE_START``
+  / ``CART_BADGE_END`` markers, and
+* CSRF tokens in forms, which are swapped for the current visitor's token.
+
+Pages are never cached or served from the cache while flash messages are
+pending. Set ``SHOP_PAGE_CACHE_ENABLED = False`` (or the environment
+variable ``SHOP_PAGE_CACHE=0``) to turn the cache off.
+"""
+
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings  # type: ignore
+from django.contrib.messages import get_messages  # type: ignore
+from django.http import HttpResponse  # type: ignore
+from django.middleware.csrf import get_token  # type: ignore
+from django.template.loader import render_to_string  # type: ignore
+
+from .cache import CATALOG, get_cache, get_version, record
+from .cart import get_cart
+
+CART_BADGE_START = "<!--shop:cart-badge-->"
+CART_BADGE_END = "<!--/shop:cart-badge-->"
+CART_BADGE_TEMPLATE = "shop/includes/cart_badge.html"
+
+_PAGE_KEY = "shop:page:{version}:{digest}"
+_CART_BADGE_RE = re.compile(
+    re.escape(CART_BADGE_START) + ".*?" + re.escape(CART_BADGE_END), re.DOTALL
+)
+_CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def page_cache_enabled() -> bool:
+    """Return True unless full-page caching is switched off in settings."""
+    return getattr(settings, "SHOP_PAGE_CACHE_ENABLED", True)
+
+
+def page_cache_timeout() -> int:
+    """Return how long a cached page is kept, in seconds."""
+    return getattr(settings, "SHOP_PAGE_CACHE_TIMEOUT", 300)
+
+
+def make_page_key(request, scopes=(CATALOG,)) -> str:
+    """Build the cache key for ``request`` at the current ``scopes`` versions."""
+    query = sorted(request.GET.lists())
+    raw = f"{request.path}?{query!r}"
+    digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    version = "-".join(str(get_version(scope)) for scope in scopes)
+    return _PAGE_KEY.format(version=version, digest=digest)
+
+
+def _is_cacheable_request(request) -> bool:
+    return (
+        page_cache_enabled()
+        and request.method in ("GET", "HEAD")
+        and not request.user.is_authenticated
+        and len(get_messages(request)) == 0
+    )
+
+
+def _is_cacheable_response(response) -> bool:
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not response.has_header("Cache-Control")
+    )
+
+
+def _personalize(request, content: str) -> str:
+    """Fill the per-visitor parts of a cached page for ``request``."""
+    badge = render_to_string(
+        CART_BADGE_TEMPLATE, {"cart_items_count": len(get_cart(request))}
+    )
+    content = _CART_BADGE_RE.sub(
+        lambda _match: CART_BADGE_START + badge + CART_BADGE_END, content
+    )
+    if _CSRF_INPUT_RE.search(content):
+        token = get_token(request)
+        content = _CSRF_INPUT_RE.sub(
+            lambda match: match.group(1) + token + match.group(2), content
+        )
+    return content
+
+
+def cache_anonymous_page(view_func=None, *, scopes=None):
+    """Serve anonymous GETs of a catalog view from the page cache.
+
+    Pages are keyed on the catalog generation unless ``scopes`` is given:
+    a callable taking the view's arguments and returning the invalidation
+    scopes (see ``shop.invalidation``) the page depends on.
+    """
+    if view_func is None:
+        return lambda func: cache_anonymous_page(func, scopes=scopes)
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        if scopes is None:
+            key = make_page_key(request)
+        else:
+            key = make_page_key(request, scopes(request, *args, **kwargs))
+        cache = get_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            record("page", "hit")
+            content_type, content = cached
+            return HttpResponse(
+                _personalize(request, content), content_type=content_type
+            )
+
+        record("page", "miss")
+        response = view_func(request, *args, **kwargs)
+        if _is_cacheable_response(response):
+            cache.set(
+                key,
+                (response["Content-Type"], response.content.decode(response.charset)),
+                page_cache_timeout(),
+            )
+        return response
+
+    return _wrapped_view
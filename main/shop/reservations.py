@@ -0,0 +1,172 @@
+"""Short-lived stock reservations for carts in checkout.
+
+When a shopper opens the checkout page their cart's quantities are held
+for ``SHOP_RESERVATION_TTL`` seconds (``reserve_cart``). While a hold is
+active other shoppers see ``quantity - held`` as available
+(``available_quantities``), so they are turned away at the cart instead of
+at the end of checkout. Holds belong to the signed-in user, or to the
+session for guests; signing in moves a guest's holds to the user
+(``claim_holds``). Placing the order or signing out releases them
+(``release``) and ``reap_expired`` deletes the ones that ran out.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum  # type: ignore
+from django.db.models.functions import Coalesce  # type: ignore
+from django.utils import timezone  # type: ignore
+
+from .models import Product, StockReservation
+
+# Session key recording when the shopper's holds run out.
+RESERVATION_SESSION_KEY = "reserved_until"
+# Session key recording the holder the holds were filed under; login()
+# gives the session a new key, so a guest's holds are found through it.
+RESERVATION_HOLDER_SESSION_KEY = "reserved_by"
+
+
+def reservation_ttl() -> timedelta:
+    """Return how long a checkout hold lasts."""
+    return timedelta(seconds=getattr(settings, "SHOP_RESERVATION_TTL", 600))
+
+
+def user_holder_key(user) -> str:
+    """Return the key holds of signed-in ``user`` are filed under."""
+    return f"user:{user.pk}"
+
+
+def holder_key(request, create=False):
+    """Return the key holds for ``request`` are filed under.
+
+    That is the user's key when signed in (it survives the session key
+    changing on login and logout), otherwise the session key. Returns None
+    if a guest has no session yet, unless ``create`` is true, in which case
+    the session is saved to get a key.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user_holder_key(user)
+    session = request.session
+    if session.session_key is None and create:
+        session.save()
+    return session.session_key
+
+
+def active_reservations(now=None):
+    """Return the reservations that haven't expired."""
+    return StockReservation.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def with_available(queryset, holder=None):
+    """Annotate ``available`` on a Product queryset: stock not held by others.
+
+    Holds filed under ``holder`` count as available; the value can go below
+    zero if stock was sold after the holds were made.
+    """
+    held = active_reservations().filter(product=OuterRef("pk"))
+    if holder:
+        held = held.exclude(session_key=holder)
+    held = held.order_by().values("product").annotate(n=Sum("quantity")).values("n")
+    return queryset.annotate(
+        available=F("quantity")
+        - Coalesce(Subquery(held), 0, output_field=IntegerField())
+    )
+
+
+def _availability(product_ids, holder=None):
+    """Return ``(product id, available)`` rows; see ``available_quantities``."""
+    return with_available(
+        Product.objects.filter(pk__in=list(product_ids)).order_by("pk"), holder
+    ).values_list("pk", "available")
+
+
+def available_quantities(product_ids, holder=None, lock=False) -> dict:
+    """Map each product id to the stock not held by other shoppers.
+
+    One query: the active holds are summed in a subquery over the
+    ``(product, expires_at)`` index. Holds filed under ``holder`` count as
+    available to that holder. With ``lock`` the product rows are locked
+    until the transaction ends.
+    """
+    rows = _availability(product_ids, holder)
+    if lock:
+        rows = rows.select_for_update(of=("self",))
+    return {pk: max(0, available) for pk, available in rows}
+
+
+async def aavailable_quantities(product_ids, holder=None) -> dict:
+    """Async ``available_quantities``, without locking."""
+    return {
+        pk: max(0, available)
+        async for pk, available in _availability(product_ids, holder)
+    }
+
+
+def reserve_cart(request, cart) -> list:
+    """Hold the stock for every line of ``cart``.
+
+    Replaces the holder's earlier holds. If some lines can't be met
+    nothing is held and ``(product, available)`` pairs for those lines
+    are returned; otherwise the list is empty.
+    """
+    items = list(cart)
+    holder = holder_key(request, create=True)
+    with transaction.atomic():
+        # Always: a signed-in user's other sessions file under the same key.
+        StockReservation.objects.filter(session_key=holder).delete()
+        available = available_quantities(
+            [item["product"].pk for item in items], holder=holder, lock=True
+        )
+        short = [
+            (item["product"], available.get(item["product"].pk, 0))
+            for item in items
+            if item["quantity"] > available.get(item["product"].pk, 0)
+        ]
+        if short or not items:
+            request.session.pop(RESERVATION_SESSION_KEY, None)
+            request.session.pop(RESERVATION_HOLDER_SESSION_KEY, None)
+            return short
+        expires_at = timezone.now() + reservation_ttl()
+        user = request.user if request.user.is_authenticated else None
+        StockReservation.objects.bulk_create(
+            StockReservation(
+                product=item["product"],
+                quantity=item["quantity"],
+                session_key=holder,
+                user=user,
+                expires_at=expires_at,
+            )
+            for item in items
+        )
+    request.session[RESERVATION_SESSION_KEY] = expires_at.isoformat()
+    request.session[RESERVATION_HOLDER_SESSION_KEY] = holder
+    return []
+
+
+def claim_holds(request, user) -> None:
+    """Move the holds made before ``user`` signed in over to them.
+
+    They replace any holds the user already had, as a new ``reserve_cart``
+    would. Called on login, after the session got its new key.
+    """
+    previous = request.session.get(RESERVATION_HOLDER_SESSION_KEY)
+    holder = user_holder_key(user)
+    if not previous or previous == holder:
+        return
+    with transaction.atomic():
+        StockReservation.objects.filter(session_key=holder).delete()
+        StockReservation.objects.filter(session_key=previous).update(
+            session_key=holder, user=user
+        )
+    request.session[RESERVATION_HOLDER_SESSION_KEY] = holder
+
+
+def release(request) -> None:
+    """Drop ``request``'s holds, e.g. once the order exists."""
+    holder = holder_key(request)
+    if holder:
+        StockReservation.objects.filter(session_key=holder).delete()
+    request.session.pop(RESERVATION_SESSION_KEY, None)
+    request.session.pop(RESERVATION_HOLDER_SESSION_KEY, None)
@@ -5,11 +5,14 @@ moved into the `shop` package to group related code together.
 
 import logging
 
+from django.conf import settings  # type: ignore
 from django.contrib import messages  # type: ignore
 from django.shortcuts import redirect  # type: ignore
 from django.utils import timezone  # type: ignore
 from django.utils.deprecation import MiddlewareMixin  # type: ignore
 
+from .cart import CART_COOKIE_REQUEST_ATTR, cart_cookie_age, cart_cookie_name
+
 logger = logging.getLogger(__name__)
 
 
@@ -181,3 +184,25 @@ class UserActivityMiddleware(MiddlewareMixin):
                 # Log full traceback.
                 logger.exception("Error updating user activity")
         return _response
+
+
+class CartCookieMiddleware(MiddlewareMixin):
+    """Write the anonymous cart cookie prepared by ``shop.cart``."""
+
+    def process_response(self, request, response):
+        """Set or delete the signed cart cookie if the cart changed."""
+        value = getattr(request, CART_COOKIE_REQUEST_ATTR, None)
+        if value is None:
+            return response
+        if value:
+            response.set_cookie(
+                cart_cookie_name(),
+                value,
+                max_age=cart_cookie_age(),
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        else:
+            response.delete_cookie(cart_cookie_name(), samesite="Lax")
+        return response
@@ -0,0 +1,76 @@
+"""Signal handlers that keep cached catalog fragments and pages fresh.
+
+Every handler reports the invalidation scopes a change affects to
+``shop.invalidation``, which bumps them once per transaction after it
+commits. Connected from ``ShopConfig.ready``.
+"""
+
+# pylint: disable=unused-argument,no-member
+
+from django.db.models.signals import post_delete, post_save, pre_save  # type: ignore
+from django.dispatch import receiver  # type: ignore
+
+from .fragment_cache import CATEGORY_GRID, PRODUCT_CARD, invalidate_fragments
+from .invalidation import catalog_scopes, mark_changed, product_scope
+from .models import Category, OrderItem, Product, Review, Store
+
+# Attribute holding a product's store and category before an update, so a
+# product moved elsewhere also invalidates where it used to be listed.
+_PREVIOUS_SCOPE_ATTR = "_shop_previous_scope_ids"
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def invalidate_store(sender, instance, using, **kwargs) -> None:
+    """Product cards show the store name and status."""
+    invalidate_fragments(PRODUCT_CARD)
+    mark_changed(*catalog_scopes(store_id=instance.pk), using=using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category(sender, instance, using, **kwargs) -> None:
+    """The category grid lists categories; the navigation menu doesn't."""
+    invalidate_fragments(CATEGORY_GRID)
+    mark_changed(*catalog_scopes(category_id=instance.pk), using=using)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_scope(sender, instance, update_fields=None, **kwargs) -> None:
+    """Record the store and category an existing product is leaving."""
+    if instance.pk is None:
+        return
+    if update_fields is not None and not {"store", "category"} & set(update_fields):
+        return
+    setattr(
+        instance,
+        _PREVIOUS_SCOPE_ATTR,
+        sender.objects.filter(pk=instance.pk)
+        .values_list("store_id", "category_id")
+        .first(),
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product(sender, instance, using, **kwargs) -> None:
+    """Listings, the product's store and category pages, and the product."""
+    scopes = catalog_scopes(instance.store_id, instance.category_id, instance.pk)
+    previous = getattr(instance, _PREVIOUS_SCOPE_ATTR, None)
+    if previous is not None:
+        scopes += catalog_scopes(*previous)
+    mark_changed(*scopes, using=using)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review(sender, instance, using, **kwargs) -> None:
+    """Ratings appear in listings and on the product page."""
+    mark_changed(*catalog_scopes(product_id=instance.product_id), using=using)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_order_item(sender, instance, using, **kwargs) -> None:
+    """Purchases change what the product page offers its buyers."""
+    mark_changed(product_scope(instance.product_id), using=using)
@@ -0,0 +1,72 @@
+"""
+Template tag for caching catalog fragments.
+
+Usage in templates:
+    {% load shop_cache %}
+    {% fragment_cache "product_card" product.pk product.updated_at %}
+        ...expensive markup...
+    {% endfragment_cache %}
+
+Keep anything user-specific (CSRF tokens, cart state) outside the block.
+"""
+
+from django import template
+
+from ..cache import get_cache, record
+from ..fragment_cache import (
+    fragment_cache_enabled,
+    fragment_cache_timeout,
+    get_fragment_version,
+    make_fragment_key,
+)
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    """Render the wrapped nodelist once and serve it from the cache."""
+
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        if not fragment_cache_enabled():
+            return self.nodelist.render(context)
+
+        name = self.name.resolve(context)
+        # Look the version up once per template render, not once per
+        # fragment: a product grid renders many cards with the same name.
+        versions = context.render_context.setdefault(self, {})
+        if name not in versions:
+            versions[name] = get_fragment_version(name)
+
+        vary_on = [value.resolve(context) for value in self.vary_on]
+        key = make_fragment_key(name, versions[name], vary_on)
+        cache = get_cache()
+        content = cache.get(key)
+        if content is None:
+            record(f"fragment:{name}", "miss")
+            content = self.nodelist.render(context)
+            cache.set(key, content, fragment_cache_timeout())
+        else:
+            record(f"fragment:{name}", "hit")
+        return content
+
+
+@register.tag("fragment_cache")
+def do_fragment_cache(parser, token):
+    """Parse ``{% fragment_cache name [vary_on ...] %}``."""
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least a fragment name."
+        )
+    nodelist = parser.parse(("endfragment_cache",))
+    parser.delete_first_token()
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[2:]],
+    )
@@ -0,0 +1,89 @@
+"""Query-count tests for the shop admin changelists."""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.models import Cart, CartItem, Category, Order, OrderItem, Product, Store
+
+User = get_user_model()
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Cart and order changelists run a fixed number of queries per page."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="changelistadmin", password="x", email="a@example.com"
+        )
+        vendor = User.objects.create_user(username="changelistvendor", password="x")
+        store = Store.objects.create(vendor=vendor, name="Admin", description="d")
+        category = Category.objects.create(name="Admin Category")
+        self.products = [
+            Product.objects.create(
+                store=store,
+                category=category,
+                name=f"Admin Product {i}",
+                description="d",
+                price=Decimal("2.50"),
+                quantity=10,
+            )
+            for i in range(3)
+        ]
+        self.rows = 0
+        self.client.force_login(self.admin)
+
+    def grow(self, rows):
+        """Add carts and orders (each with every product) up to ``rows``."""
+        users = User.objects.bulk_create(
+            User(username=f"shopper{i}") for i in range(self.rows, rows)
+        )
+        carts = Cart.objects.bulk_create(Cart(user=user) for user in users)
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product=product, quantity=2)
+            for cart in carts
+            for product in self.products
+        )
+        Cart.refresh_totals(Cart.objects.filter(pk__in=[cart.pk for cart in carts]))
+        orders = [
+            Order.objects.create(
+                buyer=user, total_amount=Decimal("15.00"), shipping_address="a"
+            )
+            for user in users
+        ]
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=2, price=product.price)
+            for order in orders
+            for product in self.products
+        )
+        self.rows = rows
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url):
+        self.grow(10)
+        _, small = self.count_queries(url)
+        self.grow(100)
+        response, large = self.count_queries(url)
+        self.assertEqual(response.context["cl"].result_count, 100)
+        self.assertEqual(small, large)
+        return response
+
+    def test_cart_changelist(self):
+        response = self.assertConstantQueries(reverse("admin:shop_cart_changelist"))
+        self.assertContains(response, "$15.00")
+        cart = response.context["cl"].result_list[0]
+        self.assertEqual(cart.item_count, 6)
+
+    def test_order_changelist(self):
+        response = self.assertConstantQueries(reverse("admin:shop_order_changelist"))
+        order = response.context["cl"].result_list[0]
+        self.assertEqual(order.annotated_line_count, 3)
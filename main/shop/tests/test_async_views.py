@@ -0,0 +1,71 @@
+"""Tests for the async cart endpoints."""
+
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from shop.models import Product, Store
+
+User = get_user_model()
+
+
+class AsyncCartViewTests(TestCase):
+    """The async cart API and update match their sync counterparts."""
+
+    def setUp(self):
+        vendor = User.objects.create_user(username="asyncvendor", password="x")
+        store = Store.objects.create(vendor=vendor, name="Async", description="d")
+        self.product = Product.objects.create(
+            store=store, name="Bowl", description="d", price=Decimal("6.00"), quantity=4
+        )
+
+    async def add(self, quantity):
+        await self.async_client.post(
+            reverse("shop:add_to_cart", args=[self.product.pk]),
+            {"quantity": quantity},
+        )
+
+    async def update(self, body):
+        response = await self.async_client.post(
+            reverse("shop:cart_update_async"), body, content_type="application/json"
+        )
+        return response.status_code, response.json()
+
+    async def test_cart_api_returns_the_cart_with_an_etag(self):
+        await self.add(2)
+        response = await self.async_client.get(reverse("shop:cart_api_async"))
+        data = response.json()
+        self.assertEqual(data["items_count"], 1)
+        self.assertEqual(data["items"][0]["quantity"], 2)
+        self.assertEqual(data["total"], "12.00")
+
+        cached = await self.async_client.get(
+            reverse("shop:cart_api_async"), headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(cached.status_code, 304)
+        await self.add(1)
+        changed = await self.async_client.get(
+            reverse("shop:cart_api_async"), headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(changed.json()["items"][0]["quantity"], 3)
+
+    async def test_cart_update_sets_and_removes_lines(self):
+        pk = self.product.pk
+        status, data = await self.update(json.dumps({"product_id": pk, "quantity": 3}))
+        self.assertEqual((status, data["cart_count"]), (200, 3))
+        self.assertEqual(data["total_price"], "18.00")
+        status, data = await self.update(json.dumps({"product_id": pk, "quantity": 5}))
+        self.assertEqual(data, {"success": False, "error": "Only 4 items available"})
+        status, data = await self.update(json.dumps({"product_id": pk, "quantity": 0}))
+        self.assertEqual(data["cart_count"], 0)
+
+    async def test_cart_update_rejects_bad_requests(self):
+        status, _ = await self.update("not json")
+        self.assertEqual(status, 400)
+        status, _ = await self.update(json.dumps({"product_id": 999, "quantity": 1}))
+        self.assertEqual(status, 404)
+        response = await self.async_client.get(reverse("shop:cart_update_async"))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,90 @@
+"""Tests for the search autocomplete prefix index and endpoint."""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from shop.autocomplete import PrefixIndex, reset_index, suggest
+from shop.cache import get_cache
+from shop.models import Category, Product, Store
+
+User = get_user_model()
+
+
+class PrefixIndexTests(TestCase):
+    """The index matches word prefixes and ranks label prefixes first."""
+
+    def setUp(self):
+        self.index = PrefixIndex(
+            [
+                ("product", "Green Tea", "/p/1/"),
+                ("product", "Teapot", "/p/2/"),
+                ("category", "Tea", "/c/1/"),
+                ("store", "Café Himalaya", "/s/1/"),
+            ]
+        )
+
+    def labels(self, query, limit=8):
+        return [s["label"] for s in self.index.search(query, limit)]
+
+    def test_matches_any_word_prefix(self):
+        self.assertEqual(self.labels("te"), ["Tea", "Teapot", "Green Tea"])
+        self.assertEqual(self.labels("TE", limit=1), ["Tea"])
+        self.assertEqual(self.labels("cafe h"), ["Café Himalaya"])
+
+    def test_earlier_words_must_match_in_full(self):
+        self.assertEqual(self.labels("green t"), ["Green Tea"])
+        self.assertEqual(self.labels("gree tea"), [])
+        self.assertEqual(self.labels("  "), [])
+
+
+class AutocompleteEndpointTests(TestCase):
+    """The endpoint answers from memory and follows catalog changes."""
+
+    def setUp(self):
+        get_cache().clear()
+        reset_index()
+        vendor = User.objects.create_user(username="acvendor", password="x")
+        self.store = Store.objects.create(
+            vendor=vendor, name="Yak Store", description="d"
+        )
+        self.category = Category.objects.create(name="Yak Wool")
+        Product.objects.create(
+            store=self.store,
+            category=self.category,
+            name="Yak Cheese",
+            description="d",
+            price=Decimal("5.00"),
+            quantity=3,
+        )
+
+    def test_returns_suggestions_without_queries_once_built(self):
+        url = reverse("shop:search_autocomplete")
+        self.client.get(url, {"q": "ya"})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"q": "ya", "limit": "2"})
+        data = response.json()
+        self.assertEqual(data["query"], "ya")
+        self.assertEqual(
+            [(s["type"], s["label"]) for s in data["suggestions"]],
+            [("category", "Yak Wool"), ("store", "Yak Store")],
+        )
+        self.assertEqual(
+            data["suggestions"][1]["url"],
+            reverse("shop:store_detail", args=[self.store.pk]),
+        )
+
+    def test_catalog_change_rebuilds_the_index(self):
+        self.assertEqual([s["label"] for s in suggest("butter")], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                store=self.store,
+                category=self.category,
+                name="Yak Butter",
+                description="d",
+                price=Decimal("4.00"),
+                quantity=3,
+            )
+        self.assertEqual([s["label"] for s in suggest("butter")], ["Yak Butter"])
@@ -0,0 +1,109 @@
+"""Tests for the vendor bulk price and stock update API."""
+
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.cache import CATALOG, get_cache, get_version
+from shop.models import Category, Product, Store
+
+User = get_user_model()
+
+
+class ProductBulkUpdateTests(TestCase):
+    """Vendors update many products in one request, all or nothing."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.vendor = self.make_vendor("bulkvendor")
+        store = Store.objects.create(vendor=self.vendor, name="Bulk", description="d")
+        other = Store.objects.create(
+            vendor=self.make_vendor("otherbulk"), name="Other", description="d"
+        )
+        category = Category.objects.create(name="Bulk")
+        self.products = [
+            Product.objects.create(
+                store=store,
+                category=category,
+                name=f"Bulk {i}",
+                description="d",
+                price=Decimal("5.00"),
+                quantity=10,
+            )
+            for i in range(3)
+        ]
+        self.foreign = Product.objects.create(
+            store=other, name="Foreign", description="d", price=Decimal("1.00")
+        )
+        self.url = reverse("shop:product_bulk_update")
+        self.client.force_login(self.vendor)
+
+    def make_vendor(self, username):
+        user = User.objects.create_user(username=username, password="x")
+        user.profile.role = "vendor"
+        user.profile.save()
+        return user
+
+    def post(self, changes):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                self.url, json.dumps(changes), content_type="application/json"
+            )
+
+    def test_applies_only_changed_fields_once(self):
+        first, second, third = self.products
+        before = get_version(CATALOG)
+        response = self.post(
+            [
+                {"id": first.pk, "price": "6.50"},
+                {"id": second.pk, "quantity": 0, "is_active": False},
+                {"id": third.pk, "price": "5.00"},
+            ]
+        )
+        self.assertEqual(response.json(), {"updated": 2, "unchanged": 1})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.price, Decimal("6.50"))
+        self.assertEqual(first.quantity, 10)
+        self.assertEqual((second.quantity, second.is_active), (0, False))
+        self.assertEqual(get_version(CATALOG), before + 1)
+
+    def test_invalid_batch_writes_nothing(self):
+        response = self.post(
+            [
+                {"id": self.products[0].pk, "price": "7.00"},
+                {"id": self.foreign.pk, "price": "0.50"},
+                {"id": self.products[1].pk, "quantity": -1},
+                {"id": self.products[2].pk},
+                {"id": self.products[0].pk, "price": "8.00"},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.json()["errors"]], [1, 2, 3, 4])
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].price, Decimal("5.00"))
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def count(quantity, products):
+            changes = [{"id": p.pk, "quantity": quantity} for p in products]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.post(changes).status_code, 200)
+            return len(ctx.captured_queries)
+
+        count(1, self.products)  # settle the session
+        self.assertEqual(count(2, self.products[:1]), count(3, self.products))
+
+    def test_requires_vendor_and_json(self):
+        self.assertEqual(
+            self.client.post(
+                self.url, "nope", content_type="application/json"
+            ).status_code,
+            400,
+        )
+        self.client.logout()
+        self.assertEqual(self.post([]).status_code, 401)
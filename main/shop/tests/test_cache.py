@@ -0,0 +1,86 @@
+"""Tests for the shop cache helpers."""
+
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from shop.cache import (
+    CATALOG,
+    bump_versions,
+    cached_queryset,
+    get_cache,
+    get_cache_stats,
+    get_version,
+    make_key,
+    reset_cache_stats,
+)
+from shop.models import Category
+
+
+class CachedQuerysetTests(TestCase):
+    """cached_queryset serves one query result per catalog generation."""
+
+    def setUp(self):
+        get_cache().clear()
+        reset_cache_stats()
+        Category.objects.create(name="Tea", description="d")
+
+    def test_second_call_is_a_hit(self):
+        with self.assertNumQueries(1):
+            first = cached_queryset("cats", Category.objects.all())
+            second = cached_queryset("cats", Category.objects.all())
+        self.assertEqual([c.name for c in second], [c.name for c in first])
+        self.assertEqual(get_cache_stats()["cats"], {"miss": 1, "hit": 1})
+
+    def test_catalog_change_retires_the_value(self):
+        cached_queryset("cats", Category.objects.all())
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Incense", description="d")
+        names = [c.name for c in cached_queryset("cats", Category.objects.all())]
+        self.assertIn("Incense", names)
+
+    def test_vary_on_and_generation_change_the_key(self):
+        key = make_key("cats", 1)
+        self.assertNotEqual(key, make_key("cats", 2))
+        bump_versions(CATALOG)
+        self.assertNotEqual(key, make_key("cats", 1))
+
+    def test_evicted_version_does_not_restart_at_an_old_number(self):
+        get_cache().clear()
+        bump_versions(CATALOG)
+        seen = {get_version(CATALOG)}
+        bump_versions(CATALOG)
+        seen.add(get_version(CATALOG))
+        # Losing the counter, then reading or bumping it, gives a new number.
+        get_cache().clear()
+        self.assertNotIn(get_version(CATALOG), seen)
+        seen.add(get_version(CATALOG))
+        get_cache().clear()
+        bump_versions(CATALOG)
+        self.assertNotIn(get_version(CATALOG), seen)
+
+    def test_one_caller_refreshes_early(self):
+        source = mock.Mock(return_value=1)
+        with mock.patch("shop.cache.time.time", return_value=1000.0):
+            cached_queryset("n", source, timeout=100, early_refresh=0.2)
+        # Inside the refresh window: this caller refreshes the value.
+        with mock.patch("shop.cache.time.time", return_value=1085.0):
+            cached_queryset("n", source, timeout=100, early_refresh=0.2)
+        self.assertEqual(source.call_count, 2)
+        self.assertEqual(get_cache_stats()["n"], {"miss": 1, "refresh": 1})
+
+    def test_refresh_in_progress_serves_current_value(self):
+        source = mock.Mock(return_value=1)
+        with mock.patch("shop.cache.time.time", return_value=1000.0):
+            cached_queryset("n", source, timeout=100, early_refresh=0.2)
+        get_cache().add(make_key("n") + ":lock", 1)
+        with mock.patch("shop.cache.time.time", return_value=1085.0):
+            self.assertEqual(cached_queryset("n", source, timeout=100), 1)
+        self.assertEqual(source.call_count, 1)
+
+    @override_settings(SHOP_CACHE_LOCK_WAIT=0.1)
+    def test_miss_waits_for_lock_holder_then_computes(self):
+        get_cache().add(make_key("n") + ":lock", 1)
+        source = mock.Mock(return_value=7)
+        self.assertEqual(cached_queryset("n", source), 7)
+        source.assert_called_once()
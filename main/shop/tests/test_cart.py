@@ -0,0 +1,378 @@
+"""Tests for the session cart view model."""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from shop.cart import Cart, get_cart, saved_cart_totals
+from shop.models import Cart as SavedCart
+from shop.models import CartItem, Product, StockReservation, Store
+
+User = get_user_model()
+
+
+class SessionCartTests(TestCase):
+    """Cart lines are built without touching the session data."""
+
+    def setUp(self):
+        vendor = User.objects.create_user(username="cartvendor", password="x")
+        store = Store.objects.create(vendor=vendor, name="Cart Store", description="d")
+        self.products = [
+            Product.objects.create(
+                store=store,
+                name=f"Cart Product {i}",
+                description="d",
+                price=Decimal("4.00"),
+                quantity=10,
+            )
+            for i in range(3)
+        ]
+        self.request = RequestFactory().get("/")
+        self.request.session = SessionStore()
+
+    def test_iteration_does_not_mutate_session(self):
+        cart = Cart(self.request)
+        for product in self.products:
+            cart.add(product, quantity=2)
+        snapshot = {k: dict(v) for k, v in self.request.session["cart"].items()}
+
+        with self.assertNumQueries(1):
+            items = list(cart)
+            list(cart)
+
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0]["total_price"], Decimal("8.00"))
+        self.assertEqual(self.request.session["cart"], snapshot)
+
+    def test_missing_products_are_skipped(self):
+        cart = Cart(self.request)
+        cart.add(self.products[0])
+        cart.add(self.products[1])
+        self.products[1].delete()
+        self.assertEqual([i["product"] for i in cart], [self.products[0]])
+
+    def test_get_cart_is_shared_per_request(self):
+        self.assertIs(get_cart(self.request), get_cart(self.request))
+
+    def test_summary_totals(self):
+        cart = get_cart(self.request)
+        cart.add(self.products[0], quantity=5)
+        summary = cart.get_summary()
+        self.assertEqual(summary["total"], Decimal("20.00"))
+        self.assertEqual(summary["tax"], Decimal("1.6000"))
+        self.assertEqual(summary["grand_total"], Decimal("21.6000"))
+
+
+class CartRevalidationTests(TestCase):
+    """Cart lines are refreshed from the catalog in one query."""
+
+    def setUp(self):
+        vendor = User.objects.create_user(username="revalvendor", password="x")
+        store = Store.objects.create(vendor=vendor, name="Reval", description="d")
+        self.products = [
+            Product.objects.create(
+                store=store,
+                name=f"Reval Product {i}",
+                description="d",
+                price=Decimal("4.00"),
+                quantity=10,
+            )
+            for i in range(4)
+        ]
+        self.request = RequestFactory().get("/")
+        self.request.session = SessionStore()
+        self.cart = Cart(self.request)
+        for product in self.products:
+            self.cart.add(product, quantity=3)
+
+    def change(self, product, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(product, name, value)
+            product.save()
+
+    def test_prices_stock_and_availability_are_refreshed(self):
+        self.change(self.products[0], price=Decimal("5.50"))
+        self.change(self.products[1], quantity=2)
+        self.change(self.products[2], is_active=False)
+        with self.assertNumQueries(1):
+            changes = self.cart.revalidate()
+            items = list(self.cart)
+        self.assertEqual(len(changes), 3)
+        self.assertIn("from $4.00 to $5.50", changes[0])
+        self.assertEqual(
+            [(i["product"], i["quantity"], i["price"]) for i in items],
+            [
+                (self.products[0], 3, Decimal("5.50")),
+                (self.products[1], 2, Decimal("4.00")),
+                (self.products[3], 3, Decimal("4.00")),
+            ],
+        )
+        self.assertEqual(self.cart.get_total_price(), Decimal("36.50"))
+
+    def test_stock_held_by_other_shoppers_is_not_available(self):
+        StockReservation.objects.create(
+            product=self.products[0],
+            quantity=8,
+            session_key="another-shopper",
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+        changes = self.cart.revalidate(force=True)
+        self.assertEqual(
+            changes, ["Only 2 of Reval Product 0 left; your cart was updated."]
+        )
+        self.assertEqual(self.cart.cart[str(self.products[0].pk)]["quantity"], 2)
+
+    def test_repeat_calls_are_free_until_the_catalog_moves(self):
+        self.assertEqual(self.cart.revalidate(), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cart.revalidate(), [])
+            # A new Cart for the same session trusts the stamp too.
+            self.assertEqual(Cart(self.request).revalidate(), [])
+        self.change(self.products[3], price=Decimal("3.00"))
+        self.assertEqual(len(self.cart.revalidate()), 1)
+
+    def test_checkout_bills_the_revalidated_price(self):
+        buyer = User.objects.create_user(username="revalbuyer", password="x")
+        self.client.force_login(buyer)
+        self.client.post(
+            reverse("shop:add_to_cart", args=[self.products[0].pk]), {"quantity": 2}
+        )
+        self.change(self.products[0], price=Decimal("6.00"))
+        data = {"shipping_address": "1 Road"}
+        response = self.client.post(reverse("shop:checkout"), data)
+        self.assertRedirects(
+            response, reverse("shop:checkout"), fetch_redirect_response=False
+        )
+        self.assertFalse(buyer.orders.exists())
+        self.client.post(reverse("shop:checkout"), data)
+        line = buyer.orders.get().items.get()
+        self.assertEqual(line.price, Decimal("6.00"))
+
+    def test_checkout_rereads_prices_the_stamp_missed(self):
+        buyer = User.objects.create_user(username="stampbuyer", password="x")
+        self.client.force_login(buyer)
+        self.client.post(
+            reverse("shop:add_to_cart", args=[self.products[0].pk]), {"quantity": 1}
+        )
+        self.client.get(reverse("shop:checkout"))
+        # A write that skips signals leaves the catalog generation alone.
+        Product.objects.filter(pk=self.products[0].pk).update(price=Decimal("7.00"))
+        data = {"shipping_address": "1 Road"}
+        self.client.post(reverse("shop:checkout"), data)
+        self.assertFalse(buyer.orders.exists())
+        self.client.post(reverse("shop:checkout"), data)
+        self.assertEqual(buyer.orders.get().items.get().price, Decimal("7.00"))
+
+
+class SavedCartMergeTests(TestCase):
+    """Signing in folds the session cart into the saved cart and back."""
+
+    def setUp(self):
+        vendor = User.objects.create_user(username="mergevendor", password="x")
+        store = Store.objects.create(vendor=vendor, name="Merge", description="d")
+        self.products = [
+            Product.objects.create(
+                store=store,
+                name=f"Merge Product {i}",
+                description="d",
+                price=Decimal("2.00"),
+                quantity=20,
+            )
+            for i in range(3)
+        ]
+        self.user = User.objects.create_user(username="merger", password="pw")
+        saved = SavedCart.objects.create(user=self.user)
+        CartItem.objects.create(cart=saved, product=self.products[0], quantity=1)
+        CartItem.objects.create(cart=saved, product=self.products[1], quantity=4)
+
+    def add(self, product, quantity):
+        self.client.post(
+            reverse("shop:add_to_cart", args=[product.pk]), {"quantity": quantity}
+        )
+
+    def saved_lines(self):
+        return dict(
+            CartItem.objects.filter(cart__user=self.user).values_list(
+                "product__name", "quantity"
+            )
+        )
+
+    def test_login_merges_both_ways(self):
+        self.add(self.products[0], 2)
+        self.add(self.products[2], 5)
+        self.client.login(username="merger", password="pw")
+        expected = {"Merge Product 0": 3, "Merge Product 1": 4, "Merge Product 2": 5}
+        self.assertEqual(self.saved_lines(), expected)
+        session_lines = {
+            Product.objects.get(pk=pk).name: line["quantity"]
+            for pk, line in self.client.session["cart"].items()
+        }
+        self.assertEqual(session_lines, expected)
+        self.assertEqual(saved_cart_totals(self.user), (12, Decimal("24.00")))
+
+    def test_logout_saves_the_session_cart(self):
+        self.client.login(username="merger", password="pw")
+        self.client.post(
+            reverse("shop:remove_from_session_cart", args=[self.products[1].pk])
+        )
+        self.add(self.products[2], 1)
+        self.client.logout()
+        self.assertEqual(
+            self.saved_lines(), {"Merge Product 0": 1, "Merge Product 2": 1}
+        )
+
+    def test_dashboard_counts_the_live_cart(self):
+        self.client.login(username="merger", password="pw")
+        self.add(self.products[2], 2)
+        response = self.client.get(reverse("shop:customer_dashboard"))
+        self.assertEqual(response.context["cart_items_count"], 7)
+        self.assertContains(response, '<span class="cart-badge">7</span>')
+
+
+class SavedCartCounterTests(TestCase):
+    """Cart.item_count and Cart.subtotal follow the cart's items."""
+
+    def setUp(self):
+        vendor = User.objects.create_user(username="countvendor", password="x")
+        store = Store.objects.create(vendor=vendor, name="Count", description="d")
+        self.lamp, self.rug = (
+            Product.objects.create(
+                store=store, name=name, description="d", price=price, quantity=9
+            )
+            for name, price in (("Lamp", Decimal("3.00")), ("Rug", Decimal("10.00")))
+        )
+        self.cart = SavedCart.objects.create(
+            user=User.objects.create_user(username="counter", password="x")
+        )
+
+    def assertTotals(self, items, subtotal):
+        self.cart.refresh_from_db()
+        self.assertEqual((self.cart.item_count, self.cart.subtotal), (items, subtotal))
+
+    def test_item_writes_adjust_the_counters(self):
+        lamp = CartItem.objects.create(cart=self.cart, product=self.lamp, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.rug, quantity=1)
+        self.assertTotals(3, Decimal("16.00"))
+
+        lamp = CartItem.objects.get(pk=lamp.pk)
+        lamp.quantity = 5
+        # Savepoint, the item, one UPDATE recounting the cart, release.
+        with self.assertNumQueries(4):
+            lamp.save(update_fields=["quantity"])
+        self.assertTotals(6, Decimal("25.00"))
+
+        self.cart.items.filter(product=self.rug).delete()
+        self.assertTotals(5, Decimal("15.00"))
+        lamp.delete()
+        self.assertTotals(0, Decimal("0.00"))
+
+    def test_saves_from_stale_copies_do_not_drift(self):
+        item = CartItem.objects.create(cart=self.cart, product=self.lamp, quantity=1)
+        first, second = CartItem.objects.get(pk=item.pk), CartItem.objects.get(
+            pk=item.pk
+        )
+        first.quantity = 3
+        first.save()
+        second.quantity = 3
+        second.save()
+        self.assertTotals(3, Decimal("9.00"))
+
+    def test_repricing_recounts_carts(self):
+        CartItem.objects.create(cart=self.cart, product=self.lamp, quantity=2)
+        self.lamp.price = Decimal("4.50")
+        self.lamp.save()
+        self.assertTotals(2, Decimal("9.00"))
+        # Saving a product without changing its price leaves carts alone.
+        lamp = Product.objects.get(pk=self.lamp.pk)
+        lamp.name = "Brass Lamp"
+        with CaptureQueriesContext(connection) as ctx:
+            lamp.save()
+        self.assertFalse([q for q in ctx.captured_queries if "shop_cart" in q["sql"]])
+        self.client.force_login(self.lamp.store.vendor)
+        self.lamp.store.vendor.profile.role = "vendor"
+        self.lamp.store.vendor.profile.save()
+        self.client.post(
+            reverse("shop:product_bulk_update"),
+            f'[{{"id": {self.lamp.pk}, "price": "1.25"}}]',
+            content_type="application/json",
+        )
+        self.assertTotals(2, Decimal("2.50"))
+
+
+@override_settings(SHOP_CART_BACKEND="cookie")
+class CookieCartTests(TestCase):
+    """Anonymous carts live in a signed cookie until they outgrow it."""
+
+    def setUp(self):
+        vendor = User.objects.create_user(username="cookievendor", password="x")
+        store = Store.objects.create(
+            vendor=vendor, name="Cookie Store", description="d"
+        )
+        self.products = [
+            Product.objects.create(
+                store=store,
+                name=f"Cookie Product {i}",
+                description="d",
+                price=Decimal("3.00"),
+                quantity=50,
+            )
+            for i in range(6)
+        ]
+
+    def add(self, product, quantity=1):
+        return self.client.post(
+            reverse("shop:add_to_cart", args=[product.pk]), {"quantity": quantity}
+        )
+
+    def test_anonymous_cart_needs_no_session_row(self):
+        self.add(self.products[0], quantity=2)
+        self.assertIn("shop_cart", self.client.cookies)
+        self.assertEqual(Session.objects.count(), 0)
+        response = self.client.get(reverse("shop:cart_api"))
+        self.assertEqual(response.json()["items_count"], 1)
+        self.assertEqual(Session.objects.count(), 0)
+
+    def test_tampered_cookie_starts_an_empty_cart(self):
+        self.add(self.products[0])
+        self.client.cookies["shop_cart"] = self.client.cookies["shop_cart"].value + "x"
+        self.assertEqual(self.client.get(reverse("shop:cart_api")).json()["items"], [])
+
+    @override_settings(SHOP_CART_COOKIE_MAX_BYTES=120)
+    def test_large_cart_is_promoted_to_the_session(self):
+        for product in self.products:
+            self.add(product)
+        self.assertEqual(self.client.cookies["shop_cart"].value, "")
+        self.assertEqual(len(self.client.session["cart"]), 6)
+        response = self.client.get(reverse("shop:cart_api"))
+        self.assertEqual(response.json()["items_count"], 6)
+
+    def test_cart_follows_the_shopper_on_login(self):
+        self.add(self.products[1], quantity=3)
+        self.client.force_login(User.objects.create_user(username="cs", password="x"))
+        response = self.client.get(reverse("shop:cart_api"))
+        self.assertEqual(response.json()["items"][0]["quantity"], 3)
+        self.assertEqual(self.client.cookies["shop_cart"].value, "")
+        self.assertEqual(len(self.client.session["cart"]), 1)
+
+    def test_cookie_cart_is_merged_into_a_session_cart_on_login(self):
+        user = User.objects.create_user(username="cm", password="x")
+        self.client.force_login(user)
+        self.add(self.products[0], quantity=2)
+        self.client.logout()
+        self.add(self.products[0], quantity=1)
+        self.add(self.products[2], quantity=1)
+        self.client.force_login(user)
+        items = self.client.get(reverse("shop:cart_api")).json()["items"]
+        self.assertEqual(
+            {item["product"]["id"]: item["quantity"] for item in items},
+            {self.products[0].pk: 3, self.products[2].pk: 1},
+        )
@@ -0,0 +1,118 @@
+"""Tests for the streaming order export."""
+
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+
+from shop.exports import COLUMNS
+from shop.models import Category, Order, OrderItem, Product, Store
+
+User = get_user_model()
+
+
+class OrderExportTests(TestCase):
+    """Vendors and admins can stream order lines as CSV or JSON Lines."""
+
+    def setUp(self):
+        self.vendor = self.make_vendor("exportvendor")
+        other_vendor = self.make_vendor("othervendor")
+        category = Category.objects.create(name="Export")
+        self.store = Store.objects.create(
+            vendor=self.vendor, name="Mine", description="d"
+        )
+        other_store = Store.objects.create(
+            vendor=other_vendor, name="Theirs", description="d"
+        )
+        mine = self.make_product(self.store, category, "Mine")
+        theirs = self.make_product(other_store, category, "Theirs")
+        self.buyer = User.objects.create_user(username="exportbuyer", password="x")
+        self.order = Order.objects.create(
+            buyer=self.buyer, total_amount=Decimal("7.00"), shipping_address="a"
+        )
+        OrderItem.objects.create(
+            order=self.order, product=mine, quantity=2, price=Decimal("2.00")
+        )
+        OrderItem.objects.create(
+            order=self.order, product=theirs, quantity=1, price=Decimal("3.00")
+        )
+        self.url = reverse("shop:order_export")
+
+    def make_vendor(self, username):
+        user = User.objects.create_user(username=username, password="x")
+        user.profile.role = "vendor"
+        user.profile.save()
+        return user
+
+    def make_product(self, store, category, name):
+        return Product.objects.create(
+            store=store,
+            category=category,
+            name=name,
+            description="d",
+            price=Decimal("1.00"),
+            quantity=5,
+        )
+
+    def body(self, response):
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b"".join(response.streaming_content).decode()
+
+    def test_vendor_gets_only_their_lines_as_csv(self):
+        self.client.force_login(self.vendor)
+        response = self.client.get(self.url, {"vendor": "999"})
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(self.body(response))))
+        self.assertEqual([row["product"] for row in rows], ["Mine"])
+        self.assertEqual(rows[0]["order_id"], self.order.order_id)
+        self.assertEqual(rows[0]["price"], "2.00")
+        # The vendor's own line total, not the order total with other lines.
+        self.assertEqual(rows[0]["line_total"], "4.00")
+        self.assertNotIn("order_total", rows[0])
+
+    def test_admin_filters_by_store_as_jsonl(self):
+        admin = User.objects.create_superuser(
+            username="exportadmin", password="x", email="a@example.com"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(self.url, {"format": "jsonl"})
+        lines = [json.loads(line) for line in self.body(response).splitlines()]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(list(lines[0]), [name for name, _ in COLUMNS])
+        response = self.client.get(
+            self.url, {"format": "jsonl", "store": str(self.store.pk)}
+        )
+        self.assertEqual(len(self.body(response).splitlines()), 1)
+
+    def test_date_range_and_bad_parameters(self):
+        self.client.force_login(self.vendor)
+        day = self.order.created_at.date().isoformat()
+        response = self.client.get(self.url, {"from": day, "to": day})
+        self.assertEqual(len(self.body(response).splitlines()), 2)
+        response = self.client.get(self.url, {"to": "2000-01-01"})
+        self.assertEqual(len(self.body(response).splitlines()), 1)
+        self.assertEqual(self.client.get(self.url, {"from": "soon"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"format": "xml"}).status_code, 400)
+        for name in ("vendor", "store"):
+            response = self.client.get(self.url, {name: "\u00b2"})
+            self.assertEqual(response.status_code, 400)
+
+    def test_buyers_are_turned_away(self):
+        self.client.force_login(self.buyer)
+        self.assertRedirects(self.client.get(self.url), reverse("shop:home"))
+
+    def test_admin_action_exports_selected_orders(self):
+        admin = User.objects.create_superuser(
+            username="actionadmin", password="x", email="b@example.com"
+        )
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("admin:shop_order_changelist"),
+            {"action": "export_csv", "_selected_action": [self.order.pk]},
+        )
+        self.assertEqual(len(self.body(response).splitlines()), 3)
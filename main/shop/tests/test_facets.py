@@ -0,0 +1,73 @@
+"""Tests for product list facet counts."""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from shop.cache import get_cache
+from shop.facets import cached_facet_counts, facet_counts
+from shop.filters import ProductFilter
+from shop.models import Category, Product, Review, Store
+
+User = get_user_model()
+
+
+class FacetCountTests(TestCase):
+    """Facets are counted in one grouped query and cached per filter set."""
+
+    def setUp(self):
+        get_cache().clear()
+        vendor = User.objects.create_user(username="facetvendor", password="x")
+        self.tea = Category.objects.create(name="Tea")
+        self.incense = Category.objects.create(name="Incense")
+        self.store = Store.objects.create(vendor=vendor, name="Alpha", description="d")
+        self.other = Store.objects.create(vendor=vendor, name="Beta", description="d")
+        reviewer = User.objects.create_user(username="facetreviewer", password="x")
+        for name, category, store, price, rating in (
+            ("Green", self.tea, self.store, "10.00", 5),
+            ("Black", self.tea, self.other, "30.00", 3),
+            ("Sandal", self.incense, self.store, "120.00", None),
+        ):
+            product = Product.objects.create(
+                store=store,
+                category=category,
+                name=name,
+                description="d",
+                price=Decimal(price),
+                quantity=5,
+            )
+            if rating:
+                Review.objects.create(product=product, user=reviewer, rating=rating)
+
+    def test_counts_every_facet_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = facet_counts(Product.objects.filter(is_active=True))
+        self.assertEqual(counts["category"], {self.tea.pk: 2, self.incense.pk: 1})
+        self.assertEqual(counts["store"], {self.store.pk: 2, self.other.pk: 1})
+        self.assertEqual(counts["price"], {0: 1, 1: 1, 3: 1})
+        self.assertEqual(counts["rating"], {4: 1, 3: 2, 2: 2, 1: 2})
+
+    def test_counts_follow_the_filters(self):
+        counts = facet_counts(Product.objects.filter(category=self.tea))
+        self.assertEqual(counts["category"], {self.tea.pk: 2})
+        self.assertEqual(counts["store"], {self.store.pk: 1, self.other.pk: 1})
+
+    def test_equivalent_filters_share_a_cache_entry(self):
+        cached_facet_counts(ProductFilter.from_params({"search": "Tea"}))
+        with self.assertNumQueries(0):
+            cached_facet_counts(ProductFilter.from_params({"q": " tea ", "page": "2"}))
+
+    @override_settings(SHOP_PAGE_CACHE_ENABLED=False)
+    def test_product_list_shows_counts(self):
+        response = self.client.get(reverse("shop:product_list"))
+        groups = {group["title"]: group for group in response.context["facets"]}
+        self.assertEqual(
+            {o["label"]: o["count"] for o in groups["Category"]["options"]},
+            {"Incense": 1, "Tea": 2},
+        )
+        rating = groups["Rating"]["options"][0]
+        self.assertEqual(rating["count"], 1)
+        response = self.client.get(reverse("shop:product_list") + "?" + rating["query"])
+        self.assertEqual([p.name for p in response.context["products"]], ["Green"])
@@ -0,0 +1,88 @@
+"""Tests for the shared product filter pipeline."""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from shop.cache import get_cache
+from shop.filters import ProductFilter
+from shop.models import Category, Product, Store
+
+User = get_user_model()
+
+
+class ProductFilterParsingTests(TestCase):
+    """Both pages' parameter spellings parse to the same spec."""
+
+    def test_list_and_search_parameters_agree(self):
+        listing = ProductFilter.from_params(
+            {"search": "Green  Tea", "min_price": "10.50", "sort": "price"}
+        )
+        search = ProductFilter.from_params(
+            {"q": " green tea", "min_price": "10.5", "sort": "price_low"}
+        )
+        self.assertEqual(listing, search)
+        self.assertEqual(listing.search, "green tea")
+        self.assertEqual(listing.min_price, Decimal("10.5"))
+
+    def test_invalid_values_are_dropped(self):
+        spec = ProductFilter.from_params(
+            {"category": "x", "max_price": "cheap", "min_price": "nan", "sort": "?"}
+        )
+        self.assertEqual(spec, ProductFilter())
+        spec = ProductFilter.from_params({"store": "\u00b2", "min_rating": "\u0663"})
+        self.assertEqual(spec, ProductFilter())
+
+    def test_key_ignores_sort_and_defaults_apply(self):
+        newest = ProductFilter.from_params({"category": "3"})
+        by_name = ProductFilter.from_params({"category": "3", "sort": "name"})
+        self.assertEqual(newest.key(), by_name.key())
+        self.assertTrue(ProductFilter.from_params({}, in_stock=True).in_stock)
+
+
+@override_settings(SHOP_PAGE_CACHE_ENABLED=False)
+class ProductFilterViewTests(TestCase):
+    """The list and search pages share one pipeline."""
+
+    def setUp(self):
+        get_cache().clear()
+        vendor = User.objects.create_user(username="filtervendor", password="x")
+        store = Store.objects.create(vendor=vendor, name="Filter", description="d")
+        category = Category.objects.create(name="Filtered")
+        for name, quantity in (("Tea In Stock", 5), ("Tea Sold Out", 0)):
+            Product.objects.create(
+                store=store,
+                category=category,
+                name=name,
+                description="d",
+                price=Decimal("3.00"),
+                quantity=quantity,
+            )
+
+    def names(self, response):
+        return sorted(p.name for p in response.context["products"])
+
+    def test_search_shows_in_stock_matches(self):
+        response = self.client.get(reverse("shop:search_products"), {"q": "tea"})
+        self.assertEqual(self.names(response), ["Tea In Stock"])
+        self.assertEqual(response.context["total_products"], 1)
+
+    def test_list_shows_every_active_match(self):
+        response = self.client.get(reverse("shop:product_list"), {"search": "TEA"})
+        self.assertEqual(self.names(response), ["Tea In Stock", "Tea Sold Out"])
+
+    def test_non_ascii_digits_are_ignored(self):
+        for url in (reverse("shop:product_list"), reverse("shop:search_products")):
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, {"category": "\u00b2", "store": "\u00b2"}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_match_count_is_cached_per_spec(self):
+        spec = ProductFilter.from_params({"search": "tea"})
+        self.assertEqual(spec.count(), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(ProductFilter.from_params({"q": "Tea"}).count(), 2)
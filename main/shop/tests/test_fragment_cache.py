@@ -0,0 +1,47 @@
+"""Tests for catalog template fragment caching."""
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.fragment_cache import CATEGORY_GRID, get_fragment_version
+from shop.models import Category
+
+
+@override_settings(SHOP_PAGE_CACHE_ENABLED=False)
+class FragmentCacheTests(TestCase):
+    """Cached fragments are reused until a model signal invalidates them."""
+
+    def category_queries(self):
+        """Return the category queries run while rendering the home page."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("shop:home"))
+        return [q for q in ctx.captured_queries if "shop_category" in q["sql"]]
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Handicrafts", description="d")
+
+    def test_category_grid_is_served_from_cache(self):
+        self.assertEqual(len(self.category_queries()), 1)
+        self.assertEqual(self.category_queries(), [])
+
+    def test_category_save_invalidates_grid(self):
+        version = get_fragment_version(CATEGORY_GRID)
+        self.assertContains(self.client.get(reverse("shop:home")), "Handicrafts")
+
+        self.category.name = "Singing Bowls"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+
+        self.assertGreater(get_fragment_version(CATEGORY_GRID), version)
+        resp = self.client.get(reverse("shop:home"))
+        self.assertContains(resp, "Singing Bowls")
+        self.assertNotContains(resp, "Handicrafts")
+
+    @override_settings(SHOP_FRAGMENT_CACHE_ENABLED=False)
+    def test_disabled_cache_renders_live(self):
+        self.assertEqual(len(self.category_queries()), 1)
+        self.assertEqual(len(self.category_queries()), 1)
@@ -0,0 +1,155 @@
+"""Tests for the bulk product import."""
+
+import io
+import os
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.cache import get_cache, get_version
+from shop.imports import import_products, read_rows
+from shop.invalidation import store_scope
+from shop.models import Category, Product, Store
+
+User = get_user_model()
+
+
+class ProductImportTests(TestCase):
+    """Rows are validated, matched and written in chunks."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.vendor = User.objects.create_user(username="importvendor", password="x")
+        self.vendor.profile.role = "vendor"
+        self.vendor.profile.save()
+        self.store = Store.objects.create(
+            vendor=self.vendor, name="Import", description="d"
+        )
+        self.category = Category.objects.create(name="Spices")
+        self.existing = Product.objects.create(
+            store=self.store,
+            name="Saffron",
+            description="d",
+            price=Decimal("9.00"),
+            quantity=1,
+        )
+
+    def run_import(self, text, fmt="csv", **kwargs):
+        rows = read_rows(io.BytesIO(text.encode()), fmt)
+        with self.captureOnCommitCallbacks(execute=True):
+            return import_products(self.store, rows, **kwargs)
+
+    def test_creates_updates_and_reports_errors(self):
+        before = get_version(store_scope(self.store.pk))
+        result = self.run_import(
+            "name,category,price,quantity,description\n"
+            "Cumin,spices,2.50,10,Ground\n"
+            "Saffron,Spices,12.00,3,Threads\n"
+            "Pepper,Herbs,1.00,1,Black\n"
+            ",Spices,1.00,1,Nameless\n"
+            "Cumin,Spices,2.75,1,Ground\n"
+            "Clove,,free,1,Whole\n"
+            "Mace,Spices,3.00,1,\n",
+            chunk_size=2,
+        )
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual([line for line, _ in result.errors], [4, 5, 6, 7, 8])
+        self.assertIn("Unknown category", result.errors[0][1])
+        self.assertIn("Duplicate", result.errors[2][1])
+        # As with ProductForm, a product needs a description.
+        self.assertIn("description", result.errors[4][1])
+        cumin = Product.objects.get(store=self.store, name="Cumin")
+        self.assertEqual(cumin.category, self.category)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.price, Decimal("12.00"))
+        self.assertEqual(self.existing.category, self.category)
+        self.assertGreater(get_version(store_scope(self.store.pk)), before)
+
+    def test_jsonl_by_id_and_dry_run(self):
+        text = (
+            f'{{"id": {self.existing.pk}, "name": "Saffron Threads", '
+            '"description": "d", "price": "15"}\n'
+            "not json\n"
+            '{"id": "\u00b2", "name": "Squared", "description": "d", "price": 1}\n'
+            '{"name": "Cardamom", "description": "Green", "price": 4, "quantity": 2}\n'
+        )
+        result = self.run_import(text, "jsonl", dry_run=True)
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual([line for line, _ in result.errors], [2, 3])
+        self.assertIn("id: not a number", result.errors[1][1])
+        self.assertFalse(Product.objects.filter(name="Cardamom").exists())
+        self.run_import(text, "jsonl")
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Saffron Threads")
+        self.assertEqual(Product.objects.get(name="Cardamom").quantity, 2)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def csv_rows(count, offset=0):
+            lines = ["name,category,description,price"]
+            lines += [f"Bulk {i},Spices,d,1.00" for i in range(offset, offset + count)]
+            return "\n".join(lines) + "\n"
+
+        with self.assertNumQueries(5):
+            self.run_import(csv_rows(10), chunk_size=100)
+        with self.assertNumQueries(5):
+            self.run_import(csv_rows(90, offset=10), chunk_size=100)
+
+    def test_update_queries_do_not_grow_with_rows(self):
+        Product.objects.bulk_create(
+            Product(
+                store=self.store,
+                category=self.category,
+                name=f"Stock {i}",
+                description="d",
+                price=Decimal("1.00"),
+            )
+            for i in range(60)
+        )
+
+        def csv_rows(count, price):
+            lines = ["name,category,description,price"]
+            lines += [f"Stock {i},Spices,d,{price}" for i in range(count)]
+            return "\n".join(lines) + "\n"
+
+        counts = []
+        for count, price in ((10, "2.00"), (60, "3.00")):
+            with CaptureQueriesContext(connection) as ctx:
+                result = self.run_import(csv_rows(count, price), chunk_size=100)
+            self.assertEqual(result.updated, count)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        # Unchanged rows are detected without loading each product's
+        # category: the only category query builds the lookup table.
+        with CaptureQueriesContext(connection) as ctx:
+            result = self.run_import(csv_rows(60, "3.00"), chunk_size=100)
+        self.assertEqual(result.unchanged, 60)
+        category_queries = [
+            q for q in ctx.captured_queries if "shop_category" in q["sql"]
+        ]
+        self.assertEqual(len(category_queries), 1)
+
+    def test_vendor_upload_and_command(self):
+        self.client.force_login(self.vendor)
+        upload = SimpleUploadedFile(
+            "products.csv", b"name,description,price\nNutmeg,d,3.00\n"
+        )
+        response = self.client.post(
+            reverse("shop:product_import", args=[self.store.pk]), {"file": upload}
+        )
+        self.assertEqual(response.context["result"].created, 1)
+        self.assertTrue(Product.objects.filter(name="Nutmeg").exists())
+
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            f.write('{"name": "Mace", "description": "d", "price": "5.00"}\n')
+        self.addCleanup(os.unlink, f.name)
+        out = io.StringIO()
+        call_command("import_products", f.name, store=self.store.pk, stdout=out)
+        self.assertIn("Created 1", out.getvalue())
+        self.assertTrue(Product.objects.filter(name="Mace").exists())
@@ -0,0 +1,100 @@
+"""Tests for the scoped cache invalidation bus."""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from shop.cache import CATALOG, get_cache, get_version
+from shop.invalidation import category_scope, flush, product_scope, store_scope
+from shop.models import Category, Product, Store
+
+User = get_user_model()
+
+
+class InvalidationBusTests(TestCase):
+    """Model changes bump their scopes once the transaction commits."""
+
+    def setUp(self):
+        get_cache().clear()
+        vendor = User.objects.create_user(username="busvendor", password="x")
+        self.store = Store.objects.create(vendor=vendor, name="Bus", description="d")
+        self.other_store = Store.objects.create(
+            vendor=vendor, name="Other", description="d"
+        )
+        self.category = Category.objects.create(name="Bus Category")
+        self.product = Product.objects.create(
+            store=self.store,
+            category=self.category,
+            name="Bus Product",
+            description="d",
+            price=Decimal("1.00"),
+            quantity=5,
+        )
+        # The test transaction never commits; apply the fixtures' changes now.
+        flush()
+
+    def versions(self, *scopes):
+        return [get_version(scope) for scope in scopes]
+
+    def test_bumps_wait_for_commit(self):
+        before = self.versions(CATALOG, product_scope(self.product.pk))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.save()
+            self.assertEqual(
+                self.versions(CATALOG, product_scope(self.product.pk)), before
+            )
+        for callback in callbacks:
+            callback()
+        after = self.versions(CATALOG, product_scope(self.product.pk))
+        self.assertEqual(after, [v + 1 for v in before])
+
+    def test_many_changes_flush_once_per_transaction(self):
+        before = get_version(CATALOG)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                self.product.quantity = i
+                self.product.save()
+        self.assertEqual(get_version(CATALOG), before + 1)
+
+    def test_scopes_follow_the_change(self):
+        scopes = (
+            store_scope(self.store.pk),
+            store_scope(self.other_store.pk),
+            category_scope(self.category.pk),
+        )
+        before = self.versions(*scopes)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.store = self.other_store
+            self.product.save()
+        # The old store, the new store and the category are all bumped.
+        self.assertEqual(self.versions(*scopes), [v + 1 for v in before])
+
+    def test_store_page_is_keyed_on_its_store(self):
+        url = reverse("shop:store_detail", args=[self.store.pk])
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Unrelated")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class InvalidationRollbackTests(TransactionTestCase):
+    """Scopes from a rolled-back transaction are bumped by the next commit."""
+
+    def test_rollback_defers_to_next_commit(self):
+        get_cache().clear()
+        before = get_version(category_scope(1))
+        try:
+            with transaction.atomic():
+                Category.objects.create(pk=1, name="Rolled back")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(get_version(category_scope(1)), before)
+        Category.objects.create(pk=2, name="Committed")
+        self.assertEqual(get_version(category_scope(1)), before + 1)
@@ -0,0 +1,144 @@
+"""Tests for order item counts and the order pages."""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.models import Order, OrderItem, Product, Store
+
+User = get_user_model()
+
+
+class OrderItemCountTests(TestCase):
+    """The denormalized Order.item_count tracks the order lines."""
+
+    def setUp(self):
+        self.buyer = User.objects.create_user(username="ordbuyer", password="pass")
+        self.store = Store.objects.create(
+            vendor=self.buyer, name="Order Store", description="d"
+        )
+        self.products = [
+            Product.objects.create(
+                store=self.store,
+                name=f"Order Product {i}",
+                description="d",
+                price=Decimal("2.50"),
+                quantity=10,
+            )
+            for i in range(2)
+        ]
+        self.client.force_login(self.buyer)
+
+    def test_checkout_records_item_count(self):
+        self.client.post(
+            reverse("shop:add_to_cart", args=[self.products[0].pk]), {"quantity": 2}
+        )
+        self.client.post(
+            reverse("shop:add_to_cart", args=[self.products[1].pk]), {"quantity": 3}
+        )
+        self.client.post(reverse("shop:checkout"), {"shipping_address": "1 Road"})
+        order = Order.objects.get(buyer=self.buyer)
+        self.assertEqual(order.item_count, 5)
+
+    def test_update_item_count(self):
+        order = Order.objects.create(
+            buyer=self.buyer, total_amount=Decimal("5.00"), shipping_address="x"
+        )
+        OrderItem.objects.create(
+            order=order, product=self.products[0], quantity=4, price=Decimal("1")
+        )
+        order.update_item_count()
+        order.refresh_from_db()
+        self.assertEqual(order.item_count, 4)
+
+    def test_order_detail_shows_subtotal_and_lines(self):
+        order = Order.objects.create(
+            buyer=self.buyer,
+            total_amount=Decimal("5.40"),
+            shipping_address="x",
+            item_count=2,
+        )
+        OrderItem.objects.create(
+            order=order, product=self.products[0], quantity=2, price=Decimal("2.50")
+        )
+        resp = self.client.get(reverse("shop:order_detail", args=[order.order_id]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["subtotal"], Decimal("5.00"))
+        self.assertEqual(resp.context["tax"], Decimal("0.40"))
+        self.assertContains(resp, "Order Product 0")
+
+    def test_order_history_lists_orders(self):
+        order = Order.objects.create(
+            buyer=self.buyer, total_amount=Decimal("1.00"), shipping_address="x"
+        )
+        resp = self.client.get(reverse("shop:order_history"))
+        self.assertContains(resp, order.order_id)
+
+
+class IdempotentCheckoutTests(TestCase):
+    """Replaying a checkout submission never places a second order."""
+
+    def setUp(self):
+        self.buyer = User.objects.create_user(username="idembuyer", password="pass")
+        store = Store.objects.create(vendor=self.buyer, name="Idem", description="d")
+        self.product = Product.objects.create(
+            store=store,
+            name="Kettle",
+            description="d",
+            price=Decimal("8.00"),
+            quantity=5,
+        )
+        self.client.force_login(self.buyer)
+        self.client.post(
+            reverse("shop:add_to_cart", args=[self.product.pk]), {"quantity": 2}
+        )
+
+    def submit(self, key):
+        return self.client.post(
+            reverse("shop:checkout"),
+            {"shipping_address": "1 Road", "idempotency_key": key},
+        )
+
+    def test_form_carries_a_fresh_key(self):
+        form = self.client.get(reverse("shop:checkout")).context["form"]
+        self.assertEqual(len(form["idempotency_key"].value()), 32)
+        self.assertContains(
+            self.client.get(reverse("shop:checkout")), 'name="idempotency_key"'
+        )
+
+    def test_replay_returns_the_existing_order(self):
+        first = self.submit("k" * 32)
+        order = Order.objects.get()
+        self.assertRedirects(
+            first,
+            reverse("shop:order_detail", args=[order.order_id]),
+            fetch_redirect_response=False,
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            replay = self.submit("k" * 32)
+        writes = [q["sql"] for q in ctx.captured_queries if "shop_" in q["sql"]]
+        self.assertFalse([sql for sql in writes if not sql.startswith("SELECT")])
+        self.assertEqual(replay["Location"], first["Location"])
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 3)
+
+    def test_key_of_another_buyer_is_not_honoured(self):
+        other = User.objects.create_user(username="idemother", password="pass")
+        Order.objects.create(
+            buyer=other,
+            total_amount=Decimal("1.00"),
+            shipping_address="x",
+            idempotency_key="shared",
+        )
+        response = self.submit("shared")
+        self.assertRedirects(
+            response, reverse("shop:cart_detail"), fetch_redirect_response=False
+        )
+        self.assertFalse(Order.objects.filter(buyer=self.buyer).exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
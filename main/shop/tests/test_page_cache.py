@@ -0,0 +1,204 @@
+"""Tests for the anonymous page cache and conditional GETs on catalog views."""
+
+import re
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.models import Category, Order, OrderItem, Product, Store
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    """Anonymous catalog pages are cached until the catalog changes."""
+
+    def setUp(self):
+        cache.clear()
+        vendor = User.objects.create_user(username="pcvendor", password="pass")
+        self.store = Store.objects.create(
+            vendor=vendor, name="Page Store", description="d"
+        )
+        self.product = Product.objects.create(
+            store=self.store,
+            name="Prayer Flags",
+            description="d",
+            price=Decimal("4.00"),
+            quantity=10,
+        )
+        self.url = reverse("shop:product_detail", args=[self.product.pk])
+
+    def product_queries(self, url, client=None):
+        """Return the product queries run while rendering ``url``."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q for q in ctx.captured_queries if "shop_product" in q["sql"]]
+
+    def test_second_anonymous_hit_skips_catalog_queries(self):
+        self.assertGreater(len(self.product_queries(self.url)), 1)
+        # Only the ETag stamp query runs on a cache hit.
+        self.assertEqual(len(self.product_queries(self.url)), 1)
+
+    def test_query_string_is_part_of_the_key(self):
+        url = reverse("shop:product_list")
+        self.product_queries(url + "?search=prayer")
+        self.assertTrue(self.product_queries(url + "?search=flags"))
+
+    def test_product_change_invalidates_pages(self):
+        self.product_queries(self.url)
+        self.product.price = Decimal("9.50")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertContains(self.client.get(self.url), "9.50")
+
+    def test_product_page_outlives_unrelated_catalog_changes(self):
+        self.product.category = Category.objects.create(name="Flags")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        other_vendor = User.objects.create_user(username="pcother", password="pass")
+        other = Product.objects.create(
+            store=Store.objects.create(vendor=other_vendor, name="Other"),
+            category=Category.objects.create(name="Incense"),
+            name="Incense",
+            description="d",
+            price=Decimal("2.00"),
+            quantity=10,
+        )
+        self.product_queries(self.url)
+        other.price = Decimal("3.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            other.save()
+        self.assertEqual(len(self.product_queries(self.url)), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.store.save()
+        self.assertGreater(len(self.product_queries(self.url)), 1)
+
+    def test_cart_badge_is_rendered_per_visitor(self):
+        self.client.get(self.url)
+        shopper = self.client_class()
+        shopper.post(
+            reverse("shop:add_to_cart", args=[self.product.pk]), {"quantity": 3}
+        )
+        response = shopper.get(self.url)
+        self.assertContains(response, '<span class="cart-badge">3</span>', html=True)
+        self.assertNotContains(self.client.get(self.url), 'cart-badge">')
+
+    def test_csrf_tokens_belong_to_the_current_visitor(self):
+        url = reverse("shop:product_list") + "?enhanced=1"
+        self.client.get(url)
+        shopper = self.client_class(enforce_csrf_checks=True)
+        response = shopper.get(url)
+        token = re.search(
+            r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()
+        ).group(1)
+        resp = shopper.post(
+            reverse("shop:add_to_cart", args=[self.product.pk]),
+            {"quantity": 1, "csrfmiddlewaretoken": token},
+        )
+        self.assertNotEqual(resp.status_code, 403)
+
+    def test_authenticated_users_bypass_cache(self):
+        self.product_queries(self.url)
+        self.client.force_login(User.objects.get(username="pcvendor"))
+        self.assertTrue(self.product_queries(self.url))
+
+    @override_settings(SHOP_PAGE_CACHE_ENABLED=False)
+    def test_disabled_cache_renders_live(self):
+        self.product_queries(self.url)
+        self.assertTrue(self.product_queries(self.url))
+
+
+class ConditionalGetTests(TestCase):
+    """Catalog pages and the cart API answer 304 while nothing changed."""
+
+    def setUp(self):
+        cache.clear()
+        vendor = User.objects.create_user(username="etvendor", password="pass")
+        self.store = Store.objects.create(
+            vendor=vendor, name="ETag Store", description="d"
+        )
+        self.product = Product.objects.create(
+            store=self.store,
+            name="Thangka",
+            description="d",
+            price=Decimal("30.00"),
+            quantity=5,
+        )
+
+    def revalidate(self, url):
+        """GET ``url`` twice, the second time with the returned ETag."""
+        etag = self.client.get(url)["ETag"]
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_304(self):
+        for url in (
+            reverse("shop:product_list"),
+            reverse("shop:product_detail", args=[self.product.pk]),
+            reverse("shop:store_detail", args=[self.store.pk]),
+            reverse("shop:cart_api"),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url).status_code, 304)
+
+    def test_product_change_changes_etag(self):
+        url = reverse("shop:product_detail", args=[self.product.pk])
+        etag = self.client.get(url)["ETag"]
+        self.product.price = Decimal("25.00")
+        self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_related_product_change_changes_etag(self):
+        category = Category.objects.create(name="Art")
+        self.product.category = category
+        self.product.save()
+        related = Product.objects.create(
+            store=self.store,
+            category=category,
+            name="Singing Bowl",
+            description="d",
+            price=Decimal("15.00"),
+            quantity=0,
+        )
+        url = reverse("shop:product_detail", args=[self.product.pk])
+        etag = self.client.get(url)["ETag"]
+        related.quantity = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            related.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Singing Bowl")
+
+    def test_guest_purchase_with_users_email_changes_etag(self):
+        User.objects.create_user(
+            username="etbuyer", email="buyer@example.com", password="pass"
+        )
+        self.client.login(username="etbuyer", password="pass")
+        url = reverse("shop:product_detail", args=[self.product.pk])
+        etag = self.client.get(url)["ETag"]
+        order = Order.objects.create(
+            guest_email="Buyer@example.com",
+            total_amount=Decimal("30.00"),
+            shipping_address="x",
+        )
+        OrderItem.objects.create(
+            order=order, product=self.product, quantity=1, price=Decimal("30.00")
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["has_purchased"])
+
+    def test_cart_change_changes_etag(self):
+        url = reverse("shop:cart_api")
+        etag = self.client.get(url)["ETag"]
+        self.client.post(reverse("shop:add_to_cart", args=[self.product.pk]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["items_count"], 1)
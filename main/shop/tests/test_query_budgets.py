@@ -0,0 +1,360 @@
+"""Query-count budgets for the shop views.
+
+Each view is rendered against several dataset sizes and must stay under a
+fixed number of SQL queries *and* run the same number of queries whatever
+the size. A count that grows with the data means an N+1 crept in (for
+example a per-card ``product.reviews.count`` in a template). Views are
+measured both with warm caches and right after the cache is cleared.
+
+The admin category pages aren't covered: the project URLconf routes
+``/admin/`` to Django's admin first, so ``shop:category_*`` can't be reached.
+"""
+
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.models import (
+    Category,
+    Order,
+    OrderItem,
+    PasswordResetToken,
+    Product,
+    Review,
+    Store,
+)
+
+User = get_user_model()
+
+# Dataset sizes every budget is checked against. The largest size is
+# bigger than one page (12 products) so pagination is exercised too.
+DATASET_SIZES = (1, 5, 15)
+
+# Pass as ``user`` to request a view signed out.
+ANONYMOUS = object()
+
+
+class QueryBudgetMixin:
+    """Helpers for asserting an upper bound on executed SQL queries."""
+
+    def assertMaxQueries(self, budget, func, *args, **kwargs):
+        """Call ``func`` and fail if it runs more than ``budget`` queries.
+
+        Returns a ``(result, count)`` tuple so callers can compare counts
+        between dataset sizes.
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            result = func(*args, **kwargs)
+        count = len(ctx.captured_queries)
+        if count > budget:
+            executed = "\n".join(
+                f"{i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, 1)
+            )
+            self.fail(f"{count} queries executed, budget is {budget}:\n{executed}")
+        return result, count
+
+
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Every public view runs a bounded, data-independent number of queries."""
+
+    def setUp(self):
+        self.vendor = User.objects.create_user(
+            username="budgetvendor", password="pass", email="v@example.com"
+        )
+        self.vendor.profile.role = "vendor"
+        self.vendor.profile.save()
+        self.buyer = User.objects.create_user(
+            username="budgetbuyer", password="pass", email="b@example.com"
+        )
+        self.store = Store.objects.create(
+            vendor=self.vendor, name="Budget Store", description="d"
+        )
+        self.admin = User.objects.create_user(
+            username="budgetadmin", password="pass", is_staff=True
+        )
+        self.category = Category.objects.create(name="Budget Category")
+        self.reviewers = [
+            User.objects.create_user(username=f"reviewer{i}", password="x")
+            for i in range(3)
+        ]
+        self.products = []
+
+    def grow_dataset(self, size):
+        """Grow the catalog to ``size`` products and return a fresh order.
+
+        Every product gets reviews, the order has one line per product and
+        the buyer's session cart holds every product.
+        """
+        while len(self.products) < size:
+            product = Product.objects.create(
+                store=self.store,
+                category=self.category,
+                name=f"Product {len(self.products)}",
+                description="desc",
+                price=Decimal("9.99"),
+                quantity=50,
+            )
+            for reviewer in self.reviewers:
+                Review.objects.create(product=product, user=reviewer, rating=4)
+            self.products.append(product)
+
+        order = Order.objects.create(
+            buyer=self.buyer,
+            total_amount=Decimal("9.99") * size,
+            shipping_address="1 Budget Way",
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=p, quantity=1, price=p.price)
+            for p in self.products
+        )
+
+        self.client.force_login(self.buyer)
+        session = self.client.session
+        session["cart"] = {
+            str(p.pk): {"quantity": 1, "price": str(p.price)} for p in self.products
+        }
+        session.save()
+        return order
+
+    def assertViewBudget(self, budget, url_for, user=None, cold_budget=None, send=None):
+        """Request ``url_for(order)`` at every dataset size.
+
+        Each size is measured with warm caches against ``budget`` and again
+        after ``cache.clear()`` against ``cold_budget`` (default ``budget``,
+        i.e. the view doesn't lean on the cache). Fails if a request goes
+        over budget or if either count changes between dataset sizes.
+        ``user`` may be ``ANONYMOUS``; ``send(url)`` replaces the plain GET.
+        """
+        send = send or self.client.get
+        counts = {"warm": [], "cold": []}
+        for size in DATASET_SIZES:
+            order = self.grow_dataset(size)
+            if user is ANONYMOUS:
+                self.client.logout()
+            else:
+                self.client.force_login(user or self.buyer)
+            url = url_for(order)
+            # Warm up once so one-off work (session load, last-login
+            # update, content types) doesn't skew the first size.
+            self.fetch(send, url)
+            for state, limit in (("warm", budget), ("cold", cold_budget or budget)):
+                if state == "cold":
+                    cache.clear()
+                response, count = self.assertMaxQueries(limit, self.fetch, send, url)
+                self.assertEqual(response.status_code, 200, url)
+                counts[state].append(count)
+        for state, sizes in counts.items():
+            self.assertEqual(
+                len(set(sizes)),
+                1,
+                f"{state} query count scales with data "
+                f"{dict(zip(DATASET_SIZES, sizes))}",
+            )
+
+    @staticmethod
+    def fetch(send, url):
+        """Send the request and read a streamed body, which runs its queries."""
+        response = send(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def test_home(self):
+        # Cold, the category grid queries its categories.
+        self.assertViewBudget(8, lambda order: reverse("shop:home"), cold_budget=9)
+
+    def test_product_list(self):
+        # Cold, the category and store options, the grouped facet counts and
+        # the product total are queried again.
+        self.assertViewBudget(
+            8, lambda order: reverse("shop:product_list"), cold_budget=12
+        )
+
+    def test_product_list_enhanced(self):
+        self.assertViewBudget(
+            8,
+            lambda order: reverse("shop:product_list") + "?enhanced=1",
+            cold_budget=12,
+        )
+
+    def test_search_products(self):
+        self.assertViewBudget(
+            8,
+            lambda order: reverse("shop:search_products") + "?q=Product",
+            cold_budget=12,
+        )
+
+    def test_product_detail(self):
+        # The ETag's stamp and purchase check (reused by the view), session
+        # and user, the product, its verified and unverified review counts,
+        # the user's own review, the header's profile and order count, the
+        # reviews, related products, and the session save that
+        # SESSION_SAVE_EVERY_REQUEST makes (savepoint, update, release).
+        self.assertViewBudget(
+            15,
+            lambda order: reverse("shop:product_detail", args=[self.products[0].pk]),
+        )
+
+    def test_store_detail(self):
+        self.assertViewBudget(
+            11, lambda order: reverse("shop:store_detail", args=[self.store.pk])
+        )
+
+    def test_cart_detail(self):
+        self.assertViewBudget(8, lambda order: reverse("shop:cart_detail"))
+
+    def test_cart_api(self):
+        self.assertViewBudget(7, lambda order: reverse("shop:cart_api"))
+
+    def test_checkout(self):
+        # Includes renewing the cart's stock hold and saving its expiry in
+        # the session.
+        self.assertViewBudget(13, lambda order: reverse("shop:checkout"))
+
+    def test_order_history(self):
+        self.assertViewBudget(10, lambda order: reverse("shop:order_history"))
+
+    def test_order_detail(self):
+        self.assertViewBudget(
+            9, lambda order: reverse("shop:order_detail", args=[order.order_id])
+        )
+
+    def test_customer_dashboard(self):
+        self.assertViewBudget(12, lambda order: reverse("shop:customer_dashboard"))
+
+    def test_vendor_dashboard(self):
+        self.assertViewBudget(
+            13, lambda order: reverse("shop:vendor_dashboard"), user=self.vendor
+        )
+
+    def test_vendor_products(self):
+        self.assertViewBudget(
+            10, lambda order: reverse("shop:vendor_products"), user=self.vendor
+        )
+
+    def test_order_export_csv(self):
+        self.assertViewBudget(
+            7, lambda order: reverse("shop:order_export"), user=self.vendor
+        )
+
+    def test_order_export_jsonl_for_admin(self):
+        self.assertViewBudget(
+            7,
+            lambda order: reverse("shop:order_export") + "?format=jsonl",
+            user=self.admin,
+        )
+
+    def test_store_list(self):
+        self.assertViewBudget(
+            8, lambda order: reverse("shop:store_list"), user=self.vendor
+        )
+
+    def test_store_create(self):
+        self.assertViewBudget(
+            7, lambda order: reverse("shop:store_create"), user=self.vendor
+        )
+
+    def test_store_update(self):
+        self.assertViewBudget(
+            8,
+            lambda order: reverse("shop:store_update", args=[self.store.pk]),
+            user=self.vendor,
+        )
+
+    def test_store_delete(self):
+        self.assertViewBudget(
+            8,
+            lambda order: reverse("shop:store_delete", args=[self.store.pk]),
+            user=self.vendor,
+        )
+
+    def test_product_create(self):
+        self.assertViewBudget(
+            9,
+            lambda order: reverse("shop:product_create", args=[self.store.pk]),
+            user=self.vendor,
+        )
+
+    def test_product_import(self):
+        self.assertViewBudget(
+            8,
+            lambda order: reverse("shop:product_import", args=[self.store.pk]),
+            user=self.vendor,
+        )
+
+    def test_product_update(self):
+        self.assertViewBudget(
+            9,
+            lambda order: reverse("shop:product_update", args=[self.products[0].pk]),
+            user=self.vendor,
+        )
+
+    def test_product_delete(self):
+        self.assertViewBudget(
+            9,
+            lambda order: reverse("shop:product_delete", args=[self.products[0].pk]),
+            user=self.vendor,
+        )
+
+    def test_search_autocomplete(self):
+        # Cold, the prefix index is rebuilt from categories, stores and
+        # products.
+        self.assertViewBudget(
+            6,
+            lambda order: reverse("shop:search_autocomplete") + "?q=Prod",
+            cold_budget=9,
+        )
+
+    def test_cart_api_async(self):
+        self.assertViewBudget(7, lambda order: reverse("shop:cart_api_async"))
+
+    def test_cart_update_async(self):
+        def send(url):
+            return self.client.post(
+                url,
+                json.dumps({"product_id": self.products[0].pk, "quantity": 2}),
+                content_type="application/json",
+            )
+
+        self.assertViewBudget(
+            8, lambda order: reverse("shop:cart_update_async"), send=send
+        )
+
+    def test_cart_debug(self):
+        self.assertViewBudget(8, lambda order: reverse("shop:cart_debug"))
+
+    def test_cart_test_pages(self):
+        self.assertViewBudget(7, lambda order: reverse("shop:cart_test"))
+        self.assertViewBudget(7, lambda order: reverse("shop:cart_dropdown_test"))
+
+    def test_profile(self):
+        self.assertViewBudget(7, lambda order: reverse("shop:profile"))
+
+    def test_static_pages(self):
+        self.assertViewBudget(7, lambda order: reverse("shop:about"))
+        self.assertViewBudget(7, lambda order: reverse("shop:contact"))
+
+    def test_register(self):
+        self.assertViewBudget(4, lambda order: reverse("shop:register"), user=ANONYMOUS)
+
+    def test_login(self):
+        self.assertViewBudget(4, lambda order: reverse("shop:login"), user=ANONYMOUS)
+
+    def test_password_reset_request(self):
+        self.assertViewBudget(
+            4, lambda order: reverse("shop:password_reset_request"), user=ANONYMOUS
+        )
+
+    def test_password_reset_confirm(self):
+        token = PasswordResetToken.objects.create(user=self.buyer)
+        self.assertViewBudget(
+            6,
+            lambda order: reverse("shop:password_reset_confirm", args=[token.token]),
+            user=ANONYMOUS,
+        )
@@ -0,0 +1,56 @@
+"""Tests for the reap_expired management command."""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from shop.models import PasswordResetToken
+
+User = get_user_model()
+
+
+class ReapExpiredTests(TestCase):
+    """Expired sessions and spent tokens are deleted in batches."""
+
+    def setUp(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(
+                session_key=f"old{i}", session_data="x", expire_date=now - timedelta(1)
+            )
+        Session.objects.create(
+            session_key="live", session_data="x", expire_date=now + timedelta(1)
+        )
+        user = User.objects.create_user(username="reaper", password="x")
+        PasswordResetToken.objects.create(user=user, is_used=True)
+        PasswordResetToken.objects.create(user=user, expires_at=now - timedelta(1))
+        self.valid_token = PasswordResetToken.objects.create(user=user)
+
+    def reap(self, *args):
+        out = StringIO()
+        call_command("reap_expired", "--sleep", "0", *args, stdout=out)
+        return out.getvalue()
+
+    def test_deletes_only_expired_rows(self):
+        output = self.reap("--batch-size", "2")
+        self.assertEqual(
+            list(Session.objects.values_list("session_key", flat=True)), ["live"]
+        )
+        self.assertEqual(list(PasswordResetToken.objects.all()), [self.valid_token])
+        self.assertIn("Deleted 5 sessions in 3 batch(es).", output)
+        self.assertIn("Reclaimed 7 rows.", output)
+
+    def test_max_batches_bounds_the_work(self):
+        self.reap("--batch-size", "2", "--max-batches", "1")
+        self.assertEqual(Session.objects.count(), 4)
+
+    def test_dry_run_deletes_nothing(self):
+        output = self.reap("--dry-run")
+        self.assertIn("Would delete 5 sessions.", output)
+        self.assertEqual(Session.objects.count(), 6)
+        self.assertEqual(PasswordResetToken.objects.count(), 3)
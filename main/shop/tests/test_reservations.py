@@ -0,0 +1,126 @@
+"""Tests for checkout stock reservations."""
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from shop.models import Order, Product, StockReservation, Store
+from shop.reservations import available_quantities
+
+User = get_user_model()
+
+
+class StockReservationTests(TestCase):
+    """Opening checkout holds the cart's stock for a while."""
+
+    def setUp(self):
+        vendor = User.objects.create_user(username="holdvendor", password="x")
+        store = Store.objects.create(vendor=vendor, name="Holds", description="d")
+        self.product = Product.objects.create(
+            store=store, name="Lamp", description="d", price=Decimal("5.00"), quantity=3
+        )
+        self.first = self.shopper("holdfirst")
+        self.second = self.shopper("holdsecond")
+
+    def shopper(self, username):
+        client = Client()
+        client.force_login(User.objects.create_user(username=username, password="x"))
+        return client
+
+    def add(self, client, quantity):
+        return client.post(
+            reverse("shop:add_to_cart", args=[self.product.pk]), {"quantity": quantity}
+        )
+
+    def test_checkout_holds_stock_until_the_order_is_placed(self):
+        self.add(self.first, 2)
+        self.assertEqual(self.first.get(reverse("shop:checkout")).status_code, 200)
+        hold = StockReservation.objects.get()
+        self.assertEqual(hold.quantity, 2)
+        self.assertEqual(available_quantities([self.product.pk]), {self.product.pk: 1})
+
+        # Only the unheld unit can go into someone else's cart.
+        self.add(self.second, 2)
+        self.add(self.second, 1)
+        response = self.second.get(reverse("shop:checkout"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StockReservation.objects.count(), 2)
+
+        self.first.post(reverse("shop:checkout"), {"shipping_address": "1 Road"})
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(StockReservation.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+
+    def test_short_cart_is_sent_back_without_a_hold(self):
+        self.add(self.first, 3)
+        self.add(self.second, 2)
+        self.first.get(reverse("shop:checkout"))
+        response = self.second.get(reverse("shop:checkout"))
+        self.assertRedirects(
+            response, reverse("shop:cart_detail"), fetch_redirect_response=False
+        )
+        self.assertEqual(StockReservation.objects.count(), 1)
+        self.second.post(reverse("shop:checkout"), {"shipping_address": "2 Road"})
+        self.assertFalse(Order.objects.exists())
+
+    def test_guest_keeps_their_holds_after_signing_in(self):
+        self.product.quantity = 1
+        self.product.save()
+        guest = Client()
+        self.add(guest, 1)
+        self.assertEqual(guest.get(reverse("shop:checkout")).status_code, 200)
+        User.objects.create_user(username="holdguest", password="x")
+        self.assertTrue(guest.login(username="holdguest", password="x"))
+
+        # The hold moved to the user instead of locking them out.
+        self.assertEqual(StockReservation.objects.get().session_key[:5], "user:")
+        self.assertEqual(guest.get(reverse("shop:checkout")).status_code, 200)
+        response = guest.post(reverse("shop:checkout"), {"shipping_address": "3 Road"})
+        self.assertEqual(Order.objects.get().buyer.username, "holdguest")
+        self.assertRedirects(
+            response,
+            reverse("shop:order_detail", args=[Order.objects.get().order_id]),
+            fetch_redirect_response=False,
+        )
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_same_user_in_two_sessions_holds_once(self):
+        user = User.objects.create_user(username="holdtwice", password="x")
+        laptop, phone = Client(), Client()
+        laptop.force_login(user)
+        phone.force_login(user)
+        self.add(laptop, 2)
+        self.assertEqual(laptop.get(reverse("shop:checkout")).status_code, 200)
+        # The saved cart isn't synced until logout, so add on the phone too.
+        self.add(phone, 2)
+        self.assertEqual(phone.get(reverse("shop:checkout")).status_code, 200)
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+        self.assertEqual(available_quantities([self.product.pk]), {self.product.pk: 1})
+
+    def test_signing_out_releases_holds(self):
+        self.add(self.first, 2)
+        self.first.get(reverse("shop:checkout"))
+        self.first.logout()
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_expired_holds_are_ignored_and_reaped(self):
+        StockReservation.objects.create(
+            product=self.product,
+            quantity=3,
+            session_key="gone",
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        with self.assertNumQueries(1):
+            available = available_quantities([self.product.pk])
+        self.assertEqual(available, {self.product.pk: 3})
+        out = StringIO()
+        call_command("reap_expired", "--sleep", "0", stdout=out)
+        self.assertIn("Deleted 1 stock reservations", out.getvalue())
+        self.assertFalse(StockReservation.objects.exists())
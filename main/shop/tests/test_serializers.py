@@ -0,0 +1,85 @@
+"""Tests for the compact session serializer."""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.test import SimpleTestCase, override_settings
+
+from shop.utils.serializers import CompactSessionSerializer, PickleSerializer
+
+
+class CompactSessionSerializerTests(SimpleTestCase):
+    """Session payloads round-trip through the binary format."""
+
+    def setUp(self):
+        self.serializer = CompactSessionSerializer()
+
+    def round_trip(self, value):
+        return self.serializer.loads(self.serializer.dumps(value))
+
+    def test_round_trips_session_values(self):
+        payload = {
+            "_auth_user_id": "7",
+            "cart": {"12": {"quantity": 2, "price": "19.99"}},
+            "cart_revision": 3,
+            "flags": [True, False, None, -5, 2**70, 1.5],
+            "pair": ("a", b"\x00\xff"),
+            "when": datetime(2024, 5, 1, 12, 30),
+            "day": date(2024, 5, 1),
+            "amount": Decimal("10.50"),
+            "empty": {},
+        }
+        result = self.round_trip(payload)
+        self.assertEqual(result, payload)
+        self.assertIs(result["flags"][0], True)
+        self.assertIsInstance(result["pair"], tuple)
+
+    def test_cart_lines_use_compact_schema(self):
+        cart = {str(pk): {"quantity": 1, "price": "9.50"} for pk in range(1, 30)}
+        self.assertEqual(self.round_trip({"cart": cart}), {"cart": cart})
+        self.assertLess(
+            len(self.serializer.dumps({"cart": cart})),
+            len(signing.JSONSerializer().dumps({"cart": cart})) / 2,
+        )
+
+    def test_irregular_cart_like_dicts_fall_back_to_generic_encoding(self):
+        value = {
+            "007": {"quantity": 1, "price": "1"},
+            "8": {"quantity": -1, "price": "1"},
+        }
+        self.assertEqual(self.round_trip(value), value)
+
+    @override_settings(SHOP_SESSION_COMPRESS_THRESHOLD=16)
+    def test_large_payloads_are_compressed(self):
+        payload = {"note": "x" * 200}
+        data = self.serializer.dumps(payload)
+        self.assertEqual(data[2] & 0x01, 0x01)
+        self.assertLess(len(data), 100)
+        self.assertEqual(self.serializer.loads(data), payload)
+
+    def test_reads_legacy_pickle_sessions(self):
+        legacy = PickleSerializer().dumps({"cart": {}})
+        self.assertEqual(self.serializer.loads(legacy), {"cart": {}})
+
+    @override_settings(SHOP_SESSION_LEGACY_PICKLE=False)
+    def test_rejects_legacy_sessions_when_disabled(self):
+        legacy = PickleSerializer().dumps({"cart": {}})
+        with self.assertRaises(ValueError):
+            self.serializer.loads(legacy)
+
+    def test_rejects_unknown_version_and_types(self):
+        with self.assertRaises(ValueError):
+            self.serializer.loads(b"\xc5\x09\x00\x00")
+        with self.assertRaises(TypeError):
+            self.serializer.dumps({"obj": object()})
+
+    def test_works_with_django_signing(self):
+        payload = {"cart": {"3": {"quantity": 4, "price": "2.00"}}}
+        signed = signing.dumps(
+            payload, salt="t", serializer=CompactSessionSerializer, compress=True
+        )
+        self.assertEqual(
+            signing.loads(signed, salt="t", serializer=CompactSessionSerializer),
+            payload,
+        )
@@ -27,7 +27,7 @@ from django.contrib.auth import views as auth_views  # type: ignore
 from django.urls import path  # type: ignore
 from django.views.generic import RedirectView  # type: ignore
 
-from . import views, views_extra
+from . import async_views, views, views_extra
 
 APP_NAME = "shop"
 # Django requires lowercase 'app_name' variable - pylint: disable=invalid-name
@@ -38,6 +38,11 @@ urlpatterns = [
     path("products/", views.product_list, name="product_list"),
     path("products/<int:pk>/", views.product_detail, name="product_detail"),
     path("search/", views_extra.search_products, name="search_products"),
+    path(
+        "search/autocomplete/",
+        views_extra.search_autocomplete,
+        name="search_autocomplete",
+    ),
     path("stores/<int:pk>/", views.store_detail, name="store_detail"),
     # Authentication
     path("register/", views.register, name="register"),
@@ -74,6 +79,9 @@ urlpatterns = [
     path("cart/test/", views.add_test_items, name="add_test_items"),
     path("cart/test-page/", views.cart_test, name="cart_test"),
     path("cart/api/", views.cart_api, name="cart_api"),
+    # Async variants of the JSON cart endpoints, for ASGI deployments.
+    path("cart/api/async/", async_views.cart_api, name="cart_api_async"),
+    path("cart/update/async/", async_views.cart_update, name="cart_update_async"),
     path(
         "cart/dropdown-test/",
         views.cart_dropdown_test,
@@ -118,6 +126,16 @@ urlpatterns = [
         views_extra.vendor_products,
         name="vendor_products",
     ),
+    path(
+        "vendor/products/bulk-update/",
+        views_extra.product_bulk_update,
+        name="product_bulk_update",
+    ),
+    path(
+        "vendor/orders/export/",
+        views_extra.order_export,
+        name="order_export",
+    ),
     # Store Management
     path("vendor/stores/", views.store_list, name="store_list"),
     path("vendor/stores/create/", views.store_create, name="store_create"),
@@ -137,6 +155,11 @@ urlpatterns = [
         views_extra.product_create,
         name="product_create",
     ),
+    path(
+        "vendor/stores/<int:store_id>/products/import/",
+        views_extra.product_import,
+        name="product_import",
+    ),
     path(
         "vendor/products/<int:pk>/update/",
         views_extra.product_update,
@@ -3,6 +3,7 @@
 
 import logging
 from decimal import Decimal
+from urllib.parse import urljoin
 
 from django.contrib import messages  # type: ignore
 from django.contrib.auth import login  # type: ignore
@@ -10,9 +11,8 @@ from django.contrib.auth.decorators import login_required  # type: ignore
 from django.core.paginator import Paginator  # type: ignore
 
 # Email functionality imported in functions as needed
-from django.db.models import Q  # type: ignore
-from django.db.models import Count, Avg  # type: ignore
-from django.db import DatabaseError  # type: ignore
+from django.db.models import Count, Avg, F, Prefetch, Sum  # type: ignore
+from django.db import DatabaseError, IntegrityError  # type: ignore
 from django.shortcuts import (  # type: ignore
     get_object_or_404,
     redirect,
@@ -21,13 +21,25 @@ from django.shortcuts import (  # type: ignore
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.http import HttpResponse  # type: ignore
 from django.urls import reverse  # type: ignore
-from django.views.decorators.http import require_POST  # type: ignore
+from django.utils import timezone  # type: ignore
+from django.views.decorators.http import condition, require_POST  # type: ignore
 
 from django.http import JsonResponse  # type: ignore
 from django.db import transaction  # type: ignore
 
-from .cart import Cart as SessionCart
+from .cache import cached_queryset
+from .cart import TAX_RATE, get_cart
+from .conditional import (
+    cart_api_etag,
+    product_detail_etag,
+    product_list_etag,
+    product_page_scopes,
+    product_purchased,
+    store_detail_etag,
+)
 from .email_service import send_order_confirmation_email
+from .facets import cached_facet_counts, facet_options
+from .filters import ProductFilter
 
 from .forms import (
     CheckoutForm,
@@ -36,6 +48,7 @@ from .forms import (
     ReviewForm,
     StoreForm,
 )
+from .invalidation import catalog_scopes, mark_changed, store_scope
 from .models import (
     Cart,
     CartItem,
@@ -46,6 +59,8 @@ from .models import (
     Review,
     Store,
 )
+from .page_cache import cache_anonymous_page
+from .reservations import available_quantities, holder_key, release, reserve_cart
 from .permissions import (
     anonymous_required,
     buyer_required,
@@ -56,10 +71,12 @@ from .permissions import (
 logger = logging.getLogger(__name__)
 
 
+@cache_anonymous_page
 def home(request):
     """Homepage view"""
     featured_products = (
         Product.objects.filter(is_active=True, quantity__gt=0)
+        .select_related("store")
         .annotate(review_count=Count("reviews"), avg_rating=Avg("reviews__rating"))
         .order_by("-created_at")[:8]
     )
@@ -105,13 +122,9 @@ def customer_dashboard(request):
     """Customer/Buyer dashboard with shopping overview"""
 
     try:
-        # Get cart items count
-        cart_items_count = 0
-        try:
-            user_cart = Cart.objects.get(user=request.user)
-            cart_items_count = user_cart.total_items
-        except Cart.DoesNotExist:
-            pass
+        # Get cart items count from the live cart, as the header badge does;
+        # the saved cart is only synced at login and logout.
+        cart_items_count = get_cart(request).get_item_count()
 
         # Get total orders
         total_orders = Order.objects.filter(buyer=request.user).count()
@@ -125,9 +138,11 @@ def customer_dashboard(request):
         total_reviews = Review.objects.filter(user=request.user).count()
 
         # Get featured products
-        featured_products = Product.objects.filter(
-            is_active=True, quantity__gt=0
-        ).order_by("-created_at")[:6]
+        featured_products = (
+            Product.objects.filter(is_active=True, quantity__gt=0)
+            .select_related("store")
+            .order_by("-created_at")[:6]
+        )
 
         # Get categories
         categories = Category.objects.all()[:6]
@@ -176,71 +191,26 @@ def profile(request):
     return render(request, "shop/profile_update.html", {"form": form})
 
 
-def product_list(request):
-    """Display list of all products with filtering and search"""
-
-    # Get all active products
-    products = Product.objects.filter(is_active=True).annotate(
-        review_count=Count("reviews"), avg_rating=Avg("reviews__rating")
-    )
-
-    # Search functionality
-    search_query = request.GET.get("search", "")
-    if search_query:
-        products = products.filter(
-            Q(name__icontains=search_query)
-            | Q(description__icontains=search_query)
-            | Q(store__name__icontains=search_query)
-        )
-
-    # Category filter
-    category_id = request.GET.get("category")
-    if category_id:
-        products = products.filter(category_id=category_id)
-
-    # Store filter
-    store_id = request.GET.get("store")
-    if store_id:
-        products = products.filter(store_id=store_id)
+def render_product_list(request, spec, template_name="shop/product_list.html"):
+    """Render the product list for ``spec``, a parsed ``ProductFilter``.
 
-    # Price range filter
-    min_price = request.GET.get("min_price")
-    max_price = request.GET.get("max_price")
-    if min_price:
-        try:
-            products = products.filter(price__gte=float(min_price))
-        except ValueError:
-            pass
-    if max_price:
-        try:
-            products = products.filter(price__lte=float(max_price))
-        except ValueError:
-            pass
-
-    # Sorting
-    sort_by = request.GET.get("sort", "-created_at")
-    if sort_by in ["name", "-name", "price", "-price", "-created_at"]:
-        products = products.order_by(sort_by)
-    else:
-        products = products.order_by("-created_at")
+    Shared by the product list and product search pages.
+    """
+    products = spec.queryset()
 
-    # Get filter options
-    categories = Category.objects.all()
-    stores = Store.objects.filter(is_active=True)
-    total_products = Product.objects.filter(is_active=True).count()
+    # Get filter options; the same for every query, so cached per catalog
+    # generation.
+    categories = cached_queryset("filter_categories", Category.objects.all())
+    stores = cached_queryset("filter_stores", Store.objects.filter(is_active=True))
+    # Counts for every filter option in one grouped query, cached per spec.
+    facets = facet_options(request.GET, cached_facet_counts(spec), categories, stores)
 
-    # Pagination
+    # Pagination; the match count is cached per spec too.
     paginator = Paginator(products, 12)  # Show 12 products per page
+    paginator.count = spec.count()
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
-    # Determine which template to use
-    template_name = (
-        "shop/product_list_enhanced.html"
-        if request.GET.get("enhanced")
-        else "shop/product_list.html"
-    )
-
     return render(
         request,
         template_name,
@@ -248,17 +218,45 @@ def product_list(request):
             "products": page_obj,
             "categories": categories,
             "stores": stores,
-            "total_products": total_products,
+            "total_products": paginator.count,
+            "facets": facets,
+            "filters": spec,
+            "query": spec.search,
+            "selected_category": str(spec.category or ""),
+            "sort_by": spec.sort,
             "page_obj": page_obj,
             "is_paginated": page_obj.has_other_pages(),
         },
     )
 
 
+@condition(etag_func=product_list_etag)
+@cache_anonymous_page
+def product_list(request):
+    """Display list of all products with filtering and search"""
+    return render_product_list(
+        request,
+        ProductFilter.from_params(request.GET),
+        (
+            "shop/product_list_enhanced.html"
+            if request.GET.get("enhanced")
+            else "shop/product_list.html"
+        ),
+    )
+
+
+@condition(etag_func=product_detail_etag)
+@cache_anonymous_page(scopes=product_page_scopes)
 def product_detail(request, pk):
     """Product detail view"""
-    product = get_object_or_404(Product, pk=pk, is_active=True)
-    reviews = product.reviews.all().order_by("-created_at")
+    product = get_object_or_404(
+        Product.objects.select_related("store", "category").annotate(
+            avg_rating=Avg("reviews__rating")
+        ),
+        pk=pk,
+        is_active=True,
+    )
+    reviews = product.reviews.select_related("user").order_by("-created_at")
 
     # Calculate review statistics
     verified_reviews = reviews.filter(is_verified=True)
@@ -275,16 +273,10 @@ def product_detail(request, pk):
         except Review.DoesNotExist:
             user_review = None
 
-        # Determine if the authenticated user purchased this product.
+        # Determine if the authenticated user purchased this product, also
+        # counting guest orders that used their email before registering.
         try:
-            has_purchased = OrderItem.objects.filter(
-                product=product, order__buyer=request.user
-            ).exists()
-            # Also consider guest orders that used this user's email prior to registration
-            if not has_purchased and request.user.email:
-                has_purchased = OrderItem.objects.filter(
-                    product=product, order__guest_email__iexact=request.user.email
-                ).exists()
+            has_purchased = product_purchased(request, product.pk)
         except DatabaseError:
             # Defensive: if order lookup fails due to DB issues, treat as not purchased
             has_purchased = False
@@ -313,7 +305,7 @@ def product_detail(request, pk):
         "unverified_reviews": unverified_reviews,
         "verified_count": verified_count,
         "unverified_count": unverified_count,
-        "total_reviews": reviews.count(),
+        "total_reviews": verified_count + unverified_count,
     }
     # Defensive: expose whether the product's store is present and active.
     store_obj = getattr(product, "store", None)
@@ -323,14 +315,16 @@ def product_detail(request, pk):
 
 def add_to_cart(request, product_id):
     """Add product to session cart - works for anonymous users"""
-    # Use module-level SessionCart to avoid import inside function
-    session_cart = SessionCart(request)
+    session_cart = get_cart(request)
     product = get_object_or_404(Product, pk=product_id)
     if request.method == "POST":
         quantity = int(request.POST.get("quantity", 1))
+        # Stock held for other shoppers' checkouts isn't available.
+        stock = available_quantities([product.pk], holder=holder_key(request))
+        stock = stock.get(product.pk, 0)
 
         # Check stock availability
-        if quantity > product.quantity:
+        if quantity > stock:
             messages.error(request, "Not enough stock available!")
             return redirect("shop:product_detail", pk=product_id)
 
@@ -339,8 +333,8 @@ def add_to_cart(request, product_id):
         if str(product_id) in session_cart.cart:
             current_quantity = session_cart.cart[str(product_id)]["quantity"]
 
-        if current_quantity + quantity > product.quantity:
-            available = product.quantity - current_quantity
+        if current_quantity + quantity > stock:
+            available = stock - current_quantity
             messages.error(request, f"Only {available} more items can be added.")
             return redirect("shop:product_detail", pk=product_id)
 
@@ -398,17 +392,61 @@ def remove_from_cart(request, item_id):
     return redirect("shop:cart_detail")
 
 
+def _revalidate_cart(request, session_cart, force=False) -> bool:
+    """Refresh the cart from the catalog; flash and report any changes."""
+    changes = session_cart.revalidate(force=force)
+    for change in changes:
+        messages.warning(request, change)
+    return bool(changes)
+
+
+class _SoldOut(Exception):
+    """Raised inside the checkout transaction when a line can't be met."""
+
+    def __init__(self, product, available):
+        super().__init__(product, available)
+        self.product, self.available = product, available
+
+
+def _placed_order(request, key):
+    """Return the order id ``request``'s buyer already placed with ``key``."""
+    if not key:
+        return None
+    buyer = request.user if request.user.is_authenticated else None
+    return (
+        Order.objects.filter(idempotency_key=key, buyer=buyer)
+        .order_by()
+        .values_list("order_id", flat=True)
+        .first()
+    )
+
+
 def checkout(request):
     """Checkout process with session cart and email invoice"""
-    # Use module-level Decimal, transaction, SessionCart and
+    # Use module-level Decimal, transaction, get_cart and
     # send_order_confirmation_email to avoid inline imports.
-    # Get session cart
-    session_cart = SessionCart(request)
+    if request.method == "POST":
+        # A replayed submission (double click, retried POST) goes straight
+        # to the order it already placed; its cart is empty by now.
+        key = request.POST.get("idempotency_key", "")
+        order_id = _placed_order(request, key)
+        if order_id:
+            messages.info(request, "This order has already been placed.")
+            return redirect("shop:order_detail", order_id=order_id)
+
+    # Get session cart, with prices and stock as the catalog has them now.
+    # An order is billed from a fresh read, never from the cached stamp.
+    session_cart = get_cart(request)
+    changed = _revalidate_cart(request, session_cart, force=request.method == "POST")
 
     if len(session_cart) == 0:
         messages.error(request, "Your cart is empty!")
         return redirect("shop:cart_detail")
 
+    if request.method == "POST" and changed:
+        # Don't bill totals the shopper hasn't seen.
+        return redirect("shop:checkout")
+
     if request.method == "POST":
         form = CheckoutForm(request.POST, user=request.user)
         if form.is_valid():
@@ -421,47 +459,38 @@ def checkout(request):
                         request,
                         "Name and email are required for guest checkout.",
                     )
-                    # Precompute totals to keep mapping lines short
-                    _total = session_cart.get_total_price()
-                    _tax = _total * Decimal("0.08")
-                    _grand = _total * Decimal("1.08")
-
                     return render(
                         request,
                         "shop/checkout.html",
-                        {
-                            "form": form,
-                            "cart": session_cart,
-                            "total": _total,
-                            "tax": _tax,
-                            "grand_total": _grand,
-                        },
+                        {"form": form, **session_cart.get_summary()},
                     )
-            # Check stock availability for all items first
-            for item in session_cart:
-                product = item["product"]
-                quantity = item["quantity"]
-                # Use product.quantity instead of product.stock
-                if quantity > product.quantity:
-                    messages.error(
-                        request,
-                        (
-                            f"Not enough stock for {product.name}! "
-                            f"Only {product.quantity} available."
-                        ),
-                    )
-                    return redirect("shop:cart_detail")
             try:
                 with transaction.atomic():
+                    # Check stock for all items first, with the product rows
+                    # locked until the order is written so concurrent
+                    # checkouts can't sell the same units. Our own checkout
+                    # holds count as available; other shoppers' don't.
+                    stock = available_quantities(
+                        [item["product"].pk for item in session_cart],
+                        holder=holder_key(request),
+                        lock=True,
+                    )
+                    for item in session_cart:
+                        product = item["product"]
+                        available = stock.get(product.pk, 0)
+                        if item["quantity"] > available:
+                            raise _SoldOut(product, available)
+
                     # Calculate order totals
                     subtotal = session_cart.get_total_price()
-                    tax = subtotal * Decimal("0.08")  # 8% tax
+                    tax = subtotal * TAX_RATE
                     total = subtotal + tax
 
                     # Create order
                     order = Order.objects.create(
                         buyer=(request.user if request.user.is_authenticated else None),
                         total_amount=total,
+                        item_count=len(session_cart),
                         shipping_address=form.cleaned_data["shipping_address"],
                         guest_name=(
                             guest_name if not request.user.is_authenticated else ""
@@ -469,6 +498,7 @@ def checkout(request):
                         guest_email=(
                             guest_email if not request.user.is_authenticated else ""
                         ),
+                        idempotency_key=(form.cleaned_data["idempotency_key"] or None),
                     )
 
                     # Create order items and update stock
@@ -480,12 +510,27 @@ def checkout(request):
                             order=order,
                             product=product,
                             quantity=quantity,
-                            price=product.price,
+                            price=item["price"],
                         )
 
-                        # Update product stock
-                        product.quantity -= quantity
-                        product.save()
+                        # Update product stock in SQL, never below zero.
+                        sold = Product.objects.filter(
+                            pk=product.pk, quantity__gte=quantity
+                        ).update(
+                            quantity=F("quantity") - quantity,
+                            updated_at=timezone.now(),
+                        )
+                        if not sold:
+                            raise _SoldOut(product, 0)
+                        # update() skips the signal that retires cached pages.
+                        mark_changed(
+                            *catalog_scopes(
+                                product.store_id, product.category_id, product.pk
+                            )
+                        )
+
+                    # The stock is sold now; drop this checkout's holds.
+                    release(request)
 
                     # Clear session cart
                     session_cart.clear()
@@ -595,6 +640,30 @@ def checkout(request):
                     # Show success notification and redirect to order detail
                     return redirect("shop:order_detail", order_id=order.order_id)
 
+            except _SoldOut as e:
+                messages.error(
+                    request,
+                    (
+                        f"Not enough stock for {e.product.name}! "
+                        f"Only {e.available} available."
+                    ),
+                )
+                return redirect("shop:cart_detail")
+            except IntegrityError as e:
+                # A concurrent submission with the same key won the race;
+                # this one rolled back, so show the order it placed.
+                order_id = _placed_order(request, form.cleaned_data["idempotency_key"])
+                if order_id:
+                    return redirect("shop:order_detail", order_id=order_id)
+                logger.exception("Integrity error during checkout: %s", e)
+                messages.error(
+                    request,
+                    (
+                        "Error processing your order (database error). "
+                        "Please try again."
+                    ),
+                )
+                return redirect("shop:cart_detail")
             except DatabaseError as e:
                 # Database-related errors should be surfaced as a friendly
                 # message and not retried blindly.
@@ -622,41 +691,68 @@ def checkout(request):
                 return redirect("shop:cart_detail")
     else:
         form = CheckoutForm(user=request.user)
+        # Hold the cart's stock while the shopper fills in the form.
+        short = reserve_cart(request, session_cart)
+        if short:
+            for product, available in short:
+                messages.error(
+                    request,
+                    (
+                        f"Not enough stock for {product.name}! "
+                        f"Only {available} available."
+                    ),
+                )
+            return redirect("shop:cart_detail")
 
-    # Calculate totals for display
-    subtotal = session_cart.get_total_price()
-    tax = subtotal * Decimal("0.08")
-    grand_total = subtotal + tax
-
-    context = {
-        "form": form,
-        "cart": session_cart,
-        "total": subtotal,
-        "tax": tax,
-        "grand_total": grand_total,
-    }
+    context = {"form": form, **session_cart.get_summary()}
     return render(request, "shop/checkout.html", context)
 
 
 # Email function moved to email_service.py
 
 
+def _orders_with_items():
+    """Return an Order queryset that loads its lines in one extra query.
+
+    Order lines and their products (with the product store) are
+    prefetched, and ``items_subtotal`` is annotated so templates never
+    walk ``order.items`` to compute totals.
+    """
+    return (
+        Order.objects.select_related("buyer")
+        .prefetch_related(
+            Prefetch(
+                "items",
+                queryset=OrderItem.objects.select_related("product__store"),
+            )
+        )
+        .annotate(items_subtotal=Sum(F("items__price") * F("items__quantity")))
+    )
+
+
 @buyer_required
 def order_detail(request, order_id):
     """Order detail view - buyers only, must own order"""
-    order = get_object_or_404(Order, order_id=order_id, buyer=request.user)
-    context = {"order": order}
+    order = get_object_or_404(
+        _orders_with_items(), order_id=order_id, buyer=request.user
+    )
+    subtotal = order.items_subtotal or Decimal("0")
+    context = {
+        "order": order,
+        "subtotal": subtotal,
+        "tax": order.total_amount - subtotal,
+    }
     return render(request, "shop/order_detail.html", context)
 
 
 @buyer_required
 def order_history(request):
     """User's order history - buyers only"""
-    orders = Order.objects.filter(buyer=request.user).order_by("-created_at")
+    orders = _orders_with_items().filter(buyer=request.user).order_by("-created_at")
     paginator = Paginator(orders, 10)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
-    context = {"page_obj": page_obj}
+    context = {"page_obj": page_obj, "orders": page_obj}
     return render(request, "shop/order_history.html", context)
 
 
@@ -757,7 +853,9 @@ def vendor_dashboard(request):
     """Vendor dashboard - vendors only"""
 
     try:
-        stores = Store.objects.filter(vendor=request.user)
+        stores = Store.objects.filter(vendor=request.user).annotate(
+            product_count=Count("products")
+        )
         recent_orders = []
         total_sales = 0
         total_products = 0
@@ -771,15 +869,18 @@ def vendor_dashboard(request):
 
         # Try to get order items safely
         try:
-            recent_orders = OrderItem.objects.filter(
-                product__store__vendor=request.user
-            ).order_by("-order__created_at")[:10]
-            # Calculate total sales
-            total_sales = sum(
-                item.total_price
-                for item in OrderItem.objects.filter(
-                    product__store__vendor=request.user
-                )
+            recent_orders = (
+                OrderItem.objects.filter(product__store__vendor=request.user)
+                .select_related("product", "order__buyer")
+                .order_by("-order__created_at")[:10]
+            )
+            # Calculate total sales in the database rather than loading
+            # every order line the vendor has ever sold.
+            total_sales = (
+                OrderItem.objects.filter(product__store__vendor=request.user).aggregate(
+                    total=Sum(F("price") * F("quantity"))
+                )["total"]
+                or 0
             )
         except DatabaseError as e:  # pragma: no cover - defensive logging
             logger.warning("Could not fetch order data: %s", e)
@@ -831,6 +932,8 @@ def store_create(request):
     return render(request, "shop/vendor/store_form.html", context)
 
 
+@condition(etag_func=store_detail_etag)
+@cache_anonymous_page(scopes=lambda request, pk: [store_scope(pk)])
 def store_detail(request, pk):
     """Store detail view"""
     store = get_object_or_404(Store, pk=pk, is_active=True)
@@ -858,31 +961,15 @@ def contact(request):
 
 def cart_detail(request):
     """Display session-based shopping cart - works for anonymous users"""
-    # Use module-level Decimal and SessionCart
-    session_cart = SessionCart(request)
-    cart_items = list(session_cart)
-
-    total = session_cart.get_total_price()
-    tax = total * Decimal("0.08")  # 8% tax
-    grand_total = total + tax
-
-    return render(
-        request,
-        "shop/cart.html",
-        {
-            "cart": session_cart,
-            "cart_items": cart_items,
-            "total": total,
-            "tax": tax,
-            "grand_total": grand_total,
-        },
-    )
+    session_cart = get_cart(request)
+    _revalidate_cart(request, session_cart)
+    return render(request, "shop/cart.html", session_cart.get_summary())
 
 
 def update_session_cart(request, product_id):
     """Update product quantity in session cart"""
     if request.method == "POST":
-        session_cart = SessionCart(request)
+        session_cart = get_cart(request)
         product = get_object_or_404(Product, id=product_id)
 
         try:
@@ -916,7 +1003,7 @@ def update_session_cart(request, product_id):
 
 def remove_from_session_cart(request, product_id):
     """Remove product from session cart"""
-    session_cart = SessionCart(request)
+    session_cart = get_cart(request)
     product = get_object_or_404(Product, id=product_id)
 
     session_cart.remove(product)
@@ -927,16 +1014,12 @@ def remove_from_session_cart(request, product_id):
 
 def cart_debug(request):
     """Debug view to see cart contents and structure"""
-    # Use module-level Decimal and SessionCart
-    session_cart = SessionCart(request)
-    cart_items = list(session_cart)
-
-    total = session_cart.get_total_price()
-    tax = total * Decimal("0.08")
-    grand_total = total + tax
+    session_cart = get_cart(request)
+    context = session_cart.get_summary()
+    cart_items = context["cart_items"]
 
     # Add extra debug info
-    debug_info = {
+    context["debug_info"] = {
         "session_key": request.session.session_key,
         "session_cart_raw": request.session.get("cart", {}),
         "cart_length": len(session_cart),
@@ -944,23 +1027,12 @@ def cart_debug(request):
         "cart_items_count": len(cart_items),
     }
 
-    return render(
-        request,
-        "shop/cart_debug.html",
-        {
-            "cart": session_cart,
-            "cart_items": cart_items,
-            "total": total,
-            "tax": tax,
-            "grand_total": grand_total,
-            "debug_info": debug_info,
-        },
-    )
+    return render(request, "shop/cart_debug.html", context)
 
 
 def add_test_items(request):
     """Add test items to cart for debugging"""
-    session_cart = SessionCart(request)
+    session_cart = get_cart(request)
 
     # Get first 3 products
     products = Product.objects.all()[:3]
@@ -982,27 +1054,37 @@ def cart_dropdown_test(request):
     return render(request, "shop/cart_dropdown_test.html")
 
 
+@condition(etag_func=cart_api_etag)
 def cart_api(request):
     """API endpoint to get cart data as JSON for dropdown"""
-    # Use module-level Decimal, JsonResponse, and SessionCart
-    cart_items = list(SessionCart(request))
+    return JsonResponse(cart_api_payload(request, get_cart(request).get_summary()))
+
+
+def cart_api_payload(request, summary):
+    """Return the cart API's JSON data for a cart ``summary``.
+
+    Shared with the async variant in ``async_views``.
+    """
+    cart_items = summary["cart_items"]
+
+    # Resolve the site root once and join image paths onto it instead of
+    # calling build_absolute_uri for every line.
+    site_root = request.build_absolute_uri("/")
 
     # Convert cart items to JSON-serializable format
     items_data = []
     for item in cart_items:
-        # Build full image URL
-        image_url = None
-        if item["product"].image:
-            image_url = request.build_absolute_uri(item["product"].image.url)
+        product = item["product"]
+        image_url = urljoin(site_root, product.image.url) if product.image else None
 
         items_data.append(
             {
                 "product": {
-                    "id": item["product"].id,
-                    "name": item["product"].name,
-                    "price": str(item["product"].price),
+                    "id": product.id,
+                    "name": product.name,
+                    "price": str(product.price),
                     "image": image_url,
-                    "store": item["product"].store.name,
+                    "store": product.store.name,
                 },
                 "quantity": item["quantity"],
                 "price": str(item["price"]),
@@ -1010,16 +1092,10 @@ def cart_api(request):
             }
         )
 
-    total = SessionCart(request).get_total_price()
-    tax = total * Decimal("0.08")
-    grand_total = total + tax
-
-    return JsonResponse(
-        {
-            "items": items_data,
-            "total": str(total),
-            "tax": str(tax),
-            "grand_total": str(grand_total),
-            "items_count": len(cart_items),
-        }
-    )
+    return {
+        "items": items_data,
+        "total": str(summary["total"]),
+        "tax": str(summary["tax"]),
+        "grand_total": str(summary["grand_total"]),
+        "items_count": len(cart_items),
+    }
@@ -3,34 +3,48 @@
 
 from datetime import timedelta
 
+import json
 import logging
 
 from django.conf import settings  # type: ignore
 from django.contrib import messages  # type: ignore
 from django.contrib.auth import get_user_model  # type: ignore
+from django.contrib.auth.decorators import login_required  # type: ignore
 from django.core.paginator import Paginator  # type: ignore
 from django.core.mail import EmailMultiAlternatives  # type: ignore
-from django.db.models import Avg, Q  # type: ignore
+from django.db.models import Q  # type: ignore
+from django.http import HttpResponseBadRequest, JsonResponse  # type: ignore
 from django.shortcuts import (  # type: ignore
     get_object_or_404,
     redirect,
     render,
 )
 from django.utils import timezone  # type: ignore
+from django.views.decorators.http import require_POST  # type: ignore
 from main.shop_permissions import (
     admin_required,
     anonymous_required,
+    api_permission_required,
+    user_is_admin,
+    user_is_vendor,
     vendor_required,
 )
 
+from .autocomplete import suggest
+from .bulk_updates import BulkUpdateError, apply_product_changes
+from .exports import ExportError, filters_from_params, order_lines, stream_export
+from .filters import ProductFilter
+from .imports import ImportFileError, import_products, read_rows
 from .forms import (
     CategoryForm,
     PasswordResetForm,
     PasswordResetRequestForm,
     ProductForm,
+    ProductImportUploadForm,
     StoreForm,
 )
 from .models import Category, PasswordResetToken, Product, Store
+from .views import render_product_list
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +105,53 @@ def product_create(request, store_id):
     return render(request, "shop/vendor/product_form.html", context)
 
 
+@vendor_required
+def product_import(request, store_id):
+    """Bulk-import products from a CSV or JSON Lines upload - vendors only"""
+    store = get_object_or_404(Store, pk=store_id, vendor=request.user)
+    result = None
+    dry_run = False
+    if request.method == "POST":
+        form = ProductImportUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            dry_run = form.cleaned_data["dry_run"]
+            try:
+                result = import_products(
+                    store,
+                    read_rows(
+                        form.cleaned_data["file"].file, form.cleaned_data["format"]
+                    ),
+                    dry_run=dry_run,
+                )
+            except (ImportFileError, UnicodeDecodeError) as exc:
+                form.add_error("file", str(exc))
+    else:
+        form = ProductImportUploadForm()
+    context = {
+        "form": form,
+        "store": store,
+        "result": result,
+        "dry_run": dry_run,
+        "errors": result.errors[:100] if result else [],
+    }
+    return render(request, "shop/vendor/product_import.html", context)
+
+
+@require_POST
+@api_permission_required(allowed_roles=["vendor"])
+def product_bulk_update(request):
+    """Apply a JSON array of price/stock/visibility changes - vendors only"""
+    try:
+        changes = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Request body must be JSON."}, status=400)
+    try:
+        summary = apply_product_changes(request.user, changes)
+    except BulkUpdateError as exc:
+        return JsonResponse({"error": str(exc), "errors": exc.errors}, status=400)
+    return JsonResponse(summary)
+
+
 @vendor_required
 def product_update(request, pk):
     """Update product - vendors only, must own product"""
@@ -129,8 +190,10 @@ def vendor_products(request):
     # Get vendor's stores
     stores = Store.objects.filter(vendor=request.user)
 
-    # Get all products from vendor's stores
-    products = Product.objects.filter(store__vendor=request.user)
+    # Get all products from vendor's stores (each card shows the store name)
+    products = Product.objects.filter(store__vendor=request.user).select_related(
+        "store"
+    )
 
     # Filter by search
     search = request.GET.get("search")
@@ -449,58 +512,47 @@ def category_delete(request, pk):
 
 
 def search_products(request):
-    """Advanced product search"""
-    products = Product.objects.filter(is_active=True, quantity__gt=0)
-    categories = Category.objects.all()
-    # Search parameters
-    query = request.GET.get("q", "")
-    category_id = request.GET.get("category", "")
-    min_price = request.GET.get("min_price", "")
-    max_price = request.GET.get("max_price", "")
-    sort_by = request.GET.get("sort", "newest")
-    # Apply filters
-    if query:
-        products = products.filter(
-            Q(name__icontains=query)
-            | Q(description__icontains=query)
-            | Q(store__name__icontains=query)
-        )
-    if category_id:
-        products = products.filter(category_id=category_id)
-    if min_price:
-        try:
-            products = products.filter(price__gte=float(min_price))
-        except ValueError:
-            pass
-    if max_price:
-        try:
-            products = products.filter(price__lte=float(max_price))
-        except ValueError:
-            pass
-    # Apply sorting
-    if sort_by == "price_low":
-        products = products.order_by("price")
-    elif sort_by == "price_high":
-        products = products.order_by("-price")
-    elif sort_by == "name":
-        products = products.order_by("name")
-    elif sort_by == "rating":
-        products = products.annotate(avg_rating=Avg("reviews__rating")).order_by(
-            "-avg_rating"
+    """Advanced product search; only products in stock are shown."""
+    return render_product_list(
+        request, ProductFilter.from_params(request.GET, in_stock=True)
+    )
+
+
+def search_autocomplete(request):
+    """JSON typeahead suggestions from the in-memory prefix index."""
+    query = request.GET.get("q", "").strip()
+    default = getattr(settings, "SHOP_AUTOCOMPLETE_LIMIT", 8)
+    try:
+        limit = min(max(int(request.GET.get("limit", default)), 1), 20)
+    except ValueError:
+        limit = default
+    return JsonResponse({"query": query, "suggestions": suggest(query, limit)})
+
+
+@login_required
+def order_export(request):
+    """Stream order lines as CSV or JSON Lines.
+
+    Vendors get the lines for their own products; admins get every line
+    and may filter by ``vendor``. Both may filter by ``store`` and a
+    ``from``/``to`` date range.
+    """
+    if user_is_admin(request.user):
+        vendor_only = None
+    elif user_is_vendor(request.user):
+        vendor_only = request.user.pk
+    else:
+        messages.error(request, "Access denied. Vendor account required.")
+        return redirect("shop:home")
+    try:
+        filters = filters_from_params(request.GET)
+        if vendor_only is not None:
+            filters["vendor"] = vendor_only
+        stamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+        return stream_export(
+            order_lines(**filters),
+            request.GET.get("format", "csv"),
+            filename=f"orders-{stamp}",
         )
-    else:  # newest
-        products = products.order_by("-created_at")
-    # Pagination
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    context = {
-        "page_obj": page_obj,
-        "categories": categories,
-        "query": query,
-        "selected_category": category_id,
-        "min_price": min_price,
-        "max_price": max_price,
-        "sort_by": sort_by,
-    }
-    return render(request, "shop/product_list.html", context)
+    except ExportError as exc:
+        return HttpResponseBadRequest(str(exc))
@@ -11,6 +11,7 @@ Compatibility shim: top-level `shop_middleware.py` now proxies to
 # type: ignore
 
 from shop.shop_middleware import (
+    CartCookieMiddleware,
     MiddlewareMixin,
     PermissionMiddleware,
     SecurityMiddleware,
@@ -20,6 +21,7 @@ from shop.shop_middleware import (
 )
 
 __all__ = [
+    "CartCookieMiddleware",
     "MiddlewareMixin",
     "PermissionMiddleware",
     "SecurityMiddleware",